@@ -9,226 +9,565 @@ Usage:
 
     Run pytest SystemLevel_Scenarios.py separately to execute tests.
     The server will receive and broadcast scenario updates.
+
+    Sharded runs (run_shards.py) report under one run id per shard; while
+    more than one run is active, labels are prefixed with the run id.
+
+    Each scenario's event journal (event_journal.py) is posted to /journal
+    and served back as JSON from GET /journal[?label=...&run_id=...].
+
+    Heartbeats carry each run's progress (test counts, ETA; see
+    scenario_history.py), kept per active run, returned by /status and
+    sent to the dashboard as a "progress" event on /events.
+
+    Each test's phase timing (phase_timing.py) is posted to /timing, sent
+    to the dashboard as a "timing" event on /events and served back from
+    GET /timing[?run_id=...].
+
+    Console lines are sent in batches, data: {"lines": [...]}, as soon as
+    the log changes (inotify on Linux, polling elsewhere).
+
+    The console log is split into segments (console_segments.py). A browser
+    connecting to /console gets the last INITIAL_LINES lines, or the lines
+    from ?from=<line number> on; after a dropped connection EventSource
+    resumes from the Last-Event-ID it sends. Only the segments needed are
+    read, however long the run.
+
+The server runs on one asyncio event loop (standard library only, so the
+Typhoon bundled Python runs it). An SSE subscriber costs a connection and
+a writer task instead of a server thread, and a broadcast only queues the
+message for each subscriber's writer, so one slow browser never holds up
+the others or the POSTs of the test run. Console log reads run in the
+loop's default executor.
+
+Each subscriber's queue is bounded (EVENTS_QUEUE / CONSOLE_QUEUE). When
+it is full the oldest message is dropped, except that /events always
+keeps the latest scenario state; a console client is told how much output
+it missed. A client whose oldest undelivered message is older than
+EVICT_LAG is disconnected (EventSource reconnects, /console resumes from
+its last line). GET /clients lists every subscriber's queue, lag and
+drops; /status has the totals.
 """
 
-import http.server
+import asyncio
+import collections
+import glob
+import http
 import json
 import os
-import threading
 import time
+import urllib.parse
+
+import console_segments
+import dir_watch
 
 PORT = 8780
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 HTML_FILE = os.path.join(SCRIPT_DIR, "SMT_Dashboard.html")
 CONSOLE_LOG = os.path.join(SCRIPT_DIR, "pytest_console.log")
+SHARD_CONSOLE_LOGS = os.path.join(SCRIPT_DIR, "pytest_console_*.log")
 
 HEARTBEAT_TIMEOUT = 5  # Consider tests dead after 5 seconds without heartbeat
+CONSOLE_POLL = 0.1  # seconds between console log checks without change notifications
+CONSOLE_RECHECK = 2  # ... with them, in case one is missed
+CONSOLE_BATCH_INTERVAL = 0.05  # seconds at least between console broadcasts
+CONSOLE_BATCH_LINES = 500  # lines per console SSE message at most
+CONSOLE_BATCH_BYTES = 64 * 1024  # ... and about this much text
+EVENTS_QUEUE = 100  # messages waiting per /events client before the oldest is dropped
+CONSOLE_QUEUE = 1000  # ... per /console client (a message holds one poll's lines)
+EVICT_LAG = 30  # seconds a client's oldest undelivered message may wait before it is disconnected
+MAX_HEADER_BYTES = 64 * 1024  # request line and headers of a request
 
 current_scenario = {"label": "Ready - Run pytest to start", "running": False}
-sse_clients = []
-lock = threading.Lock()
-
-console_clients = []
-console_lock = threading.Lock()
-
-last_heartbeat_time = None
-heartbeat_lock = threading.Lock()
-
-
-def broadcast(label, running=True):
+sse_clients = set()  # SseClient of each /events stream
+console_clients = set()  # SseClient of each /console stream
+evicted = 0  # clients disconnected for lagging more than EVICT_LAG
+
+runs = {}  # run id -> time of its last heartbeat or scenario update, for active runs
+progress = {}  # run id -> progress of its latest heartbeat (test counts, ETA), for active runs
+
+JOURNAL_HISTORY = 500  # scenario journals kept for GET /journal
+journals = collections.OrderedDict()  # (run id, label) -> event list, oldest first
+
+TIMING_HISTORY = 500  # test phase timings kept for GET /timing
+timings = collections.deque(maxlen=TIMING_HISTORY)  # oldest first
+
+Request = collections.namedtuple("Request", "method path query headers body")
+
+
+class SseClient:
+    """An SSE subscriber. Its own task writes the messages queued by send().
+
+    At most max_queued messages wait; then the oldest is dropped, but never
+    the newest state message. notice: dropped count -> message telling the
+    browser what it missed, or None.
+    """
+
+    def __init__(self, writer, stream, max_queued, notice=None):
+        self.writer = writer
+        self.stream = stream
+        self.max_queued = max_queued
+        self.notice = notice
+        self.peer = writer.get_extra_info("peername")
+        self.connected = time.monotonic()
+        self.queue = collections.deque()  # (time queued, msg, is state)
+        self.wakeup = asyncio.Event()
+        self.writing_since = None  # time queued of the oldest message being written
+        self.dropped = 0
+        self.unreported = 0  # dropped since the last notice
+        self.sent = {}  # console: log path -> number of the last line sent
+        self.backlog = []  # console: (path, lines, restarted) broadcast before the history went out
+        self.ready = False  # console: history sent
+
+    def send(self, msg, state=False):
+        """Queue a message. Never blocks; drops the oldest message when full."""
+        self.queue.append((time.monotonic(), msg, state))
+        if len(self.queue) > self.max_queued:
+            newest_state = max((i for i, entry in enumerate(self.queue) if entry[2]), default=-1)
+            del self.queue[1 if newest_state == 0 else 0]
+            self.dropped += 1
+            self.unreported += 1
+        self.wakeup.set()
+
+    @property
+    def lag(self):
+        """Seconds the oldest undelivered message has waited."""
+        oldest = self.writing_since
+        if oldest is None and self.queue:
+            oldest = self.queue[0][0]
+        return 0.0 if oldest is None else time.monotonic() - oldest
+
+    def evict(self):
+        """Disconnect the client; its stream() ends."""
+        self.writer.transport.abort()
+
+    async def run(self):
+        """Write queued messages until the connection breaks."""
+        while True:
+            if not self.queue:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                continue
+            batch = []
+            if self.unreported and self.notice is not None:
+                batch.append(self.notice(self.unreported))
+                self.unreported = 0
+            self.writing_since = self.queue[0][0]
+            batch += [msg for _, msg, _ in self.queue]
+            self.queue.clear()
+            self.writer.write(b"".join(batch))
+            await self.writer.drain()
+            self.writing_since = None
+
+    def stats(self):
+        return {"stream": self.stream, "peer": f"{self.peer[0]}:{self.peer[1]}" if self.peer else "",
+                "connected_s": round(time.monotonic() - self.connected, 1),
+                "queued": len(self.queue), "lag_s": round(self.lag, 3), "dropped": self.dropped}
+
+
+def broadcast(label, running=True, run_id=None):
     global current_scenario
     current_scenario = {"label": label, "running": running}
+    if run_id:
+        current_scenario["run_id"] = run_id
     msg = f"data: {json.dumps(current_scenario)}\n\n".encode()
-    with lock:
-        dead = []
-        for client in sse_clients:
-            try:
-                client.write(msg)
-                client.flush()
-            except:
-                dead.append(client)
-        for d in dead:
-            sse_clients.remove(d)
-
-
-def broadcast_console(line):
-    """Broadcast a console line to all console SSE clients."""
-    msg = f"data: {json.dumps({'line': line})}\n\n".encode()
-    with console_lock:
-        dead = []
-        for client in console_clients:
-            try:
-                client.write(msg)
-                client.flush()
-            except:
-                dead.append(client)
-        for d in dead:
-            console_clients.remove(d)
+    for client in sse_clients:
+        client.send(msg, state=True)
+
+
+def broadcast_event(event, payload):
+    """Broadcast a named event (not a scenario update) to all scenario SSE clients."""
+    msg = f"event: {event}\ndata: {json.dumps(payload)}\n\n".encode()
+    for client in sse_clients:
+        client.send(msg)
+
+
+def report_run(label, running, run_id):
+    """Track a run's scenario update and broadcast it.
+
+    A run that finishes while other runs are still active is not broadcast,
+    so the dashboard keeps recording until the last shard is done.
+    """
+    if running is False:
+        runs.pop(run_id, None)
+        progress.pop(run_id, None)
+    else:
+        runs[run_id] = time.time()
+    active = len(runs)
+
+    if running is False and active > 0:
+        return
+    if active > 1:
+        label = f"[{run_id}] {label}"
+    broadcast(label, running=running, run_id=run_id)
+
+
+def console_logs():
+    """Console log files to stream: the main log and those of shards."""
+    return [CONSOLE_LOG] + sorted(glob.glob(SHARD_CONSOLE_LOGS))
+
+
+def console_prefix(path):
+    """Prefix for lines from a shard's console log ("" for the main log)."""
+    name = os.path.basename(path)
+    if path == CONSOLE_LOG:
+        return ""
+    return f"[{name[len('pytest_console_'):-len('.log')]}] "
+
+
+def console_messages(path, lines):
+    """SSE messages of console lines, (number, line), in batches of at most
+    CONSOLE_BATCH_LINES lines or about CONSOLE_BATCH_BYTES.
+
+    data: {"lines": [...]}; main log batches carry their last line number as event id.
+    """
+    prefix = console_prefix(path)
+    messages = []
+    batch = []
+    size = 0
+    for index, (number, line) in enumerate(lines):
+        batch.append(prefix + line.rstrip())
+        size += len(batch[-1])
+        if len(batch) < CONSOLE_BATCH_LINES and size < CONSOLE_BATCH_BYTES and index + 1 < len(lines):
+            continue
+        event_id = f"id: {number}\n" if path == CONSOLE_LOG else ""
+        messages.append(f"{event_id}data: {json.dumps({'lines': batch})}\n\n".encode())
+        batch = []
+        size = 0
+    return messages
+
+
+def send_console(client, path, lines, restarted=False, messages=None):
+    """Queue the lines, (number, line), of a console log the client does not have yet.
+
+    A new run's log (restarted) numbers its lines from 0 again. messages:
+    console_messages() of all the lines, shared by clients that need them all.
+    """
+    if restarted:
+        client.sent.pop(path, None)
+    if not lines:
+        return
+    last = client.sent.get(path, -1)
+    if messages is None or last >= lines[0][0]:
+        messages = console_messages(path, [(number, line) for number, line in lines if number > last])
+    for msg in messages:
+        client.send(msg)
+    client.sent[path] = max(last, lines[-1][0])
+
+
+def broadcast_console(path, lines, restarted=False):
+    """Broadcast new lines of a console log to all console SSE clients.
+
+    Clients still receiving their history keep them in their backlog.
+    """
+    messages = console_messages(path, lines)
+    for client in console_clients:
+        if client.ready:
+            send_console(client, path, lines, restarted, messages)
+        else:
+            client.backlog.append((path, lines, restarted))
 
 
-def monitor_console_log():
-    """Monitor pytest_console.log and broadcast new lines."""
-    file_pos = 0
+def console_notice(dropped):
+    """Console line telling a slow browser that output was skipped."""
+    line = f"[... {dropped} console updates skipped: this browser fell behind ...]"
+    return f"data: {json.dumps({'line': line})}\n\n".encode()
+
+
+def console_history(start):
+    """(path, lines) for a new console client: recent lines, or the main log from line start on."""
+    history = []
+    for path in console_logs():
+        if path == CONSOLE_LOG and start is not None:
+            history.append((path, console_segments.lines_from(path, start)))
+        else:
+            history.append((path, console_segments.recent_lines(path)))
+    return history
+
+
+async def monitor_console_log():
+    """Monitor the console logs and broadcast new lines.
+
+    Wakes up on change notifications where available (dir_watch.py), else
+    every CONSOLE_POLL. After a broadcast it waits CONSOLE_BATCH_INTERVAL,
+    so a burst of output goes out in a few batches instead of line by line.
+    """
+    loop = asyncio.get_running_loop()
+    followers = {}  # path -> console_segments.LogFollower
+    failing = set()  # paths whose last poll failed, reported once until they recover
+    changed = asyncio.Event()
+    watch = dir_watch.DirectoryWatch(SCRIPT_DIR)
+    timeout = CONSOLE_POLL
+    if watch.fd is not None:
+        try:
+            loop.add_reader(watch.fd, lambda: watch.changed("pytest_console") and changed.set())
+            timeout = CONSOLE_RECHECK
+        except NotImplementedError:
+            watch.close()  # Event loop without add_reader (Windows proactor)
     while True:
         try:
-            if os.path.exists(CONSOLE_LOG):
-                with open(CONSOLE_LOG, 'r', encoding='utf-8', errors='replace') as f:
-                    f.seek(file_pos)
-                    new_lines = f.readlines()
-                    file_pos = f.tell()
-                    for line in new_lines:
-                        broadcast_console(line.rstrip())
-        except Exception as e:
+            await asyncio.wait_for(changed.wait(), timeout)
+        except asyncio.TimeoutError:
             pass
-        time.sleep(0.5)
+        changed.clear()
+        for path in console_logs():
+            try:
+                follower = followers.setdefault(path, console_segments.LogFollower(path))
+                lines = await loop.run_in_executor(None, follower.poll)
+                if lines or follower.restarted:
+                    broadcast_console(path, lines, follower.restarted)
+                failing.discard(path)
+            except Exception as e:
+                if path not in failing:
+                    failing.add(path)
+                    print(f"  >> Cannot follow {os.path.basename(path)}: {e!r}")
+        await asyncio.sleep(CONSOLE_BATCH_INTERVAL)
 
 
-def monitor_heartbeat():
-    """Monitor heartbeat and auto-reset if tests stop unexpectedly."""
-    global last_heartbeat_time, current_scenario
+async def monitor_heartbeat():
+    """Monitor heartbeat and auto-reset if tests stop unexpectedly.
 
+    Waking up every second also lets Ctrl+C stop the event loop on Windows.
+    """
     while True:
-        time.sleep(1)
-
-        with heartbeat_lock:
-            if last_heartbeat_time is not None:
-                elapsed = time.time() - last_heartbeat_time
-
-                # If heartbeat timeout and tests were running, reset display
-                if elapsed > HEARTBEAT_TIMEOUT and current_scenario.get("running", False):
-                    print(f"  >> Heartbeat timeout ({elapsed:.1f}s) - Tests stopped unexpectedly")
-                    last_heartbeat_time = None
-                    broadcast("Tests stopped unexpectedly", running=False)
-
-
-class Handler(http.server.BaseHTTPRequestHandler):
-    def do_GET(self):
-        if self.path == "/" or self.path == "/index.html":
-            with open(HTML_FILE, "rb") as f:
-                content = f.read()
-            self.send_response(200)
-            self.send_header("Content-Type", "text/html; charset=utf-8")
-            self.send_header("Content-Length", len(content))
-            self.end_headers()
-            self.wfile.write(content)
-
-        elif self.path == "/events":
-            self.send_response(200)
-            self.send_header("Content-Type", "text/event-stream")
-            self.send_header("Cache-Control", "no-cache")
-            self.end_headers()
-
-            with lock:
-                sse_clients.append(self.wfile)
+        await asyncio.sleep(1)
+
+        now = time.time()
+        expired = {run_id: now - seen for run_id, seen in runs.items()
+                   if now - seen > HEARTBEAT_TIMEOUT}
+        for run_id in expired:
+            del runs[run_id]
+            progress.pop(run_id, None)
+        active = len(runs)
+
+        for run_id, elapsed in expired.items():
+            # If heartbeat timeout and tests were running, reset display
+            if not current_scenario.get("running", False):
+                continue
+            print(f"  >> Heartbeat timeout ({elapsed:.1f}s) - {run_id or 'Tests'} stopped unexpectedly")
+            if active == 0:
+                broadcast("Tests stopped unexpectedly", running=False)
+
+
+async def monitor_clients():
+    """Disconnect SSE clients that lag more than EVICT_LAG seconds."""
+    global evicted
+    while True:
+        await asyncio.sleep(1)
+        for client in list(sse_clients) + list(console_clients):
+            if client.lag > EVICT_LAG:
+                print(f"  >> Disconnecting {client.stream} client {client.peer}: "
+                      f"{client.lag:.0f} s behind, {client.dropped} messages dropped")
+                evicted += 1
+                client.evict()
 
-            try:
-                msg = f"data: {json.dumps(current_scenario)}\n\n"
-                self.wfile.write(msg.encode())
-                self.wfile.flush()
-            except:
-                return
 
-            try:
-                while True:
-                    time.sleep(1)
-            except:
-                pass
-            finally:
-                with lock:
-                    if self.wfile in sse_clients:
-                        sse_clients.remove(self.wfile)
-
-        elif self.path == "/status":
-            self.send_response(200)
-            self.send_header("Content-Type", "application/json")
-            self.end_headers()
-            self.wfile.write(json.dumps(current_scenario).encode())
-
-        elif self.path == "/console":
-            self.send_response(200)
-            self.send_header("Content-Type", "text/event-stream")
-            self.send_header("Cache-Control", "no-cache")
-            self.end_headers()
-
-            with console_lock:
-                console_clients.append(self.wfile)
-
-            # Send existing log content to new client
-            try:
-                if os.path.exists(CONSOLE_LOG):
-                    with open(CONSOLE_LOG, 'r', encoding='utf-8', errors='replace') as f:
-                        for line in f:
-                            msg = f"data: {json.dumps({'line': line.rstrip()})}\n\n"
-                            self.wfile.write(msg.encode())
-                        self.wfile.flush()
-            except:
-                pass
+def client_totals():
+    """Subscriber counts, worst lag and drops for /status."""
+    clients = list(sse_clients) + list(console_clients)
+    return {"events": len(sse_clients), "console": len(console_clients),
+            "max_lag_s": round(max((client.lag for client in clients), default=0.0), 3),
+            "dropped": sum(client.dropped for client in clients), "evicted": evicted}
 
-            try:
-                while True:
-                    time.sleep(1)
-            except:
-                pass
-            finally:
-                with console_lock:
-                    if self.wfile in console_clients:
-                        console_clients.remove(self.wfile)
-
-        elif self.path == "/favicon.ico":
-            self.send_response(204)
-            self.end_headers()
 
-        else:
-            self.send_response(404)
-            self.end_headers()
+async def read_request(reader):
+    """Read one HTTP request; None once the client has closed the connection."""
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+        return None
+    lines = head.decode("latin-1").split("\r\n")
+    method, target, _version = lines[0].split(" ", 2)
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length") or 0)
+    body = await reader.readexactly(length) if length else b""
+    url = urllib.parse.urlparse(target)
+    return Request(method, url.path, urllib.parse.parse_qs(url.query), headers, body)
+
+
+def response(status, body=b"", content_type=None):
+    """A complete response. Connections are kept alive, so it always has a Content-Length."""
+    head = [f"HTTP/1.1 {status} {http.HTTPStatus(status).phrase}", f"Content-Length: {len(body)}"]
+    if content_type:
+        head.append(f"Content-Type: {content_type}")
+    return ("\r\n".join(head) + "\r\n\r\n").encode() + body
+
+
+def json_response(payload):
+    return response(200, json.dumps(payload).encode(), "application/json")
+
+
+async def stream(reader, writer, clients, client, first):
+    """Serve an SSE stream until the browser goes away (or is evicted).
+
+    first: coroutine function queuing the new client's first messages.
+    """
+    writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                 b"Cache-Control: no-cache\r\nConnection: close\r\n\r\n")
+    clients.add(client)
+    sender = asyncio.ensure_future(client.run())
+    closed = asyncio.ensure_future(reader.read())  # Returns once the browser disconnects
+    try:
+        await first(client)
+        await asyncio.wait([sender, closed], return_when=asyncio.FIRST_COMPLETED)
+    except Exception:
+        pass
+    finally:
+        clients.discard(client)
+        sender.cancel()
+        closed.cancel()
+
+
+async def handle_get(request, reader, writer):
+    """Serve a GET. Returns False when the connection is done (SSE streams)."""
+    if request.path == "/" or request.path == "/index.html":
+        with open(HTML_FILE, "rb") as f:
+            content = f.read()
+        writer.write(response(200, content, "text/html; charset=utf-8"))
+
+    elif request.path == "/events":
+        async def first(client):
+            client.send(f"data: {json.dumps(current_scenario)}\n\n".encode(), state=True)
+        await stream(reader, writer, sse_clients, SseClient(writer, "events", EVENTS_QUEUE), first)
+        return False
+
+    elif request.path == "/status":
+        writer.write(json_response({**current_scenario, "runs": sorted(runs),
+                                    "progress": dict(progress), "clients": client_totals()}))
+
+    elif request.path == "/clients":
+        writer.write(json_response([client.stats()
+                                    for client in list(sse_clients) + list(console_clients)]))
+
+    elif request.path == "/console":
+        start = request.headers.get("last-event-id")
+        start = int(start) + 1 if start and start.isdigit() else None
+        if "from" in request.query and request.query["from"][0].isdigit():
+            start = int(request.query["from"][0])
+
+        async def first(client):
+            # Send existing log content to the new client; lines broadcast
+            # while it is read wait in the backlog, so none is missed or repeated
+            loop = asyncio.get_running_loop()
+            for path, lines in await loop.run_in_executor(None, console_history, start):
+                send_console(client, path, lines)
+            for path, lines, restarted in client.backlog:
+                send_console(client, path, lines, restarted)
+            client.backlog = []
+            client.ready = True
+        client = SseClient(writer, "console", CONSOLE_QUEUE, notice=console_notice)
+        await stream(reader, writer, console_clients, client, first)
+        return False
+
+    elif request.path == "/journal":
+        label = request.query.get("label", [None])[0]
+        run_id = request.query.get("run_id", [None])[0]
+        writer.write(json_response([{"run_id": key[0], "label": key[1], "events": events}
+                                    for key, events in journals.items()
+                                    if label in (None, key[1]) and run_id in (None, key[0])]))
+
+    elif request.path == "/timing":
+        run_id = request.query.get("run_id", [None])[0]
+        writer.write(json_response([timing for timing in timings
+                                    if run_id in (None, timing.get("run_id") or "")]))
+
+    elif request.path == "/favicon.ico":
+        writer.write(response(204))
+
+    else:
+        writer.write(response(404))
+    return True
+
+
+def handle_post(request, writer):
+    if request.path == "/scenario":
+        try:
+            data = json.loads(request.body)
+            label = data.get("label", "")
+            running = data.get("running", True)  # Default to True if not specified
+            run_id = data.get("run_id") or ""
+            report_run(label, running, run_id)
+            status = "complete" if not running else "running"
+            print(f"  >> {f'{run_id}: ' if run_id else ''}{label} [{status}]")
+        except Exception as e:
+            print(f"  >> Bad /scenario payload: {e}")
+        writer.write(json_response({"ok": True}))
 
-    def do_POST(self):
-        if self.path == "/scenario":
-            content_length = int(self.headers.get("Content-Length", 0))
-            body = self.rfile.read(content_length)
-            try:
-                data = json.loads(body)
-                label = data.get("label", "")
-                running = data.get("running", True)  # Default to True if not specified
-                broadcast(label, running=running)
-                status = "complete" if not running else "running"
-                print(f"  >> {label} [{status}]")
-            except Exception as e:
-                print(f"  >> Bad /scenario payload: {e}")
-            self.send_response(200)
-            self.send_header("Content-Type", "application/json")
-            self.end_headers()
-            self.wfile.write(b'{"ok":true}')
-
-        elif self.path == "/heartbeat":
-            global last_heartbeat_time
-            with heartbeat_lock:
-                last_heartbeat_time = time.time()
-            self.send_response(200)
-            self.send_header("Content-Type", "application/json")
-            self.end_headers()
-            self.wfile.write(b'{"ok":true}')
+    elif request.path == "/journal":
+        try:
+            data = json.loads(request.body)
+            key = (data.get("run_id") or "", data.get("label", ""))
+            journals.pop(key, None)
+            journals[key] = data.get("events", [])
+            while len(journals) > JOURNAL_HISTORY:
+                journals.popitem(last=False)
+        except Exception as e:
+            print(f"  >> Bad /journal payload: {e}")
+        writer.write(json_response({"ok": True}))
 
-        else:
-            self.send_response(404)
-            self.end_headers()
+    elif request.path == "/timing":
+        try:
+            data = json.loads(request.body)
+            timings.append(data)
+            broadcast_event("timing", data)
+        except Exception as e:
+            print(f"  >> Bad /timing payload: {e}")
+        writer.write(json_response({"ok": True}))
 
-    def log_message(self, format, *args):
+    elif request.path == "/heartbeat":
+        try:
+            data = json.loads(request.body or b"{}")
+        except Exception:
+            data = {}
+        run_id = data.get("run_id") or ""
+        runs[run_id] = time.time()
+        if "total" in data:
+            progress[run_id] = data
+            broadcast_event("progress", data)
+        writer.write(json_response({"ok": True}))
+
+    else:
+        writer.write(response(404))
+
+
+async def handle_connection(reader, writer):
+    """Serve the requests of one connection, kept alive between them (smt_client.py reuses one)."""
+    try:
+        while True:
+            request = await read_request(reader)
+            if request is None:
+                break
+            keep_alive = True
+            if request.method == "GET":
+                keep_alive = await handle_get(request, reader, writer)
+            elif request.method == "POST":
+                handle_post(request, writer)
+            else:
+                writer.write(response(405))
+            if not keep_alive or request.headers.get("connection", "").lower() == "close":
+                break
+            await writer.drain()
+    except Exception:
         pass
+    finally:
+        try:
+            writer.close()
+        except Exception:
+            pass
 
 
-def main():
-    server = http.server.ThreadingHTTPServer(("localhost", PORT), Handler)
-    server_thread = threading.Thread(target=server.serve_forever, daemon=True)
-    server_thread.start()
-
-    # Start console log monitor
-    console_thread = threading.Thread(target=monitor_console_log, daemon=True)
-    console_thread.start()
+async def serve():
+    server = await asyncio.start_server(handle_connection, "localhost", PORT,
+                                        limit=MAX_HEADER_BYTES)
 
-    # Start heartbeat monitor
-    heartbeat_thread = threading.Thread(target=monitor_heartbeat, daemon=True)
-    heartbeat_thread.start()
+    # Start console log, heartbeat and slow client monitors
+    monitors = [asyncio.ensure_future(monitor_console_log()),
+                asyncio.ensure_future(monitor_heartbeat()),
+                asyncio.ensure_future(monitor_clients())]
 
     print(f"Scenario server running on http://localhost:{PORT}")
     print(f"Open http://localhost:{PORT} in Chrome/Edge.")
@@ -240,12 +579,18 @@ def main():
     broadcast("Ready - Run pytest to start", running=False)
 
     try:
-        while True:
-            time.sleep(1)
+        async with server:
+            await server.serve_forever()
+    finally:
+        for monitor in monitors:
+            monitor.cancel()
+
+
+def main():
+    try:
+        asyncio.run(serve())
     except KeyboardInterrupt:
         print("\nShutting down...")
-    finally:
-        server.shutdown()
 
 
 if __name__ == "__main__":
@@ -1,14 +1,11 @@
 import io
-import json
+import shutil
 import time
-import urllib.request
 from pathlib import Path
 from datetime import datetime
 
 from typhoon.api.schematic_editor import SchematicAPI
 
-import allure
-import matplotlib.pyplot as plt
 import pytest
 import typhoon.test.reporting.messages as report
 import typhoon.api.hil as hil
@@ -17,7 +14,27 @@ from typhoon.test import capture, signals
 from typhoon.test.ranges import around
 from typhoon.test.capture import start_capture
 
+import boundary_search
+import capture_plan
+import capture_sink
+import capture_writer
+import compile_pipeline
+import event_journal
+import limit_monitor
+import model_cache
+import model_residency
+import readiness
+import run_manifest
+import scenario_metrics
+import scenario_scheduler
+import scenario_timeline
+import schematic_batch
+import smt_client
+from scenario_timeline import Scenario
+
 mdl = SchematicAPI()
+# All component value changes go through this batch (one save per batch)
+schematic = schematic_batch.PropertyBatch(mdl, model)
 # list of harmonics
 harmonics = []
 harmonics0 = []
@@ -71,19 +88,21 @@ harmonics0.append(harmonic11_0)
 Stiff = 0
 Weak = 1e-3
 
+# Every hil.set_*/prepare_* call is journaled with its capture sample index
+journal = event_journal.EventJournal()
+hil = event_journal.JournaledHil(hil, journal)
+
 # --- Scenario reporting to SMT server ---
+# Reports are queued and sent in order by a background worker (smt_client.py),
+# so a slow or stopped server never delays the scenario.
 def report_scenario(label, running=True):
     """Report the current scenario to the SMT server (if running)."""
-    payload = json.dumps({"label": label, "running": running}).encode("utf-8")
-    req = urllib.request.Request(
-        "http://localhost:8780/scenario",
-        data=payload,
-        headers={"Content-Type": "application/json"},
-    )
-    try:
-        urllib.request.urlopen(req, timeout=2)
-    except Exception:
-        pass  # Server not running - tests still work standalone
+    smt_client.post("/scenario", {"label": label, "running": running, "run_id": RUN_ID})
+
+
+def report_journal(label, events):
+    """Send a scenario's event journal to the SMT server (if running)."""
+    smt_client.post("/journal", {"label": label, "run_id": RUN_ID, "events": events})
 
 # script directory
 FILE_DIR_PATH = Path(__file__).parent
@@ -94,77 +113,176 @@ compiled_model_path = model.get_compiled_model_file(model_path)
 
 # Results folder for .mat files (set during test setup)
 RESULTS_FOLDER = None
+# Run id reported to the SMT server (--run-id, set during test setup)
+RUN_ID = None
+# Load models onto a virtual HIL device (--vhil or no hardware, set during test setup)
+VHIL_DEVICE = False
+# Capture into a Python list instead of streaming to disk (--in-memory-capture)
+IN_MEMORY_CAPTURE = False
+# Simulation step of the loaded model in seconds (set during test setup, None if unknown)
+SIM_STEP = None
+# Working copies of the model for sharded runs, one folder per run id
+SHARDS_FOLDER = FILE_DIR_PATH / ".shards"
+
+# Compiled model cache, keyed by the baseline .tse hash plus component values
+compiled_cache = model_cache.ModelCache()
+MODEL_HASH = None  # set during test setup
+component_values = schematic.values  # component values last written to the schematic
+compiled_values = None  # component values of the model at compiled_model_path
+pipeline = None  # background compiles of upcoming circuits (set during test setup)
+writer = None  # background .mat export of finished captures (set during test setup)
+manifest = None  # run_manifest.RunManifest of the results folder (set during test setup)
+metrics = None  # scenario_metrics.MetricsPipeline analysing finished captures (set during test setup)
+current_label = None  # label of the scenario the running test ran
+# Adaptive current-limit sweeps (--adaptive-sweep, set during test setup)
+SWEEP_RESOLUTION = None  # ohms
+CURRENT_LIMIT = None  # A rms of Ia3 at which current limiting engages (--current-limit)
+
+# Baseline schematic configuration, applied by the setup fixture.
+# Tests declare their full configuration with @pytest.mark.circuit so the
+# scenario order can be grouped by it (see scenario_scheduler.py).
+BASELINE_CIRCUIT = {"R5": 2000, "R6": 2000, "R9": 2000, "R34": 2000, "Lgrid": 0}
+# Schematic property each circuit component is set through
+COMPONENT_PROPERTIES = {"R5": "resistance", "R6": "resistance", "R9": "resistance",
+                        "R34": "resistance", "Lgrid": "inductance"}
 
 def set_resistor_value(resistor_name, new_r_value):
     """Set resistance of an existing resistor in the schematic."""
+    schematic.set(resistor_name, "resistance", new_r_value)
 
-    # Model MUST already be loaded
-    comp = mdl.get_item(resistor_name, item_type="component")
 
-    if comp is None:
-        raise RuntimeError(f"Component '{resistor_name}' not found in schematic")
+def set_inductor_value(inductor_name, new_L_value):
+    """Set inductance of an existing inductor in the schematic."""
+    schematic.set(inductor_name, "inductance", new_L_value)
 
-    # Set resistance
-    mdl.set_property_value(
-        model.prop(comp, "resistance"),
-        float(new_r_value)
-    )
 
-    model.save()
+def circuit(**values):
+    """Return the full schematic configuration: baseline values unless overridden."""
+    return {**BASELINE_CIRCUIT, **values}
 
 
-def set_inductor_value(inductor_name, new_L_value):
-    """Set inductance of an existing inductor in the schematic."""
+def apply_circuit(values):
+    """Set every component of a circuit configuration, saving the model once."""
+    with schematic:
+        for name, value in values.items():
+            schematic.set(name, COMPONENT_PROPERTIES[name], value)
 
-    # Model MUST already be loaded
-    comp = mdl.get_item(inductor_name, item_type="component")
 
-    if comp is None:
-        raise RuntimeError(f"Component '{inductor_name}' not found in schematic")
+def compile_model():
+    """Compile the schematic, reusing a cached build of the same configuration."""
+    global compiled_values
+    if component_values == compiled_values:
+        return  # Compiled model already matches the schematic
+
+    key = model_cache.cache_key(MODEL_HASH, component_values)
+    if pipeline is not None:
+        pipeline.wait(key)  # Built in the background while earlier scenarios ran
+    if compiled_cache.fetch(key, compiled_model_path):
+        print(f"\n  >> Compiled model cache hit ({key[:12]})")
+    else:
+        model.compile()
+        compiled_cache.store(key, compiled_model_path)
+    compiled_values = dict(component_values)
+
+
+def reset_model_state():
+    """Restore sources and SCADA inputs to their defaults without reloading the model."""
+    hil.set_source_sine_waveform("Vg_src", rms=0, frequency=60, phase=0, harmonics_pu=harmonics0)
+    hil.set_source_constant_value("V_bat", value=0)
+    hil.set_scada_input_value("ChrgMos", 0)
+    hil.set_scada_input_value("DisChrgMos", 0)
+    hil.set_scada_input_value("Grid_avai", 0)
+    hil.set_scada_input_value("Load_Dist", 0)
 
-    # Set inductance
-    mdl.set_property_value(
-        model.prop(comp, "inductance"),
-        float(new_L_value)
-    )
 
+# Tracks the compiled model on the HIL device so unchanged models are not reloaded
+residency = model_residency.ModelResidency(hil, reset_model_state)
 
-    model.save()
+
+def load_model():
+    """Load the compiled model onto the HIL device unless it is already there."""
+    residency.load(compiled_model_path, vhil_device=VHIL_DEVICE)
 
 
 # Fixture to load schematic, compile and load compiled model to HIL device
 @pytest.fixture(scope="module")
-def setup():
-    global RESULTS_FOLDER
-
-    # Create timestamped results folder
-    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    RESULTS_FOLDER = FILE_DIR_PATH / "Results" / f"Test_Results_{timestamp}"
+def setup(request):
+    global RESULTS_FOLDER, RUN_ID, VHIL_DEVICE, IN_MEMORY_CAPTURE, SIM_STEP, MODEL_HASH
+    global SWEEP_RESOLUTION, CURRENT_LIMIT
+    global pipeline, writer, manifest, metrics
+    global model_path, compiled_model_path
+
+    # Create results folder named after the run id (start timestamp by default)
+    RUN_ID = request.config.getoption("run_id") or datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    RESULTS_FOLDER = run_manifest.results_folder(RUN_ID)
     RESULTS_FOLDER.mkdir(parents=True, exist_ok=True)
     print(f"\n  >> Results will be saved to: {RESULTS_FOLDER}")
+    # --resume reuses the folder, and its manifest, of an interrupted run
+    manifest = run_manifest.RunManifest(RESULTS_FOLDER)
+    completed = len(manifest.completed())
+    if completed:
+        report_scenario(f"Resuming {RUN_ID}: {completed} scenarios already complete")
+
+    # Metrics of each scenario are computed as soon as its .mat is written
+    metrics_workers = request.config.getoption("metrics_workers")
+    if metrics_workers > 0:
+        metrics = scenario_metrics.MetricsPipeline(RESULTS_FOLDER, workers=metrics_workers)
+
+    SWEEP_RESOLUTION = request.config.getoption("sweep_resolution")
+    CURRENT_LIMIT = request.config.getoption("current_limit")
+
+    IN_MEMORY_CAPTURE = request.config.getoption("in_memory_capture")
+    if not IN_MEMORY_CAPTURE:
+        writer = capture_writer.CaptureWriter(
+            on_written=metrics.ready if metrics is not None else None)
+
+    # Shards of a sharded run run in parallel, so each edits and compiles
+    # its own copy of the model
+    sharded = request.config.getoption("shard_count") > 1
+    if sharded:
+        shard_dir = SHARDS_FOLDER / RUN_ID
+        shard_dir.mkdir(parents=True, exist_ok=True)
+        shard_model = shard_dir / Path(model_path).name
+        shutil.copyfile(model_path, shard_model)
+        model_path = str(shard_model)
+        compiled_model_path = model.get_compiled_model_file(model_path)
+        print(f"  >> Shard working copy: {model_path}")
 
     model.load(model_path)
-
-    try:
-        hw_settings = model.detect_hw_settings()
-        vhil_device = False
-        report.report_message(f"{hw_settings[0]} C{hw_settings[2]} device is used")
-    except Exception:
-        vhil_device = True
+    schematic.clear()
+
+    VHIL_DEVICE = request.config.getoption("vhil")
+    if not VHIL_DEVICE:
+        try:
+            hw_settings = model.detect_hw_settings()
+            report.report_message(f"{hw_settings[0]} C{hw_settings[2]} device is used")
+        except Exception:
+            VHIL_DEVICE = True
+    if VHIL_DEVICE:
         model_device = model.get_model_property_value("hil_device")
         model_config = model.get_model_property_value("hil_configuration_id")
         report.report_message(
             f"Virtual HIL device is used. Model is compiled for {model_device} C{model_config}.")
-    set_resistor_value("R5", 2000)
-    set_resistor_value("R6", 2000)
-    set_resistor_value("R9", 2000)
-    set_resistor_value("R34", 2000)
-    set_inductor_value("Lgrid",0)
+    apply_circuit(BASELINE_CIRCUIT)
     # set_inductor_value("Lgrid1",0)
 
-    model.compile()
+    # Hash the schematic in its baseline configuration, so the cache key
+    # does not depend on whichever values the previous run left behind.
+    MODEL_HASH = model_cache.file_hash(model_path)
+    compile_model()
+
+    workers = request.config.getoption("compile_workers")
+    if workers > 0:
+        pipeline = compile_pipeline.CompilePipeline(
+            model_path, MODEL_HASH, compiled_cache, COMPONENT_PROPERTIES,
+            workers=workers, lookahead=request.config.getoption("compile_ahead"))
 
-    hil.load_model(compiled_model_path, vhil_device=vhil_device)
+    residency.invalidate()
+    load_model()
+    try:
+        SIM_STEP = hil.get_sim_step()
+    except Exception:
+        SIM_STEP = None  # Captures fall back to the fixed settings
     hil.set_source_sine_waveform("Vg_src", rms=0, frequency=60, phase=0, harmonics_pu=harmonics)
     hil.set_source_constant_value("V_bat", value=0)
     hil.set_scada_input_value("ChrgMos", 0)
@@ -177,170 +295,429 @@ def setup():
     summary_data = []
     yield summary_data
 
+    if pipeline is not None:
+        print(f"\n  >> Background compiles: {pipeline.ready} used, {pipeline.failed} failed")
+        pipeline.close()
+        pipeline = None
+
+    finished_writer, writer = writer, None
+    if finished_writer is not None:
+        finished_writer.close()
+        print(f"\n  >> Capture files: {finished_writer.written} written in the background "
+              f"({finished_writer.busy_seconds:.1f} s off the test thread)")
+
+    # After the writer, so the last captures are analysed too
+    if metrics is not None:
+        metrics.close()
+        print(f"\n  >> Scenario metrics: {len(metrics.rows)} scenarios analysed, "
+              f"{metrics.failed} failed, table in {metrics.summary_path}")
+        metrics = None
+
+    print(f"\n  >> Compiled model cache: {compiled_cache.hits} hits, "
+          f"{compiled_cache.misses} compiles")
+    print(f"  >> Schematic updates: {schematic.writes} writes, "
+          f"{schematic.skipped} unchanged, {schematic.saves} saves")
+    print(f"  >> Model loads: {residency.loads} loaded, {residency.skipped} skipped "
+          f"(~{residency.saved_seconds:.1f} s load time saved)")
+    print(f"  >> Settle detection saved {sum(settle_savings.values()):.1f} s "
+          f"over {len(settle_savings)} scenarios")
+    print(f"  >> Limit monitors aborted {len(abort_savings)} failed scenarios, "
+          f"saving {sum(abort_savings.values()):.1f} s of scripted time")
+    for name, result in sweep_results.items():
+        print(f"  >> {name}: {result}")
+    print(f"  >> Capture buffers: {sum(p.samples for p in capture_plans.values()):.0f} samples "
+          f"(fixed settings: {len(capture_plans) * capture_plan.MAX_SAMPLES:.0f})")
+
+    if sharded:
+        shutil.rmtree(shard_dir, ignore_errors=True)
+
+    if finished_writer is not None:
+        finished_writer.raise_failures()
+
+
+@pytest.fixture(autouse=True)
+def prefetch_compiles(request, setup):
+    """Queue background compiles for the circuits of the next scenarios."""
+    if pipeline is None:
+        return
+    items = request.session.items
+    upcoming = items[items.index(request.node) + 1:]
+    circuits = (scenario_scheduler.circuit_of(item) for item in upcoming)
+    pipeline.prefetch(values for values in circuits
+                      if values is not None and values != compiled_values)
+
+
+@pytest.fixture(autouse=True)
+def capture_writes(setup):
+    """Report captures that failed to write in the background as errors of this test."""
+    yield
+    if writer is not None:
+        writer.raise_failures()
+
+
+@pytest.fixture(autouse=True)
+def checkpoint(request, setup):
+    """Record the scenario in the run manifest once its test has passed."""
+    global current_label
+    current_label = None
+    yield
+    report = getattr(request.node, "rep_call", None)
+    if current_label is not None and report is not None and report.passed:
+        callspec = getattr(request.node, "callspec", None)
+        manifest.record(request.node.nodeid, current_label, f"{current_label}.mat",
+                        callspec.params if callspec is not None else {})
+
+
+@pytest.fixture
+def circuit_values(request):
+    """Full schematic configuration declared by the test's circuit marker."""
+    return scenario_scheduler.circuit_of(request.node)
+
+# Settle detection replacing fixed waits (the fixed wait stays the upper bound).
+# Only HIL analog signals can be read; the unit's STATE is a Modbus register.
+# Startup ramp: DC link charged to its nominal voltage, inverter current steady.
+# The cool-downs run after hil.stop_simulation(), when no signal moves, so they stay fixed waits.
+DC_LINK_VOLTAGE = 400  # V, Vdc in the model's init script
+RAMP_LIMITS = [readiness.Limit("Cdc", DC_LINK_VOLTAGE, 0.05 * DC_LINK_VOLTAGE),
+               readiness.Limit("Ia3", None, 0.5)]
+settle_savings = {}  # scenario label -> seconds saved by settle detection
+capture_plans = {}  # scenario label -> capture_plan.CapturePlan used
+abort_savings = {}  # scenario label -> scripted seconds skipped by aborting it
+sweep_results = {}  # sweep name -> boundary found by an adaptive sweep
+
+# Abort rules for scenarios in normal operation (Scenario.limits, see limit_monitor.py):
+# the DC link falls to half of its level after the ramp. The unit's fault code is a
+# Modbus register, and no HIL signal of the model reflects it.
+TRIP_RULES = [limit_monitor.Rule("Cdc", low=0.5, relative=True, arm=10, hold=0.5,
+                                 reason="DC link collapsed")]
+
+# Capture sample rates (Hz) each scenario family's analysis needs (Scenario.sample_rate).
+# pre_cbk captures at the coarsest decimation meeting the rate (see capture_plan.py).
+FAST_TRANSIENT_RATE = 20e3  # current limiting, load and MOSFET steps
+GRID_RATE = 10e3            # grid waveforms, harmonics up to the 11th
+SLOW_RAMP_RATE = 2e3        # battery voltage ramps and steps without the grid
+
+# Actions available to scenario timelines: (t, action, args) calls action(*args)
+TIMELINE_ACTIONS = {
+    "scada": lambda name, value: hil.set_scada_input_value(name, value),
+    "constant": lambda name, value: hil.set_source_constant_value(name, value=value),
+    "sine": lambda name, kwargs: hil.set_source_sine_waveform(name, **kwargs),
+    "prepare_sine": lambda name, kwargs: hil.prepare_source_sine_waveform(name, **kwargs),
+    "settle": lambda limits, max_wait: readiness.wait_until_settled(
+        hil, limits, max_wait, clock=timeline.clock),
+    "end": lambda: None,  # marks the end of a timeline that finishes with a wait
+}
+# Timeline waits check the armed limit rules while a scenario captures
+monitor = limit_monitor.LimitMonitor(hil)
+timeline = scenario_timeline.TimelineRunner(TIMELINE_ACTIONS, monitor.wait)
+timeline_records = {}  # scenario label -> intended/actual time of every step
+
+
+@pytest.fixture
+def scenario(request):
+    """Scenario declared by the test's scenario marker."""
+    return scenario_timeline.scenario_of(request.node)
+
 capturedDataBuffer = []
+active_capture = None  # disk-backed sink of the running capture
 label = []
-def pre_cbk(label):
+def pre_cbk(label, plan=None):
     report_scenario(label)
-    global capturedDataBuffer
+    global capturedDataBuffer, active_capture
     # decimation,numberOfChannels,numberOfSamples
     captureSettings = [150, 9, 5e6]
+    if plan is not None:
+        captureSettings = [plan.decimation, 9, plan.samples]
     # triggerType,triggerSource,threshold,edge,triggerOffset
     triggerSettings = ["Forced"]
     # signals for capturing
     channelSettings = ["Ig1","L4","Vc3", "C2","C3","C4","Cdc","Ia3","VLV2"]
-    # regular Python list is used for data buffer
-    capturedDataBuffer = []
     # Save to timestamped results folder
     output_file = str(RESULTS_FOLDER / f'{label}.mat')
-    # start capture process and if everything is ok continue...
+    # Without the sim step, time_line falls back to the time sent with each chunk
+    sample_time = captureSettings[0] * SIM_STEP if SIM_STEP else None
+    if IN_MEMORY_CAPTURE:
+        # regular Python list is used for data buffer
+        capturedDataBuffer = []
+        capture_start = journal.clock()  # sample 0, before start_capture's latency
+        # start capture process and if everything is ok continue...
+        hil.start_capture(
+            captureSettings,
+            triggerSettings,
+            channelSettings,
+            dataBuffer=capturedDataBuffer,
+            fileName=output_file)
+        journal.begin(label, sample_time, start=capture_start)
+        return
+
+    if active_capture is not None:
+        active_capture.discard()  # Left over from a scenario that failed mid-capture
+    # Chunks stream into a memmap next to output_file; post_cbk exports the .mat
+    active_capture = capture_sink.CaptureSink(output_file, channelSettings, captureSettings[2], sample_time)
+    capture_start = journal.clock()
     hil.start_capture(
         captureSettings,
         triggerSettings,
         channelSettings,
-        dataBuffer=capturedDataBuffer,
-        fileName=output_file)
+        dataBuffer=active_capture.queue)
+    journal.begin(label, sample_time, start=capture_start)
 
 def post_cbk(label):
+    global active_capture
     hil.stop_capture()
+    events = journal.end(label)
+    event_journal.write_journal(str(RESULTS_FOLDER / f'{label}.mat'), events)
+    report_journal(label, events)
+    if active_capture is not None:
+        sink, active_capture = active_capture, None
+        # Exported while the next scenario compiles and loads
+        writer.submit(label, sink)
+    elif IN_MEMORY_CAPTURE and metrics is not None:
+        # Typhoon wrote the .mat in stop_capture()
+        metrics.ready(label, str(RESULTS_FOLDER / f'{label}.mat'))
     report_scenario(label, running="paused")
 
-Scenario_data=[(1,10),(2,8),(3,6),(4,5),(5,4),(6,3),(7,2),(8,1),(9,0.5),(10,0.2)]
-@pytest.mark.parametrize("Scenario_num,R_fault_value",Scenario_data)
 
-def test_SA_CurrentLimit_Line(setup,Scenario_num,R_fault_value):
+def run_scenario(label, circuit_values, scenario):
+    """Configure, load and run one scenario from its declarative description."""
+    violation = play_scenario(label, circuit_values, scenario)
+    if violation is not None:
+        pytest.fail(f"{label} aborted: {violation}")
 
-    label = f"SA_CurrentLimit_Line_R_{Scenario_num}"
 
+def play_scenario(label, circuit_values, scenario):
+    """Run one scenario. Returns the LimitViolation that aborted it, or None."""
+    global current_label
+    current_label = label
     hil.stop_simulation()
-
-    set_resistor_value("R9", R_fault_value)
-    model.compile()
-
-
-    hil.load_model(compiled_model_path, vhil_device=False)
-    hil.set_scada_input_value("Load_Dist", 1)
-
+    apply_circuit(circuit_values)
+    compile_model()
+    load_model()
+    timeline.run(scenario.prepare)
+
+    plan = capture_plan.plan(scenario_timeline.timeline_duration(scenario.timeline),
+                             SIM_STEP, scenario.sample_rate)
+    capture_plans[label] = plan
+    if plan.sample_rate and scenario.sample_rate and plan.sample_rate < scenario.sample_rate:
+        print(f"\n  >> {label}: capturing at {plan.sample_rate:.0f} Hz, below the required "
+              f"{scenario.sample_rate:.0f} Hz, to fit {capture_plan.MAX_SAMPLES} samples")
 
     hil.start_simulation()
-    pre_cbk(label)
-
-    hil.set_source_constant_value("V_bat", value=53)
-    hil.set_scada_input_value("ChrgMos", 1)
-    hil.set_scada_input_value("DisChrgMos", 1)
-
-    hil.wait_sec(10)
-    hil.set_scada_input_value("Load_Dist", 0)
-    hil.wait_sec(2.9952)
-    hil.set_scada_input_value("Load_Dist", 1)
-    hil.wait_sec(2)
-    hil.set_scada_input_value("Load_Dist", 0)
-    hil.wait_sec(4)
-    hil.set_scada_input_value("Load_Dist", 1)
-    hil.wait_sec(5)
-    hil.set_scada_input_value("Load_Dist", 0)
-    hil.wait_sec(1)
-    hil.set_scada_input_value("Load_Dist", 1)
-
-    hil.set_scada_input_value("ChrgMos", 0)
-    hil.set_scada_input_value("DisChrgMos", 0)
-    hil.set_source_constant_value("V_bat", value=50)
+    monitor.verify(scenario.limits)
+    pre_cbk(label, plan)
+    monitor.arm(scenario.limits)
+    try:
+        records = timeline.run(scenario.timeline)
+        violation = None
+    except limit_monitor.LimitViolation as e:
+        violation = e
+    finally:
+        monitor.disarm()
+    if metrics is not None:
+        # An aborted scenario is analysed without its transitions
+        events = scenario_metrics.transitions(records) if violation is None else []
+        metrics.expect(label, events,
+                       scenario_metrics.configured_harmonics([*scenario.prepare, *scenario.timeline]))
     post_cbk(label)
+
+    if violation is not None:
+        # Failed: skip the rest of the timeline, keep the capture for analysis
+        report_scenario(f"{label} FAILED: {violation}", running="paused")
+        hil.stop_simulation()
+        timeline.run(scenario.cleanup)
+        abort_savings[label] = max(
+            0.0, scenario_timeline.timeline_duration(scenario.timeline) - violation.elapsed)
+        return violation
+
+    if scenario.stop_delay:
+        hil.wait_sec(scenario.stop_delay)
     hil.stop_simulation()
+    cleanup = timeline.run(scenario.cleanup)
+
+    timeline_records[label] = records
+    drift = max((abs(r["actual"] - r["intended"]) for r in records
+                 if r["action"] not in scenario_timeline.SHIFTING_ACTIONS), default=0.0)
+    saved = sum(r["saved"] for r in records + cleanup)
+    if saved:
+        settle_savings[label] = saved
+    print(f"\n  >> {label}: max event drift {drift * 1000:.1f} ms, "
+          f"settle detection saved {saved:.1f} s")
+    return None
+
+# --- Shared step lists ---
+# Battery connected and both MOSFETs closed at the start of the timeline
+BATTERY_ON = [(0, "constant", ("V_bat", 53)),
+              (0, "scada", ("ChrgMos", 1)),
+              (0, "scada", ("DisChrgMos", 1))]
+
+# Battery back to 50 V and MOSFETs opened at time t
+def battery_off(t):
+    return [(t, "constant", ("V_bat", 50)),
+            (t, "scada", ("ChrgMos", 0)),
+            (t, "scada", ("DisChrgMos", 0))]
+
+# DAB scenarios: MOSFETs open, grid source off and disconnected after the run
+DAB_RESET = [(0, "scada", ("ChrgMos", 0)),
+             (0, "scada", ("DisChrgMos", 0)),
+             (0, "sine", ("Vg_src", {"rms": 0, "frequency": 60, "phase": 0})),
+             (0, "scada", ("Grid_avai", 0))]
+
+# DAB scenarios: everything off, battery at v_bat, before the simulation starts
+def dab_prepare(load_dist, grid_rms, v_bat):
+    return [(0, "scada", ("Load_Dist", load_dist)),
+            (0, "scada", ("Grid_avai", 0)),
+            (0, "sine", ("Vg_src", {"rms": grid_rms, "frequency": 60, "phase": 0})),
+            (0, "scada", ("ChrgMos", 0)),
+            (0, "scada", ("DisChrgMos", 0)),
+            (0, "constant", ("V_bat", v_bat))]
+
+
+# --- Adaptive current-limit sweeps (--adaptive-sweep, see boundary_search.py) ---
+# Fault resistance range of the fixed grids, in ohms
+FAULT_R_RANGE = (0.2, 10)
+# A probe counts as engaged when Ia3's cycle RMS reaches this fraction of --current-limit
+# (required by --adaptive-sweep: the unit's fault code is not readable as a HIL signal)
+LIMIT_ENGAGED_FRACTION = 0.95
+
+
+def limit_engaged(label):
+    """True if Ia3's cycle RMS reached the current limit in a finished scenario's capture."""
+    if writer is not None:
+        writer.drain()  # The probe's .mat must be on disk
+        writer.raise_failures()
+    rows = scenario_metrics.analyze(label, str(RESULTS_FOLDER / f"{label}.mat"), [], None)
+    peak = next((row.get("rms_max") for row in rows if row.get("channel") == "Ia3"), None)
+    if peak is None:
+        # An empty or unreadable capture says nothing about the boundary
+        errors = "; ".join(row["error"] for row in rows if row.get("error"))
+        pytest.fail(f"{label}: no Ia3 data in the capture to tell whether limiting engaged"
+                    + (f" ({errors})" if errors else ""))
+    return peak >= LIMIT_ENGAGED_FRACTION * CURRENT_LIMIT
+
+
+def sweep_boundary(name, component, build):
+    """Bisect the fault resistance of a current-limit scenario for where limiting engages.
+
+    Every probe runs, and is reported, as its own scenario.
+    """
+    search = boundary_search.BoundarySearch(*FAULT_R_RANGE, SWEEP_RESOLUTION)
+    scenario = build({})
+    while True:
+        value = search.next_value()
+        if value is None:
+            break
+        label = f"{name}_Probe_{len(search.probed) + 1}_R_{value:.3g}"
+        play_scenario(label, circuit(**{component: value}), scenario)
+        engaged = limit_engaged(label)
+        search.record(value, engaged)
+        report_scenario(f"{label}: {'limit engaged' if engaged else 'not engaged'}",
+                        running="paused")
+
+    sweep_results[name] = search.describe(" ohm")
+    report.report_message(f"{name}: {sweep_results[name]}")
+    print(f"\n  >> {name}: {sweep_results[name]}")
+
+
+def sa_current_limit_line(p):
+    return Scenario(
+        prepare=[(0, "scada", ("Load_Dist", 1))],
+        timeline=[
+            *BATTERY_ON,
+            (0, "settle", (RAMP_LIMITS, 10)),
+            (10, "scada", ("Load_Dist", 0)),
+            (12.9952, "scada", ("Load_Dist", 1)),
+            (14.9952, "scada", ("Load_Dist", 0)),
+            (18.9952, "scada", ("Load_Dist", 1)),
+            (23.9952, "scada", ("Load_Dist", 0)),
+            (24.9952, "scada", ("Load_Dist", 1)),
+            (24.9952, "scada", ("ChrgMos", 0)),
+            (24.9952, "scada", ("DisChrgMos", 0)),
+            (24.9952, "constant", ("V_bat", 50)),
+        ],
+        stop_delay=0,
+        cleanup=[],
+        sample_rate=FAST_TRANSIENT_RATE,
+    )
 
 Scenario_data=[(1,10),(2,8),(3,6),(4,5),(5,4),(6,3),(7,2),(8,1),(9,0.5),(10,0.2)]
+@pytest.mark.sweep("grid")
+@pytest.mark.circuit(lambda p: circuit(R9=p["R_fault_value"]))
+@pytest.mark.scenario.with_args(sa_current_limit_line)
 @pytest.mark.parametrize("Scenario_num,R_fault_value",Scenario_data)
-def test_SA_CurrentLimit_Phase(setup,Scenario_num,R_fault_value):
-
-    label = f"SA_CurrentLimit_Phase_R_{Scenario_num}"
-
-    hil.stop_simulation()
-
-    set_resistor_value("R34", R_fault_value)
-    set_resistor_value("R9", 2000)
-    model.compile()
-    hil.load_model(compiled_model_path, vhil_device=False)
-
-    hil.set_scada_input_value("Load_Dist", 0)
+def test_SA_CurrentLimit_Line(setup, circuit_values, scenario, Scenario_num,R_fault_value):
+    run_scenario(f"SA_CurrentLimit_Line_R_{Scenario_num}", circuit_values, scenario)
+
+
+@pytest.mark.sweep("adaptive")
+def test_SA_CurrentLimit_Line_Boundary(setup):
+    sweep_boundary("SA_CurrentLimit_Line", "R9", sa_current_limit_line)
+
+
+def sa_current_limit_phase(p):
+    return Scenario(
+        prepare=[(0, "scada", ("Load_Dist", 0))],
+        timeline=[
+            *BATTERY_ON,
+            (0, "settle", (RAMP_LIMITS, 10)),
+            (10, "scada", ("Load_Dist", 1)),
+            (13, "scada", ("Load_Dist", 0)),
+            (15, "scada", ("Load_Dist", 1)),
+            (19, "scada", ("Load_Dist", 0)),
+            (26, "scada", ("Load_Dist", 1)),
+            (27, "scada", ("Load_Dist", 0)),
+            *battery_off(27),
+        ],
+        stop_delay=1,
+        cleanup=[],
+        sample_rate=FAST_TRANSIENT_RATE,
+    )
 
+Scenario_data=[(1,10),(2,8),(3,6),(4,5),(5,4),(6,3),(7,2),(8,1),(9,0.5),(10,0.2)]
+@pytest.mark.sweep("grid")
+@pytest.mark.circuit(lambda p: circuit(R34=p["R_fault_value"]))
+@pytest.mark.scenario.with_args(sa_current_limit_phase)
+@pytest.mark.parametrize("Scenario_num,R_fault_value",Scenario_data)
+def test_SA_CurrentLimit_Phase(setup, circuit_values, scenario, Scenario_num,R_fault_value):
+    run_scenario(f"SA_CurrentLimit_Phase_R_{Scenario_num}", circuit_values, scenario)
 
 
-    hil.start_simulation()
-    pre_cbk(label)
-    hil.set_source_constant_value("V_bat", value=53)
-    hil.set_scada_input_value("ChrgMos", 1)
-    hil.set_scada_input_value("DisChrgMos", 1)
-    hil.wait_sec(10)
-    hil.set_scada_input_value("Load_Dist", 1)
-    hil.wait_sec(3)
-    hil.set_scada_input_value("Load_Dist", 0)
-    hil.wait_sec(2)
-    hil.set_scada_input_value("Load_Dist", 1)
-    hil.wait_sec(4)
-    hil.set_scada_input_value("Load_Dist", 0)
-    hil.wait_sec(7)
-    hil.set_scada_input_value("Load_Dist", 1)
-    hil.wait_sec(1)
-    hil.set_scada_input_value("Load_Dist", 0)
-    hil.set_source_constant_value("V_bat", value=50)
-    hil.set_scada_input_value("ChrgMos", 0)
-    hil.set_scada_input_value("DisChrgMos", 0)
-    post_cbk(label)
-    hil.wait_sec(1)
-    hil.stop_simulation()
+@pytest.mark.sweep("adaptive")
+def test_SA_CurrentLimit_Phase_Boundary(setup):
+    sweep_boundary("SA_CurrentLimit_Phase", "R34", sa_current_limit_phase)
 
 # connection = 0 ==> Line-to-line  Connection = 1 ===> line-to-neutral
 
+# Grid connected, lost for `gaps[i]` seconds and reconnected, 35 s per connection
+def grid_connection(load_dist, gaps):
+    def build(p):
+        timeline = [*BATTERY_ON,
+                    (0, "settle", (RAMP_LIMITS, 10)),
+                    (10, "sine", ("Vg_src", {"rms": 120, "harmonics_pu": p["harm"]})),
+                    (10, "scada", ("Grid_avai", 1))]
+        t = 10
+        for gap in gaps:
+            t += 30+5
+            timeline.append((t, "scada", ("Grid_avai", 0)))
+            t += gap
+            timeline.append((t, "scada", ("Grid_avai", 1)))
+        t += 30+5
+        timeline += [(t, "scada", ("Grid_avai", 0)), *battery_off(t)]
+        return Scenario(prepare=[(0, "scada", ("Load_Dist", load_dist))],
+                        timeline=timeline, stop_delay=1, cleanup=[],
+                        sample_rate=GRID_RATE, limits=TRIP_RULES)
+    return build
+
 Scenario_data=[(1,harmonics0,1000,Stiff),(2,harmonics0,20,Stiff),
 (3,harmonics0,12,Stiff),(4,harmonics0,5,Stiff),(5,harmonics,1000,Stiff),(6,harmonics,20,Stiff),
 (7,harmonics,12,Stiff),(8,harmonics,5,Stiff),(9,harmonics0,1000,Weak),(10,harmonics0,20,Weak),
 (11,harmonics0,12,Weak),(12,harmonics0,5,Weak),(13,harmonics,1000,Weak),(14,harmonics,20,Weak),
 (15,harmonics,12,Weak),(16,harmonics,5,Weak)]
 
+@pytest.mark.circuit(lambda p: circuit(R9=p["rl"], Lgrid=p["Lg"]))
+@pytest.mark.scenario.with_args(grid_connection(load_dist=0, gaps=(4, 5)))
 @pytest.mark.parametrize("Scenario_num,harm,rl,Lg",Scenario_data)
-def test_GridConnection_lineLoad(setup,Scenario_num,harm,rl,Lg):
-
-    label = f"GridConnection_LineLoad_{Scenario_num}"
-
-    hil.stop_simulation()
-
-    set_resistor_value("R5", 2000)
-    set_resistor_value("R6", 2000)
-    set_resistor_value("R34", 2000)
-    set_resistor_value("R9", rl)
-    set_inductor_value("Lgrid",Lg)
-    model.compile()
-
-    hil.load_model(compiled_model_path, vhil_device=False)
-
-    hil.set_scada_input_value("Load_Dist", 0)
-
-
-    hil.start_simulation()
-
-    pre_cbk(label)
-    hil.set_source_constant_value("V_bat", value=53)
-    hil.set_scada_input_value("ChrgMos", 1)
-    hil.set_scada_input_value("DisChrgMos", 1)
-    hil.wait_sec(10)
-    hil.set_source_sine_waveform("Vg_src", rms=120,harmonics_pu = harm)
-    hil.set_scada_input_value("Grid_avai", 1)
-    hil.wait_sec(30+5)
-    hil.set_scada_input_value("Grid_avai", 0)
-    hil.wait_sec(4)
-    hil.set_scada_input_value("Grid_avai", 1)
-    hil.wait_sec(30+5)
-    hil.set_scada_input_value("Grid_avai", 0)
-    hil.wait_sec(5)
-    hil.set_scada_input_value("Grid_avai", 1)
-    hil.wait_sec(30+5)
-    hil.set_scada_input_value("Grid_avai", 0)
-    hil.set_source_constant_value("V_bat", value=50)
-    hil.set_scada_input_value("ChrgMos", 0)
-    hil.set_scada_input_value("DisChrgMos", 0)
-    post_cbk(label)
-
-    hil.wait_sec(1)
-    hil.stop_simulation()
+def test_GridConnection_lineLoad(setup, circuit_values, scenario, Scenario_num,harm,rl,Lg):
+    run_scenario(f"GridConnection_LineLoad_{Scenario_num}", circuit_values, scenario)
 
 
 Scenario_data=[(1,harmonics0,1000,Stiff),(2,harmonics0,20,Stiff),
@@ -349,188 +726,86 @@ Scenario_data=[(1,harmonics0,1000,Stiff),(2,harmonics0,20,Stiff),
 (11,harmonics0,12,Weak),(12,harmonics0,5,Weak),(13,harmonics,1000,Weak),(14,harmonics,20,Weak),
 (15,harmonics,12,Weak),(16,harmonics,5,Weak)]
 
+@pytest.mark.circuit(lambda p: circuit(R34=p["rl"]*0.5, Lgrid=p["Lg"]))
+@pytest.mark.scenario.with_args(grid_connection(load_dist=1, gaps=(2, 3)))
 @pytest.mark.parametrize("Scenario_num,harm,rl,Lg",Scenario_data)
-def test_GridConnection_PhaseLoad(setup,Scenario_num,harm,rl,Lg):
-
-
-    label = f"GridConnection_PhaseLoad_{Scenario_num}"
-
-    hil.stop_simulation()
-
-    set_resistor_value("R5", 2000)
-    set_resistor_value("R6", 2000)
-    set_resistor_value("R9", 2000)
-    set_resistor_value("R34", rl*0.5)
-    set_inductor_value("Lgrid",Lg)
-    # set_inductor_value("Lgrid1",Lg)
-
-    model.compile()
-
-    hil.load_model(compiled_model_path, vhil_device=False)
-
-    hil.set_scada_input_value("Load_Dist", 1)
-
-
-    hil.start_simulation()
-
-    pre_cbk(label)
-    hil.set_source_constant_value("V_bat", value=53)
-    hil.set_scada_input_value("ChrgMos", 1)
-    hil.set_scada_input_value("DisChrgMos", 1)
-    hil.wait_sec(10)
-    hil.set_source_sine_waveform("Vg_src", rms=120,harmonics_pu = harm)
-    hil.set_scada_input_value("Grid_avai", 1)
-    hil.wait_sec(30+5)
-    hil.set_scada_input_value("Grid_avai", 0)
-    hil.wait_sec(2)
-    hil.set_scada_input_value("Grid_avai", 1)
-    hil.wait_sec(30+5)
-    hil.set_scada_input_value("Grid_avai", 0)
-    hil.wait_sec(3)
-    hil.set_scada_input_value("Grid_avai", 1)
-    hil.wait_sec(30+5)
-    hil.set_scada_input_value("Grid_avai", 0)
-    hil.set_source_constant_value("V_bat", value=50)
-    hil.set_scada_input_value("ChrgMos", 0)
-    hil.set_scada_input_value("DisChrgMos", 0)
-    post_cbk(label)
-
-    hil.wait_sec(1)
-    hil.stop_simulation()
+def test_GridConnection_PhaseLoad(setup, circuit_values, scenario, Scenario_num,harm,rl,Lg):
+    run_scenario(f"GridConnection_PhaseLoad_{Scenario_num}", circuit_values, scenario)
+
+
+def gc_current_limit(p):
+    timeline = [*BATTERY_ON,
+                (0, "settle", (RAMP_LIMITS, 10)),
+                (10, "sine", ("Vg_src", {"rms": 120, "harmonics_pu": p["harm"]})),
+                (10, "scada", ("Grid_avai", 1))]
+    # Voltage sags and swells around 120 V, 2 s each
+    t = 10+20+15
+    for rms in (115, 120, 110, 120, 105, 120):
+        timeline.append((t, "sine", ("Vg_src", {"rms": rms})))
+        t += 2
+    t += 15
+    for rms in (100, 120, 130, 120, 140, 120):
+        timeline.append((t, "sine", ("Vg_src", {"rms": rms})))
+        t += 2
+    t += 15
+    # Frequency steps
+    timeline.append((t, "sine", ("Vg_src", {"frequency": 59})))
+    t += 2+15
+    for frequency in (61, 60):
+        timeline.append((t, "sine", ("Vg_src", {"frequency": frequency})))
+        t += 2
+    # Phase jumps of 10..70 degrees
+    for phase in (10, 0, 20, 0, 30, 0, 40, 0, 50, 0, 60, 0, 70):
+        timeline.append((t, "sine", ("Vg_src", {"phase": phase})))
+        t += 2
+    t += 15
+    timeline.append((t, "scada", ("Grid_avai", 0)))
+    t += 2
+    timeline += battery_off(t)
+    return Scenario(
+        prepare=[(0, "scada", ("Load_Dist", 1)),
+                 (0, "prepare_sine", ("Vg_src", {"rms": 0, "frequency": 60, "phase": 0,
+                                                 "harmonics_pu": p["harm"]}))],
+        timeline=timeline,
+        stop_delay=1,
+        cleanup=[],
+        sample_rate=FAST_TRANSIENT_RATE,
+    )
 
 Scenario_data=[(1,harmonics0,Stiff),(2,harmonics,Stiff),(3,harmonics0,Weak),(4,harmonics,Weak)]
+@pytest.mark.circuit(lambda p: circuit(Lgrid=p["Lg"]))
+@pytest.mark.scenario.with_args(gc_current_limit)
 @pytest.mark.parametrize("Scenario_num,harm,Lg",Scenario_data)
-def test_GC_currentLimit(setup, Scenario_num, harm,Lg):
-
-    label = f"GC_currentlimit_{Scenario_num}"
-    hil.stop_simulation()
-    set_resistor_value("R5", 2000)
-    set_resistor_value("R6", 2000)
-    set_resistor_value("R9", 2000)
-    set_resistor_value("R34", 2000)
-    set_inductor_value("Lgrid",Lg)
-    # set_inductor_value("Lgrid1",Lg)
-
-    model.compile()
-    hil.load_model(compiled_model_path, vhil_device=False)
-
-    hil.set_scada_input_value("Load_Dist", 1)
-
-    hil.prepare_source_sine_waveform("Vg_src", rms=0, frequency=60, phase=0, harmonics_pu=harm)
-
-    hil.start_simulation()
-
-    pre_cbk(label)
-    hil.set_source_constant_value("V_bat", value=53)
-    hil.set_scada_input_value("ChrgMos", 1)
-    hil.set_scada_input_value("DisChrgMos", 1)
-    hil.wait_sec(10)
-    hil.set_source_sine_waveform("Vg_src", rms=120,harmonics_pu = harm)
-    hil.set_scada_input_value("Grid_avai", 1)
-    hil.wait_sec(20+15)
-    hil.set_source_sine_waveform("Vg_src", rms=115)
-    hil.wait_sec(2)
-    hil.set_source_sine_waveform("Vg_src", rms=120)
-    hil.wait_sec(2)
-    hil.set_source_sine_waveform("Vg_src", rms=110)
-    hil.wait_sec(2)
-    hil.set_source_sine_waveform("Vg_src", rms=120)
-    hil.wait_sec(2)
-    hil.set_source_sine_waveform("Vg_src", rms=105)
-    hil.wait_sec(2)
-    hil.set_source_sine_waveform("Vg_src", rms=120)
-    hil.wait_sec(2+15)
-    hil.set_source_sine_waveform("Vg_src", rms=100)
-    hil.wait_sec(2)
-    hil.set_source_sine_waveform("Vg_src", rms=120)
-    hil.wait_sec(2)
-    hil.set_source_sine_waveform("Vg_src", rms=130)
-    hil.wait_sec(2)
-    hil.set_source_sine_waveform("Vg_src", rms=120)
-    hil.wait_sec(2)
-    hil.set_source_sine_waveform("Vg_src", rms=140)
-    hil.wait_sec(2)
-    hil.set_source_sine_waveform("Vg_src", rms=120)
-    hil.wait_sec(2+15)
-    hil.set_source_sine_waveform("Vg_src", frequency=59)
-    hil.wait_sec(2+15)
-    hil.set_source_sine_waveform("Vg_src", frequency=61)
-    hil.wait_sec(2)
-    hil.set_source_sine_waveform("Vg_src", frequency=60)
-    hil.wait_sec(2)
-    hil.set_source_sine_waveform("Vg_src",phase=10)
-    hil.wait_sec(2)
-    hil.set_source_sine_waveform("Vg_src",phase=0)
-    hil.wait_sec(2)
-    hil.set_source_sine_waveform("Vg_src",phase=20)
-    hil.wait_sec(2)
-    hil.set_source_sine_waveform("Vg_src",phase=0)
-    hil.wait_sec(2)
-    hil.set_source_sine_waveform("Vg_src",phase=30)
-    hil.wait_sec(2)
-    hil.set_source_sine_waveform("Vg_src",phase=0)
-    hil.wait_sec(2)
-    hil.set_source_sine_waveform("Vg_src",phase=40)
-    hil.wait_sec(2)
-    hil.set_source_sine_waveform("Vg_src",phase=0)
-    hil.wait_sec(2)
-    hil.set_source_sine_waveform("Vg_src",phase=50)
-    hil.wait_sec(2)
-    hil.set_source_sine_waveform("Vg_src",phase=0)
-    hil.wait_sec(2)
-    hil.set_source_sine_waveform("Vg_src",phase=60)
-    hil.wait_sec(2)
-    hil.set_source_sine_waveform("Vg_src",phase=0)
-    hil.wait_sec(2)
-    hil.set_source_sine_waveform("Vg_src",phase=70)
-    hil.wait_sec(2+15)
-    hil.set_scada_input_value("Grid_avai", 0)
-    hil.wait_sec(2)
-    hil.set_source_constant_value("V_bat", value=50)
-    hil.set_scada_input_value("ChrgMos", 0)
-    hil.set_scada_input_value("DisChrgMos", 0)
-    post_cbk(label)
-
-    hil.wait_sec(1)
-    hil.stop_simulation()
+def test_GC_currentLimit(setup, circuit_values, scenario, Scenario_num, harm,Lg):
+    run_scenario(f"GC_currentlimit_{Scenario_num}", circuit_values, scenario)
+
+
+def startup_bat_first(p):
+    return Scenario(
+        prepare=[(0, "scada", ("Load_Dist", 0)),
+                 (0, "sine", ("Vg_src", {"rms": 0, "frequency": 60, "phase": 0,
+                                         "harmonics_pu": p["harm"]})),
+                 (0, "constant", ("V_bat", 0)),
+                 (0, "scada", ("Grid_avai", 0)),
+                 (0, "scada", ("ChrgMos", 1)),
+                 (0, "scada", ("DisChrgMos", 0))],
+        timeline=[(0, "constant", ("V_bat", 53)),
+                  (0, "scada", ("DisChrgMos", 1)),
+                  (p["Td"], "sine", ("Vg_src", {"rms": 120, "harmonics_pu": p["harm"]})),
+                  (p["Td"], "scada", ("Grid_avai", 1)),
+                  (p["Td"]+30, "end", ())],
+        stop_delay=1,
+        cleanup=[],
+        sample_rate=GRID_RATE,
+        limits=TRIP_RULES,
+    )
 
 Scenario_data=[(1,harmonics0,Stiff,2),(4,harmonics0,Stiff,3),(5,harmonics0,Stiff,4),(6,harmonics0,Weak,0),(7,harmonics0,Weak,1),(8,harmonics0,Weak,2),(9,harmonics0,Weak,3),(10,harmonics0,Weak,4)]#(1,harmonics0,Stiff,0),(2,harmonics0,Stiff,1),
+@pytest.mark.circuit(lambda p: circuit(R9=20, Lgrid=p["Lg"]))
+@pytest.mark.scenario.with_args(startup_bat_first)
 @pytest.mark.parametrize("Scenario_num,harm,Lg,Td",Scenario_data)
-def test_Startup1(setup, Scenario_num, harm,Lg,Td):
-
-    label = f"Startup_GC_Bat_first_{Scenario_num}"
-    hil.stop_simulation()
-    set_resistor_value("R5", 2000)
-    set_resistor_value("R6", 2000)
-    set_resistor_value("R9", 20)
-    set_resistor_value("R34", 2000)
-    set_inductor_value("Lgrid",Lg)
-    # set_inductor_value("Lgrid1",Lg)
-
-    model.compile()
-    hil.load_model(compiled_model_path, vhil_device=False)
-
-    hil.set_scada_input_value("Load_Dist", 0)
-
-    hil.set_source_sine_waveform("Vg_src", rms=0, frequency=60, phase=0, harmonics_pu=harm)
-    hil.set_source_constant_value("V_bat", value=0)
-    hil.set_scada_input_value("Grid_avai", 0)
-    hil.set_scada_input_value("ChrgMos", 1)
-    hil.set_scada_input_value("DisChrgMos", 0)
-
-    hil.start_simulation()
-
-    pre_cbk(label)
-    hil.set_source_constant_value("V_bat", value=53)
-    hil.set_scada_input_value("DisChrgMos", 1)
-    hil.wait_sec(Td)
-    hil.set_source_sine_waveform("Vg_src", rms=120,harmonics_pu = harm)
-    hil.set_scada_input_value("Grid_avai", 1)
-    hil.wait_sec(30)
-    post_cbk(label)
-
-    hil.wait_sec(1)
-    hil.stop_simulation()
+def test_Startup1(setup, circuit_values, scenario, Scenario_num, harm,Lg,Td):
+    run_scenario(f"Startup_GC_Bat_first_{Scenario_num}", circuit_values, scenario)
 
 
 # Scenario_data=[(1,harmonics0,Stiff)]
@@ -570,552 +845,273 @@ def test_Startup1(setup, Scenario_num, harm,Lg,Td):
 V_bat_th_L = 51
 V_bat_th_H = 54
 
+def dab_startup(p):
+    return Scenario(
+        prepare=[(0, "scada", ("ChrgMos", 0)),
+                 (0, "scada", ("DisChrgMos", 0)),
+                 (0, "constant", ("V_bat", p["Vbatery"]))],
+        timeline=[(0, "scada", ("Grid_avai", 1)),
+                  (0, "sine", ("Vg_src", {"rms": p["Vgrid"], "frequency": 60, "phase": 0,
+                                          "harmonics_pu": harmonics0})),
+                  (p["Delay"], "scada", ("ChrgMos", 1)),
+                  (p["Delay"], "scada", ("DisChrgMos", 1)),
+                  (p["Delay"]+20, "end", ())],
+        stop_delay=1,
+        cleanup=[*DAB_RESET, (10, "end", ())],
+        sample_rate=GRID_RATE,
+    )
+
 # Test scenarios for 1.1, 1.2, and 1.3
 Scenario_data=[(1,0,(V_bat_th_L-2),0),(2,0,(V_bat_th_L-2)*1.05,0),(3,0,(V_bat_th_L-2)*0.95,0),(4,120,(V_bat_th_L-2),0),(5,120,(V_bat_th_L-2),2),(6,120,(V_bat_th_L-2),5),(7,120,(V_bat_th_L-2),12),(8,120,(V_bat_th_L-2)*1.05,0),(9,120,(V_bat_th_L-2)*1.05,2),(10,120,(V_bat_th_L-2)*1.05,5),(11,120,(V_bat_th_L-2)*0.95,0),(12,120,(V_bat_th_L-2)*0.95,2),(13,120,(V_bat_th_L-2)*0.95,5),
                 (14,120,(V_bat_th_L-10),0),(15,120,(V_bat_th_L-10),2),(16,120,(V_bat_th_L-10),5),(17,120,(V_bat_th_L-10)*0.8,0),(18,120,(V_bat_th_L-10)*0.8,2),(19,120,(V_bat_th_L-10)*0.8,5)]
 
+@pytest.mark.circuit(lambda p: circuit())
+@pytest.mark.scenario.with_args(dab_startup)
 @pytest.mark.parametrize("Scenario_num,Vgrid,Vbatery,Delay",Scenario_data)
-
-def test_DAB_Startup(setup, Scenario_num, Vgrid,Vbatery,Delay):
-
-    label = f"Startup__DAB_Normal_{Scenario_num}"
-    set_resistor_value("R5", 2000)
-    set_resistor_value("R6", 2000)
-    set_resistor_value("R9", 2000)
-    set_resistor_value("R34", 2000)
-    set_inductor_value("Lgrid",0)
-    # #set_inductor_value("Lgrid1",Lg)
-
-    model.compile()
-    hil.load_model(compiled_model_path, vhil_device=False)
-
-
-    hil.set_scada_input_value("ChrgMos", 0)
-    hil.set_scada_input_value("DisChrgMos", 0)
-    hil.set_source_constant_value("V_bat", value=Vbatery)
-
-
-    hil.start_simulation()
-
-    pre_cbk(label)
-    hil.set_scada_input_value("Grid_avai", 1)
-    hil.set_source_sine_waveform("Vg_src", rms=Vgrid, frequency=60, phase=0, harmonics_pu=harmonics0)
-    hil.wait_sec(Delay)
-    hil.set_scada_input_value("ChrgMos", 1)
-    hil.set_scada_input_value("DisChrgMos", 1)
-    hil.wait_sec(20)
-    post_cbk(label)
-
-    hil.wait_sec(1)
-    hil.stop_simulation()
-
-    hil.set_scada_input_value("ChrgMos", 0)
-    hil.set_scada_input_value("DisChrgMos", 0)
-    hil.set_source_sine_waveform("Vg_src", rms=0, frequency=60, phase=0)
-    hil.set_scada_input_value("Grid_avai", 0)
-    hil.wait_sec(10)
-
+def test_DAB_Startup(setup, circuit_values, scenario, Scenario_num, Vgrid,Vbatery,Delay):
+    run_scenario(f"Startup__DAB_Normal_{Scenario_num}", circuit_values, scenario)
+
+
+def dab_startup_1_4(p):
+    return Scenario(
+        prepare=[(0, "scada", ("ChrgMos", 0)),
+                 (0, "scada", ("DisChrgMos", 0)),
+                 (0, "constant", ("V_bat", 53))],
+        timeline=[(0, "scada", ("Grid_avai", 1)),
+                  (0, "sine", ("Vg_src", {"rms": 120, "frequency": 60, "phase": 0,
+                                          "harmonics_pu": harmonics0})),
+                  (p["Delay"], "scada", ("ChrgMos", 1)),
+                  (p["Delay"], "scada", ("DisChrgMos", 1)),
+                  (p["Delay"]+10, "end", ())],
+        stop_delay=1,
+        cleanup=[*DAB_RESET, (10, "end", ())],
+        sample_rate=GRID_RATE,
+    )
 
 # Test scenarios for 1.4
 Scenario_data=[(1,1),(2,3),(3,5),(4,7)]
 
+@pytest.mark.circuit(lambda p: circuit())
+@pytest.mark.scenario.with_args(dab_startup_1_4)
 @pytest.mark.parametrize("Scenario_num,Delay",Scenario_data)
-
-def test_DAB_Startup_1_4(setup, Scenario_num, Delay):
-
-    label = f"Startup__DAB_Normal_1_4_{Scenario_num}"
-
-    set_resistor_value("R5", 2000)
-    set_resistor_value("R6", 2000)
-    set_resistor_value("R9", 2000)
-    set_resistor_value("R34", 2000)
-    set_inductor_value("Lgrid",0)
-
-    model.compile()
-    hil.load_model(compiled_model_path, vhil_device=False)
-
-
-    hil.set_scada_input_value("ChrgMos", 0)
-    hil.set_scada_input_value("DisChrgMos", 0)
-    hil.set_source_constant_value("V_bat", value=53)
-
-
-    hil.start_simulation()
-
-    pre_cbk(label)
-    hil.set_scada_input_value("Grid_avai", 1)
-    hil.set_source_sine_waveform("Vg_src", rms=120, frequency=60, phase=0, harmonics_pu=harmonics0)
-    hil.wait_sec(Delay)
-    hil.set_scada_input_value("ChrgMos", 1)
-    hil.set_scada_input_value("DisChrgMos", 1)
-    hil.wait_sec(10)
-    post_cbk(label)
-
-    hil.wait_sec(1)
-    hil.stop_simulation()
-
-    hil.set_scada_input_value("ChrgMos", 0)
-    hil.set_scada_input_value("DisChrgMos", 0)
-    hil.set_source_sine_waveform("Vg_src", rms=0, frequency=60, phase=0)
-    hil.set_scada_input_value("Grid_avai", 0)
-    hil.wait_sec(10)
-
+def test_DAB_Startup_1_4(setup, circuit_values, scenario, Scenario_num, Delay):
+    run_scenario(f"Startup__DAB_Normal_1_4_{Scenario_num}", circuit_values, scenario)
+
+
+def dab_startup_mos(p):
+    return Scenario(
+        prepare=[(0, "scada", ("ChrgMos", 0)),
+                 (0, "scada", ("DisChrgMos", 0)),
+                 (0, "constant", ("V_bat", 53))],
+        timeline=[(0, "scada", ("Grid_avai", p["Grid_avai"])),
+                  (0, "sine", ("Vg_src", {"rms": 120, "frequency": 60, "phase": 0,
+                                          "harmonics_pu": harmonics0})),
+                  (2, "scada", ("ChrgMos", p["ChargMos_stat"])),
+                  (2, "scada", ("DisChrgMos", p["DisChrgMos_stat"])),
+                  (32, "end", ())],
+        stop_delay=1,
+        cleanup=[*DAB_RESET, (10, "end", ())],
+        sample_rate=GRID_RATE,
+    )
 
 # Test scenarios for 1.5 , 1.6, 1.7,1.8
 # Scenario #, Grid_avai_stat, ChargMos_stat, DisChrgMos_stat
 Scenario_data=[(1,0,0,1),(2,0,1,0),(3,1,0,1),(4,1,1,0)]
 
+@pytest.mark.circuit(lambda p: circuit(R5=4, R6=4))
+@pytest.mark.scenario.with_args(dab_startup_mos)
 @pytest.mark.parametrize("Scenario_num,Grid_avai,ChargMos_stat,DisChrgMos_stat",Scenario_data)
-
-def test_DAB_Startup_MOS(setup, Scenario_num, Grid_avai, ChargMos_stat, DisChrgMos_stat):
-
-    label = f"Startup__DAB_Normal_MOS_{Scenario_num}"
-
-    set_resistor_value("R5", 4)
-    set_resistor_value("R6", 4)
-    set_resistor_value("R9", 2000)
-    set_resistor_value("R34", 2000)
-    set_inductor_value("Lgrid",0)
-
-    model.compile()
-    hil.load_model(compiled_model_path, vhil_device=False)
-
-
-    hil.set_scada_input_value("ChrgMos", 0)
-    hil.set_scada_input_value("DisChrgMos", 0)
-    hil.set_source_constant_value("V_bat", value=53)
-
-
-
-    hil.start_simulation()
-
-    pre_cbk(label)
-    hil.set_scada_input_value("Grid_avai", Grid_avai)
-    hil.set_source_sine_waveform("Vg_src", rms=120, frequency=60, phase=0, harmonics_pu=harmonics0)
-    hil.wait_sec(2)
-    hil.set_scada_input_value("ChrgMos", ChargMos_stat)
-    hil.set_scada_input_value("DisChrgMos", DisChrgMos_stat)
-    hil.wait_sec(30)
-    post_cbk(label)
-
-    hil.wait_sec(1)
-    hil.stop_simulation()
-
-    hil.set_scada_input_value("ChrgMos", 0)
-    hil.set_scada_input_value("DisChrgMos", 0)
-    hil.set_source_sine_waveform("Vg_src", rms=0, frequency=60, phase=0)
-    hil.set_scada_input_value("Grid_avai", 0)
-    hil.wait_sec(10)
+def test_DAB_Startup_MOS(setup, circuit_values, scenario, Scenario_num, Grid_avai, ChargMos_stat, DisChrgMos_stat):
+    run_scenario(f"Startup__DAB_Normal_MOS_{Scenario_num}", circuit_values, scenario)
+
+
+# Load step: MOSFETs closed at 0, Load_Dist switched to `load_step` at 20 s
+def dab_load_step(load_dist, load_step, cooldown=None):
+    def build(p):
+        cleanup = list(DAB_RESET)
+        if cooldown:
+            cleanup.append((cooldown, "end", ()))
+        return Scenario(
+            prepare=dab_prepare(load_dist, grid_rms=0, v_bat=53),
+            timeline=[(0, "scada", ("ChrgMos", 1)),
+                      (0, "scada", ("DisChrgMos", 1)),
+                      (20, "scada", ("Load_Dist", load_step)),
+                      (40, "end", ())],
+            stop_delay=1,
+            cleanup=cleanup,
+            sample_rate=SLOW_RAMP_RATE,
+        )
+    return build
 
 # Test scenarios for 2.1
 #  10%, 30%, 50%, 70%, 90%, 100%
 Scenario_data=[(1,76.8,6.23),(2,25.6,4.73),(3,15.36,9.216),(4,10.97,12.13),(5,8.53,17.72),(6,7.68,23.04)]#
+@pytest.mark.circuit(lambda p: circuit(R5=p["Rload1"]*0.5, R6=p["Rload1"]*0.5, R9=p["R_sw"]))
+@pytest.mark.scenario.with_args(dab_load_step(load_dist=1, load_step=0, cooldown=20))
 @pytest.mark.parametrize("Scenario_num,Rload1,R_sw",Scenario_data)
-def test_DAB_SA_SS_2_1(setup, Scenario_num, Rload1,R_sw):
-
-    label = f"test_DAB_SA_SS_2_1_{Scenario_num}"
-
-    hil.stop_simulation()
-    set_resistor_value("R5", Rload1*0.5)
-    set_resistor_value("R6", Rload1*0.5)
-    set_resistor_value("R9", R_sw)
-    set_resistor_value("R34", 2000)
-    set_inductor_value("Lgrid",0)
-    # set_inductor_value("Lgrid1",Lg)
-    model.compile()
-    hil.load_model(compiled_model_path, vhil_device=False)
-
-    hil.set_scada_input_value("Load_Dist", 1)
-    hil.set_scada_input_value("Grid_avai", 0)
-    hil.set_source_sine_waveform("Vg_src", rms=0, frequency=60, phase=0)
-    hil.set_scada_input_value("ChrgMos", 0)
-    hil.set_scada_input_value("DisChrgMos", 0)
-    hil.set_source_constant_value("V_bat", value=53)
-
-
-    hil.start_simulation()
-
-    pre_cbk(label)
-    hil.set_scada_input_value("ChrgMos", 1)
-    hil.set_scada_input_value("DisChrgMos", 1)
-    hil.wait_sec(20)
-    hil.set_scada_input_value("Load_Dist", 0)
-    hil.wait_sec(20)
-    post_cbk(label)
-
-    hil.wait_sec(1)
-    hil.stop_simulation()
-
-    hil.set_scada_input_value("ChrgMos", 0)
-    hil.set_scada_input_value("DisChrgMos", 0)
-    hil.set_source_sine_waveform("Vg_src", rms=0, frequency=60, phase=0)
-    hil.set_scada_input_value("Grid_avai", 0)
-    hil.wait_sec(20)
+def test_DAB_SA_SS_2_1(setup, circuit_values, scenario, Scenario_num, Rload1,R_sw):
+    run_scenario(f"test_DAB_SA_SS_2_1_{Scenario_num}", circuit_values, scenario)
 
 
 # Test scenarios for 2.3
 #  10%, 30%, 50%, 70%, 90%, 100% , 125%
 Scenario_data=[(1,76.8),(2,25.6),(3,15.36),(4,10.97),(5,8.53),(6,7.68),(6,5.76)]
+@pytest.mark.circuit(lambda p: circuit(R9=p["R_sw"]))
+@pytest.mark.scenario.with_args(dab_load_step(load_dist=0, load_step=1))
 @pytest.mark.parametrize("Scenario_num,R_sw",Scenario_data)
-def test_DAB_SA_SS_2_3(setup, Scenario_num,R_sw):
-
-    label = f"test_DAB_SA_SS_2_3_{Scenario_num}"
-
-    hil.stop_simulation()
-    set_resistor_value("R5", 2000)
-    set_resistor_value("R6", 2000)
-    set_resistor_value("R9", R_sw)
-    set_resistor_value("R34", 2000)
-    set_inductor_value("Lgrid",0)
-    # set_inductor_value("Lgrid1",Lg)
-    model.compile()
-    hil.load_model(compiled_model_path, vhil_device=False)
-
-    hil.set_scada_input_value("Load_Dist", 0)
-    hil.set_scada_input_value("Grid_avai", 0)
-    hil.set_source_sine_waveform("Vg_src", rms=0, frequency=60, phase=0)
-    hil.set_scada_input_value("ChrgMos", 0)
-    hil.set_scada_input_value("DisChrgMos", 0)
-    hil.set_source_constant_value("V_bat", value=53)
-
-
-
-    hil.start_simulation()
-
-    pre_cbk(label)
-    hil.set_scada_input_value("ChrgMos", 1)
-    hil.set_scada_input_value("DisChrgMos", 1)
-    hil.wait_sec(20)
-    hil.set_scada_input_value("Load_Dist", 1)
-    hil.wait_sec(20)
-    post_cbk(label)
-
-    hil.wait_sec(1)
-    hil.stop_simulation()
-
-    hil.set_scada_input_value("ChrgMos", 0)
-    hil.set_scada_input_value("DisChrgMos", 0)
-    hil.set_source_sine_waveform("Vg_src", rms=0, frequency=60, phase=0)
-    hil.set_scada_input_value("Grid_avai", 0)
+def test_DAB_SA_SS_2_3(setup, circuit_values, scenario, Scenario_num,R_sw):
+    run_scenario(f"test_DAB_SA_SS_2_3_{Scenario_num}", circuit_values, scenario)
 
 
 # Test scenarios for 2.4
 #  10%, 30%, 50%, 70%, 90%, 100% , 125%
 Scenario_data=[(1,76.8),(2,25.6),(3,15.36),(4,10.97),(5,8.53),(6,7.68),(6,5.76)]
+@pytest.mark.circuit(lambda p: circuit(R9=p["R_sw"]))
+@pytest.mark.scenario.with_args(dab_load_step(load_dist=1, load_step=0))
 @pytest.mark.parametrize("Scenario_num,R_sw",Scenario_data)
-def test_DAB_SA_SS_2_4(setup, Scenario_num,R_sw):
-
-    label = f"test_DAB_SA_SS_2_4_{Scenario_num}"
-
-    hil.stop_simulation()
-    set_resistor_value("R5", 2000)
-    set_resistor_value("R6", 2000)
-    set_resistor_value("R9", R_sw)
-    set_resistor_value("R34", 2000)
-    set_inductor_value("Lgrid",0)
-    # set_inductor_value("Lgrid1",Lg)
-    model.compile()
-    hil.load_model(compiled_model_path, vhil_device=False)
-    hil.set_scada_input_value("Grid_avai", 0)
-    hil.set_source_sine_waveform("Vg_src", rms=0, frequency=60, phase=0)
-    hil.set_scada_input_value("Load_Dist", 1)
-    hil.set_scada_input_value("ChrgMos", 0)
-    hil.set_scada_input_value("DisChrgMos", 0)
-    hil.set_source_constant_value("V_bat", value=53)
-
-
-    hil.start_simulation()
-
-    pre_cbk(label)
-    hil.set_scada_input_value("ChrgMos", 1)
-    hil.set_scada_input_value("DisChrgMos", 1)
-    hil.wait_sec(20)
-    hil.set_scada_input_value("Load_Dist", 0)
-    hil.wait_sec(20)
-    post_cbk(label)
-
-    hil.wait_sec(1)
-    hil.stop_simulation()
-
-    hil.set_scada_input_value("ChrgMos", 0)
-    hil.set_scada_input_value("DisChrgMos", 0)
-    hil.set_source_sine_waveform("Vg_src", rms=0, frequency=60, phase=0)
-    hil.set_scada_input_value("Grid_avai", 0)
+def test_DAB_SA_SS_2_4(setup, circuit_values, scenario, Scenario_num,R_sw):
+    run_scenario(f"test_DAB_SA_SS_2_4_{Scenario_num}", circuit_values, scenario)
+
+
+def dab_ss_2_5(p):
+    return Scenario(
+        prepare=dab_prepare(load_dist=1, grid_rms=0, v_bat=53),
+        timeline=[(0, "scada", ("ChrgMos", 1)),
+                  (0, "scada", ("DisChrgMos", 1)),
+                  (20, "scada", ("Load_Dist", 0)),
+                  (20+p["Delay"], "scada", ("Load_Dist", 1)),
+                  (20+2*p["Delay"], "end", ())],
+        stop_delay=1,
+        cleanup=DAB_RESET,
+        sample_rate=FAST_TRANSIENT_RATE,
+    )
 
 # Test scenarios for 2.5
 #  10%, 30%, 50%, 70%, 90%, 100% , 125%
 Scenario_data=[(1,57.6,14.4,0.1),(2,57.6,14.4,0.2)]
+@pytest.mark.circuit(lambda p: circuit(R5=p["Rload"]*0.5, R6=p["Rload"]*0.5, R9=p["R_sw"]))
+@pytest.mark.scenario.with_args(dab_ss_2_5)
 @pytest.mark.parametrize("Scenario_num,Rload,R_sw,Delay",Scenario_data)
-def test_DAB_SA_SS_2_5(setup, Scenario_num,Rload,R_sw,Delay):
-
-    label = f"test_DAB_SA_SS_2_5_{Scenario_num}"
-    hil.stop_simulation()
-    set_resistor_value("R5", Rload*0.5)
-    set_resistor_value("R6", Rload*0.5)
-    set_resistor_value("R9", R_sw)
-    set_resistor_value("R34", 2000)
-    set_inductor_value("Lgrid",0)
-    # set_inductor_value("Lgrid1",Lg)
-    model.compile()
-    hil.load_model(compiled_model_path, vhil_device=False)
-
-    hil.set_scada_input_value("Load_Dist", 1)
-    hil.set_scada_input_value("Grid_avai", 0)
-    hil.set_source_sine_waveform("Vg_src", rms=0, frequency=60, phase=0)
-    hil.set_scada_input_value("ChrgMos", 0)
-    hil.set_scada_input_value("DisChrgMos", 0)
-    hil.set_source_constant_value("V_bat", value=53)
-
-
-    hil.start_simulation()
-
-    pre_cbk(label)
-    hil.set_scada_input_value("ChrgMos", 1)
-    hil.set_scada_input_value("DisChrgMos", 1)
-    hil.wait_sec(20)
-    hil.set_scada_input_value("Load_Dist", 0)
-    hil.wait_sec(Delay)
-    hil.set_scada_input_value("Load_Dist", 1)
-    hil.wait_sec(Delay)
-    post_cbk(label)
-
-    hil.wait_sec(1)
-    hil.stop_simulation()
-
-    hil.set_scada_input_value("ChrgMos", 0)
-    hil.set_scada_input_value("DisChrgMos", 0)
-    hil.set_source_sine_waveform("Vg_src", rms=0, frequency=60, phase=0)
-    hil.set_scada_input_value("Grid_avai", 0)
-
+def test_DAB_SA_SS_2_5(setup, circuit_values, scenario, Scenario_num,Rload,R_sw,Delay):
+    run_scenario(f"test_DAB_SA_SS_2_5_{Scenario_num}", circuit_values, scenario)
+
+
+def dab_ss_2_7(p):
+    return Scenario(
+        prepare=dab_prepare(load_dist=0, grid_rms=120, v_bat=53),
+        timeline=[(0, "scada", ("Grid_avai", 1)),
+                  (5, "scada", ("ChrgMos", 1)),
+                  (5, "scada", ("DisChrgMos", 1)),
+                  (35, "scada", ("Grid_avai", 0)),
+                  (55, "end", ())],
+        stop_delay=1,
+        cleanup=DAB_RESET,
+        sample_rate=GRID_RATE,
+    )
 
 # Test scenarios for 2.7
 #  10%, 30%, 50%, 70%, 90%, 100% , 125%
 Scenario_data=[(1,7.68),(2,5.76)]
+@pytest.mark.circuit(lambda p: circuit(R5=p["Rload"]*0.5, R6=p["Rload"]*0.5))
+@pytest.mark.scenario.with_args(dab_ss_2_7)
 @pytest.mark.parametrize("Scenario_num,Rload",Scenario_data)
-def test_DAB_SA_SS_2_7(setup, Scenario_num,Rload):
-
-    label = f"test_DAB_SA_SS_2_7_{Scenario_num}"
-    hil.stop_simulation()
-    set_resistor_value("R5", Rload*0.5)
-    set_resistor_value("R6", Rload*0.5)
-    set_resistor_value("R9", 2000)
-    set_resistor_value("R34", 2000)
-    set_inductor_value("Lgrid",0)
-    # set_inductor_value("Lgrid1",Lg)
-    model.compile()
-    hil.load_model(compiled_model_path, vhil_device=False)
-
-    hil.set_scada_input_value("Load_Dist", 0)
-    hil.set_scada_input_value("Grid_avai", 0)
-    hil.set_source_sine_waveform("Vg_src", rms=120, frequency=60, phase=0)
-    hil.set_scada_input_value("ChrgMos", 0)
-    hil.set_scada_input_value("DisChrgMos", 0)
-    hil.set_source_constant_value("V_bat", value=53)
-
-
-    hil.start_simulation()
-
-    pre_cbk(label)
-    hil.set_scada_input_value("Grid_avai", 1)
-    hil.wait_sec(5)
-    hil.set_scada_input_value("ChrgMos", 1)
-    hil.set_scada_input_value("DisChrgMos", 1)
-    hil.wait_sec(30)
-    hil.set_scada_input_value("Grid_avai", 0)
-    hil.wait_sec(20)
-    post_cbk(label)
-
-    hil.wait_sec(1)
-    hil.stop_simulation()
-
-    hil.set_scada_input_value("ChrgMos", 0)
-    hil.set_scada_input_value("DisChrgMos", 0)
-    hil.set_source_sine_waveform("Vg_src", rms=0, frequency=60, phase=0)
-    hil.set_scada_input_value("Grid_avai", 0)
+def test_DAB_SA_SS_2_7(setup, circuit_values, scenario, Scenario_num,Rload):
+    run_scenario(f"test_DAB_SA_SS_2_7_{Scenario_num}", circuit_values, scenario)
+
+
+def dab_ss_2_8(p):
+    timeline = [(0, "scada", ("Grid_avai", 1))]
+    # MOSFETs toggled every 0.5 s, starting closed at 2 s
+    t = 2
+    for state in (1, 0, 1, 0, 1, 0, 1):
+        timeline += [(t, "scada", ("ChrgMos", state)),
+                     (t, "scada", ("DisChrgMos", state))]
+        t += 0.5
+    timeline.append((t, "end", ()))
+    return Scenario(
+        prepare=dab_prepare(load_dist=0, grid_rms=120, v_bat=40),
+        timeline=timeline,
+        stop_delay=1,
+        cleanup=DAB_RESET,
+        sample_rate=FAST_TRANSIENT_RATE,
+    )
 
 # Test scenarios for 2.8
 #  10%, 30%, 50%, 70%, 90%, 100% , 125%
 Scenario_data=[(1,10)]
+@pytest.mark.circuit(lambda p: circuit(R5=p["Rload"]*0.5, R6=p["Rload"]*0.5))
+@pytest.mark.scenario.with_args(dab_ss_2_8)
 @pytest.mark.parametrize("Scenario_num,Rload",Scenario_data)
-def test_DAB_SA_SS_2_8(setup, Scenario_num,Rload):
-
-    label = f"test_DAB_SA_SS_2_8_{Scenario_num}"
-    hil.stop_simulation()
-    set_resistor_value("R5", Rload*0.5)
-    set_resistor_value("R6", Rload*0.5)
-    set_resistor_value("R9", 2000)
-    set_resistor_value("R34", 2000)
-    set_inductor_value("Lgrid",0)
-    # set_inductor_value("Lgrid1",Lg)
-    model.compile()
-    hil.load_model(compiled_model_path, vhil_device=False)
-
-    hil.set_scada_input_value("Load_Dist", 0)
-    hil.set_scada_input_value("Grid_avai", 0)
-    hil.set_source_sine_waveform("Vg_src", rms=120, frequency=60, phase=0)
-    hil.set_scada_input_value("ChrgMos", 0)
-    hil.set_scada_input_value("DisChrgMos", 0)
-    hil.set_source_constant_value("V_bat", value=40)
-
-
-    hil.start_simulation()
-
-    pre_cbk(label)
-    hil.set_scada_input_value("Grid_avai", 1)
-    hil.wait_sec(2)
-    hil.set_scada_input_value("ChrgMos", 1)
-    hil.set_scada_input_value("DisChrgMos", 1)
-    hil.wait_sec(0.5)
-    hil.set_scada_input_value("ChrgMos", 0)
-    hil.set_scada_input_value("DisChrgMos", 0)
-    hil.wait_sec(0.5)
-    hil.set_scada_input_value("ChrgMos", 1)
-    hil.set_scada_input_value("DisChrgMos", 1)
-    hil.wait_sec(0.5)
-    hil.set_scada_input_value("ChrgMos", 0)
-    hil.set_scada_input_value("DisChrgMos", 0)
-    hil.wait_sec(0.5)
-    hil.set_scada_input_value("ChrgMos", 1)
-    hil.set_scada_input_value("DisChrgMos", 1)
-    hil.wait_sec(0.5)
-    hil.set_scada_input_value("ChrgMos", 0)
-    hil.set_scada_input_value("DisChrgMos", 0)
-    hil.wait_sec(0.5)
-    hil.set_scada_input_value("ChrgMos", 1)
-    hil.set_scada_input_value("DisChrgMos", 1)
-    hil.wait_sec(0.5)
-    post_cbk(label)
-
-    hil.wait_sec(1)
-    hil.stop_simulation()
-
-    hil.set_scada_input_value("ChrgMos", 0)
-    hil.set_scada_input_value("DisChrgMos", 0)
-    hil.set_source_sine_waveform("Vg_src", rms=0, frequency=60, phase=0)
-    hil.set_scada_input_value("Grid_avai", 0)
+def test_DAB_SA_SS_2_8(setup, circuit_values, scenario, Scenario_num,Rload):
+    run_scenario(f"test_DAB_SA_SS_2_8_{Scenario_num}", circuit_values, scenario)
+
+
+def dab_mode_tran_3_2(p):
+    return Scenario(
+        prepare=dab_prepare(load_dist=1, grid_rms=0, v_bat=53),
+        timeline=[(0, "scada", ("ChrgMos", 1)),
+                  (0, "scada", ("DisChrgMos", 1)),
+                  (20, "constant", ("V_bat", p["Vbat_new"])),
+                  (50, "end", ())],
+        stop_delay=1,
+        cleanup=DAB_RESET,
+        sample_rate=SLOW_RAMP_RATE,
+    )
 
 # Test scenarios for 3.2
 #  10%, 30%, 50%, 70%, 90%, 100% , 125%
 Scenario_data=[(1,15,V_bat_th_L-4),(2,15,V_bat_th_L-10)]
+@pytest.mark.circuit(lambda p: circuit(R5=p["Rload"]*0.5, R6=p["Rload"]*0.5))
+@pytest.mark.scenario.with_args(dab_mode_tran_3_2)
 @pytest.mark.parametrize("Scenario_num,Rload,Vbat_new",Scenario_data)
-def test_DAB_Mode_Tran_3_2(setup, Scenario_num,Rload,Vbat_new):
-
-    label = f"test_DAB_Mode_Tran_3_2_{Scenario_num}"
-    hil.stop_simulation()
-    set_resistor_value("R5", Rload*0.5)
-    set_resistor_value("R6", Rload*0.5)
-    set_resistor_value("R9", 2000)
-    set_resistor_value("R34", 2000)
-    set_inductor_value("Lgrid",0)
-
-    model.compile()
-    hil.load_model(compiled_model_path, vhil_device=False)
-
-    hil.set_scada_input_value("Load_Dist", 1)
-    hil.set_scada_input_value("Grid_avai", 0)
-    hil.set_source_sine_waveform("Vg_src", rms=0, frequency=60, phase=0)
-    hil.set_scada_input_value("ChrgMos", 0)
-    hil.set_scada_input_value("DisChrgMos", 0)
-    hil.set_source_constant_value("V_bat", value=53)
-
-
-    hil.start_simulation()
-
-    pre_cbk(label)
-    hil.set_scada_input_value("ChrgMos", 1)
-    hil.set_scada_input_value("DisChrgMos", 1)
-    hil.wait_sec(20)
-    hil.set_source_constant_value("V_bat", value=Vbat_new)
-    hil.wait_sec(30)
-    post_cbk(label)
-
-    hil.wait_sec(1)
-    hil.stop_simulation()
-
-    hil.set_scada_input_value("ChrgMos", 0)
-    hil.set_scada_input_value("DisChrgMos", 0)
-    hil.set_source_sine_waveform("Vg_src", rms=0, frequency=60, phase=0)
-    hil.set_scada_input_value("Grid_avai", 0)
+def test_DAB_Mode_Tran_3_2(setup, circuit_values, scenario, Scenario_num,Rload,Vbat_new):
+    run_scenario(f"test_DAB_Mode_Tran_3_2_{Scenario_num}", circuit_values, scenario)
+
+
+def dab_mode_tran_3_3(p):
+    return Scenario(
+        prepare=dab_prepare(load_dist=1, grid_rms=0, v_bat=53),
+        timeline=[(0, "scada", ("ChrgMos", 1)),
+                  (0, "scada", ("DisChrgMos", 1)),
+                  (5, "constant", ("V_bat", p["Vbat_new"])),
+                  (5+p["Xs"], "constant", ("V_bat", p["Vbat_new_H"])),
+                  (5+2*p["Xs"], "end", ())],
+        stop_delay=1,
+        cleanup=DAB_RESET,
+        sample_rate=SLOW_RAMP_RATE,
+    )
 
 # Test scenarios for 3.3
 Scenario_data=[(1,1.3,V_bat_th_L-4,V_bat_th_L+2),(2,1.3,V_bat_th_L-10,V_bat_th_L+2),(3,1.3,V_bat_th_L-4,V_bat_th_L+5),(4,1.3,V_bat_th_L-10,V_bat_th_L+5),
                 (5,1,V_bat_th_L-4,V_bat_th_L+2),(6,1,V_bat_th_L-10,V_bat_th_L+2),(7,1,V_bat_th_L-4,V_bat_th_L+5),(8,1,V_bat_th_L-10,V_bat_th_L+5),
                 (9,0.5,V_bat_th_L-4,V_bat_th_L+2),(10,0.5,V_bat_th_L-10,V_bat_th_L+2),(11,0.5,V_bat_th_L-4,V_bat_th_L+5),(12,0.5,V_bat_th_L-10,V_bat_th_L+5)]
+@pytest.mark.circuit(lambda p: circuit(R5=15*0.5, R6=15*0.5))
+@pytest.mark.scenario.with_args(dab_mode_tran_3_3)
 @pytest.mark.parametrize("Scenario_num,Xs,Vbat_new,Vbat_new_H",Scenario_data)
-def test_DAB_Mode_Tran_3_3(setup, Scenario_num, Xs,Vbat_new,Vbat_new_H):
-
-    label = f"test_DAB_Mode_Tran_3_3_{Scenario_num}"
-    hil.stop_simulation()
-    set_resistor_value("R5", 15*0.5)
-    set_resistor_value("R6", 15*0.5)
-    set_resistor_value("R9", 2000)
-    set_resistor_value("R34", 2000)
-    set_inductor_value("Lgrid",0)
-
-    model.compile()
-    hil.load_model(compiled_model_path, vhil_device=False)
-
-    hil.set_scada_input_value("Load_Dist", 1)
-    hil.set_scada_input_value("Grid_avai", 0)
-    hil.set_source_sine_waveform("Vg_src", rms=0, frequency=60, phase=0)
-    hil.set_scada_input_value("ChrgMos", 0)
-    hil.set_scada_input_value("DisChrgMos", 0)
-    hil.set_source_constant_value("V_bat", value=53)
-
-
-    hil.start_simulation()
-
-    pre_cbk(label)
-    hil.set_scada_input_value("ChrgMos", 1)
-    hil.set_scada_input_value("DisChrgMos", 1)
-    hil.wait_sec(5)
-    hil.set_source_constant_value("V_bat", value=Vbat_new)
-    hil.wait_sec(Xs)
-    hil.set_source_constant_value("V_bat", value=Vbat_new_H)
-    hil.wait_sec(Xs)
-    post_cbk(label)
-
-    hil.wait_sec(1)
-    hil.stop_simulation()
-
-    hil.set_scada_input_value("ChrgMos", 0)
-    hil.set_scada_input_value("DisChrgMos", 0)
-    hil.set_source_sine_waveform("Vg_src", rms=0, frequency=60, phase=0)
-    hil.set_scada_input_value("Grid_avai", 0)
+def test_DAB_Mode_Tran_3_3(setup, circuit_values, scenario, Scenario_num, Xs,Vbat_new,Vbat_new_H):
+    run_scenario(f"test_DAB_Mode_Tran_3_3_{Scenario_num}", circuit_values, scenario)
+
+
+def dab_mode_tran_3_4(p):
+    return Scenario(
+        prepare=dab_prepare(load_dist=1, grid_rms=120, v_bat=10),
+        timeline=[(0, "scada", ("ChrgMos", 1)),
+                  (0, "scada", ("DisChrgMos", 1)),
+                  (0, "scada", ("Grid_avai", 1)),
+                  (1, "scada", ("Grid_avai", 0)),
+                  (4, "scada", ("Grid_avai", 1)),
+                  (24, "end", ())],
+        stop_delay=1,
+        cleanup=DAB_RESET,
+        sample_rate=GRID_RATE,
+    )
 
 # Test scenarios for 3.4
 Scenario_data=[(1)]
+# Runs on the 3.3 circuit; it used to rely on 3.3 having loaded it last,
+# which no longer holds once scenarios are grouped by circuit signature.
+@pytest.mark.circuit(lambda p: circuit(R5=15*0.5, R6=15*0.5))
+@pytest.mark.scenario.with_args(dab_mode_tran_3_4)
 @pytest.mark.parametrize("Scenario_num",Scenario_data)
-def test_DAB_Mode_Tran_3_4(setup, Scenario_num):
-
-    label = f"test_DAB_Mode_Tran_3_4_{Scenario_num}"
-
-
-    hil.set_scada_input_value("Load_Dist", 1)
-    hil.set_scada_input_value("Grid_avai", 0)
-    hil.set_source_sine_waveform("Vg_src", rms=120, frequency=60, phase=0)
-    hil.set_scada_input_value("ChrgMos", 0)
-    hil.set_scada_input_value("DisChrgMos", 0)
-    hil.set_source_constant_value("V_bat", value=10)
-
-
-    hil.start_simulation()
-
-    pre_cbk(label)
-    hil.set_scada_input_value("ChrgMos", 1)
-    hil.set_scada_input_value("DisChrgMos", 1)
-    hil.set_scada_input_value("Grid_avai", 1)
-    hil.wait_sec(1)
-    hil.set_scada_input_value("Grid_avai", 0)
-    hil.wait_sec(3)
-    hil.set_scada_input_value("Grid_avai", 1)
-    hil.wait_sec(20)
-    post_cbk(label)
-
-    hil.wait_sec(1)
-    hil.stop_simulation()
-
-    hil.set_scada_input_value("ChrgMos", 0)
-    hil.set_scada_input_value("DisChrgMos", 0)
-    hil.set_source_sine_waveform("Vg_src", rms=0, frequency=60, phase=0)
-    hil.set_scada_input_value("Grid_avai", 0)
+def test_DAB_Mode_Tran_3_4(setup, circuit_values, scenario, Scenario_num):
+    run_scenario(f"test_DAB_Mode_Tran_3_4_{Scenario_num}", circuit_values, scenario)
@@ -0,0 +1,98 @@
+"""
+pytest plugin measuring the suite's orchestration overhead on the mock backend.
+
+Loaded by run_benchmarks.py with mock_typhoon/ on PYTHONPATH. It points the
+timeline, limit monitor, settle detection and event journal at the mock's
+virtual clock, keeps mock builds and durations out of the real compiled
+model cache and scenario duration history, times every report to the SMT server, and records per test:
+
+- wall_s: real time of setup, call and teardown
+- overhead_s: wall time not spent in simulated API latencies (all of it,
+  unless SMT_MOCK_SLEEP=1 makes the latencies real sleeps)
+- hardware_s: virtual time, i.e. what the test would take on the device
+- calls: mock API calls (compile, save, load_model, ...) made by the test
+- reports / report_ms: number of reports to the SMT server and the time the
+  test spent making them
+
+The results are written as JSON to SMT_BENCH_OUTPUT at the end of the session.
+"""
+
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+import model_cache
+import typhoon_mock
+
+
+OUTPUT = os.environ.get("SMT_BENCH_OUTPUT")
+
+results = []
+report_seconds = []  # latency of every report_scenario() call
+
+
+def pytest_configure(config):
+    # Mock durations must never make a real run's ETA
+    config.option.duration_history = Path(typhoon_mock.ARTIFACT_DIR) / "scenario_durations.json"
+
+
+def pytest_collection_finish(session):
+    mod = sys.modules.get("SystemLevel_Scenarios")
+    if mod is None:
+        return
+    # Fast-forwarded waits must count as elapsed time for scheduling and polling
+    mod.timeline.clock = typhoon_mock.clock.now
+    mod.monitor.clock = typhoon_mock.clock.now
+    mod.journal.clock = typhoon_mock.clock.now
+    # Mock builds must never be served to a real run
+    mod.compiled_cache = model_cache.ModelCache(os.path.join(typhoon_mock.ARTIFACT_DIR, "cache"))
+
+    for name in ("report_scenario", "report_journal"):
+        setattr(mod, name, timed(getattr(mod, name)))
+
+
+def timed(report):
+    """Wrap a reporting function to record its latency."""
+    def timed_report(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return report(*args, **kwargs)
+        finally:
+            report_seconds.append(time.perf_counter() - start)
+    return timed_report
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_protocol(item, nextitem):
+    calls_before, simulated_before = typhoon_mock.snapshot()
+    reports_before = len(report_seconds)
+    virtual_start = typhoon_mock.clock.now()
+    start = time.perf_counter()
+    yield
+    wall = time.perf_counter() - start
+    calls_after, simulated_after = typhoon_mock.snapshot()
+
+    slept = 0.0
+    if typhoon_mock.SLEEP:
+        slept = sum(simulated_after.values()) - sum(simulated_before.values())
+    reports = report_seconds[reports_before:]
+    results.append({
+        "test": item.nodeid,
+        "wall_s": wall,
+        "overhead_s": max(0.0, wall - slept),
+        "hardware_s": typhoon_mock.clock.now() - virtual_start,
+        "calls": {name: count - calls_before.get(name, 0)
+                  for name, count in calls_after.items() if count != calls_before.get(name, 0)},
+        "reports": len(reports),
+        "report_ms": 1000 * sum(reports),
+    })
+
+
+def pytest_sessionfinish(session, exitstatus):
+    if OUTPUT:
+        with open(OUTPUT, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=1)
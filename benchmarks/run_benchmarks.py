@@ -0,0 +1,150 @@
+"""
+Benchmark the scenario runner's orchestration overhead without hardware.
+
+Usage:
+    python benchmarks/run_benchmarks.py [-k EXPR] [--server] [--sleep]
+        [--latency compile=5,load_model=1] [--json FILE] [-- <extra pytest arguments>]
+
+Runs SystemLevel_Scenarios.py on the mock Typhoon backend
+(mock_typhoon/typhoon_mock.py) with bench_plugin.py and prints, per
+scenario and in total: real time spent by the runner itself, estimated
+hardware time, compile/save/load calls and HTTP reporting latency.
+
+--server starts SMT_Server.py for the run, so reporting latency includes
+a live server; without it the reports fail fast the way they do when no
+server is running. --sleep turns the simulated latencies into real sleeps,
+so background compiles and capture writes overlap them as on hardware.
+
+The model file SystemLevel_Scenarios.py loads is only read (hashed); if
+it does not exist, a copy of SystemLevel_V2.tse stands in for the run.
+The run's results folder is removed afterwards unless --keep-results.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+MOCK_DIR = os.path.join(ROOT_DIR, "mock_typhoon")
+TEST_FILE = os.path.join(ROOT_DIR, "SystemLevel_Scenarios.py")
+MODEL_FILE = os.path.join(ROOT_DIR, "SystemLevel_V3_SMU_V4.tse")
+STAND_IN_MODEL = os.path.join(ROOT_DIR, "SystemLevel_V2.tse")
+SERVER_URL = "http://localhost:8780/status"
+
+# Mock calls shown as columns, in order
+CALL_COLUMNS = ["compile", "save", "load_model"]
+
+
+def start_server():
+    """Start SMT_Server.py and wait until it answers."""
+    proc = subprocess.Popen([sys.executable, os.path.join(ROOT_DIR, "SMT_Server.py")],
+                            cwd=ROOT_DIR, stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(SERVER_URL, timeout=1)
+            return proc
+        except Exception:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("SMT_Server.py did not start")
+
+
+def print_table(results):
+    """Per-test rows and totals."""
+    header = (f"{'scenario':<48} {'overhead':>9} {'hardware':>9} "
+              + " ".join(f"{name:>10}" for name in CALL_COLUMNS)
+              + f" {'reports':>8} {'report ms':>10}")
+    print(header)
+    print("-" * len(header))
+    for row in results:
+        name = row["test"].split("::")[-1][:48]
+        print(f"{name:<48} {row['overhead_s']:>8.3f}s {row['hardware_s']:>8.1f}s "
+              + " ".join(f"{row['calls'].get(call, 0):>10}" for call in CALL_COLUMNS)
+              + f" {row['reports']:>8} {row['report_ms']:>10.1f}")
+    print("-" * len(header))
+
+    count = max(1, len(results))
+    overhead = sum(row["overhead_s"] for row in results)
+    hardware = sum(row["hardware_s"] for row in results)
+    reports = sum(row["reports"] for row in results)
+    report_ms = sum(row["report_ms"] for row in results)
+    totals = {call: sum(row["calls"].get(call, 0) for row in results) for call in CALL_COLUMNS}
+    print(f"{'total':<48} {overhead:>8.3f}s {hardware:>8.1f}s "
+          + " ".join(f"{totals[call]:>10}" for call in CALL_COLUMNS)
+          + f" {reports:>8} {report_ms:>10.1f}")
+    print(f"\n  >> {len(results)} tests: {1000 * overhead / count:.1f} ms orchestration overhead "
+          f"and {hardware / count:.1f} s estimated hardware time per test; "
+          f"{report_ms / max(1, reports):.2f} ms per HTTP report")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark SystemLevel_Scenarios.py on the mock backend.")
+    parser.add_argument("-k", dest="keyword", help="only run tests matching this pytest -k expression")
+    parser.add_argument("--server", action="store_true", help="start SMT_Server.py for the run")
+    parser.add_argument("--sleep", action="store_true", help="sleep the simulated latencies for real")
+    parser.add_argument("--latency", default="",
+                        help="override simulated latencies, e.g. compile=5,load_model=1 (seconds)")
+    parser.add_argument("--json", metavar="FILE", help="also save the per-test results as JSON")
+    parser.add_argument("--keep-results", action="store_true", help="keep the run's results folder")
+    parser.add_argument("pytest_args", nargs=argparse.REMAINDER,
+                        help="extra pytest arguments, after --")
+    args = parser.parse_args(argv)
+
+    pytest_args = args.pytest_args[1:] if args.pytest_args[:1] == ["--"] else args.pytest_args
+    if args.keyword:
+        pytest_args = [*pytest_args, "-k", args.keyword]
+
+    run_id = datetime.now().strftime("bench_%Y-%m-%d_%H-%M-%S")
+    output = os.path.join(tempfile.gettempdir(), f"smt_{run_id}.json")
+    env = dict(os.environ,
+               PYTHONPATH=os.pathsep.join(filter(None, [MOCK_DIR, BENCH_DIR, ROOT_DIR,
+                                                        os.environ.get("PYTHONPATH")])),
+               SMT_BENCH_OUTPUT=output,
+               SMT_MOCK_LATENCY=args.latency,
+               SMT_MOCK_SLEEP="1" if args.sleep else "0")
+
+    stand_in = not os.path.exists(MODEL_FILE)
+    if stand_in:
+        shutil.copyfile(STAND_IN_MODEL, MODEL_FILE)
+    server = start_server() if args.server else None
+    try:
+        command = [sys.executable, "-m", "pytest", TEST_FILE, "-q", "-p", "bench_plugin",
+                   f"--run-id={run_id}", *pytest_args]
+        code = subprocess.call(command, cwd=ROOT_DIR, env=env)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        if stand_in:
+            os.remove(MODEL_FILE)
+        if not args.keep_results:
+            shutil.rmtree(os.path.join(ROOT_DIR, "Results", f"Test_Results_{run_id}"),
+                          ignore_errors=True)
+
+    try:
+        with open(output, encoding="utf-8") as f:
+            results = json.load(f)
+        os.remove(output)
+    except FileNotFoundError:
+        print("  >> No benchmark results (the run failed before any test finished)")
+        return code or 1
+
+    print()
+    print_table(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=1)
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
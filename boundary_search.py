@@ -0,0 +1,76 @@
+"""
+Adaptive search for the parameter value where a scenario's outcome flips.
+
+The current-limit scenarios sweep a fixed grid of fault resistances to
+find where current limiting engages: ten compiles and ten runs, most of
+them far from the boundary. BoundarySearch bisects the interval instead.
+It assumes the outcome is monotonic in the value: limiting engages below
+the boundary and not above it (a lower fault resistance is a harder
+fault). Each probe halves the bracket, so ~log2(span / resolution) runs
+find the boundary to the requested resolution.
+
+The bracket [engaged, clear] - the largest value that engaged and the
+smallest that did not - is the interval the boundary is known to lie
+in; boundary() reports its midpoint and half-width. Bisection starts
+from the assumption that the search range brackets the boundary; when
+every probe lands on the same side, the range end on that side is
+probed to check, and a range that does not bracket the boundary is
+reported as an open interval.
+"""
+
+
+class BoundarySearch:
+    """Bisect [low, high] until the outcome boundary is known to `resolution`."""
+
+    def __init__(self, low, high, resolution):
+        if not 0 < resolution < high - low:
+            raise ValueError(f"resolution must be between 0 and {high - low:g}")
+        self.low = low
+        self.high = high
+        self.resolution = resolution
+        # Bracket ends; None once the range turned out not to bracket the boundary
+        self.engaged = low    # assumed until probed: the hardest fault engages
+        self.clear = high     # assumed until probed: the mildest fault does not
+        self.probed = {}  # value -> outcome, in probe order
+
+    def next_value(self):
+        """Value to probe next, or None when the search is finished."""
+        if self.engaged is None or self.clear is None:
+            return None  # The range does not bracket the boundary
+        if self.clear - self.engaged > self.resolution:
+            return (self.engaged + self.clear) / 2
+        # Bracket closed on an assumed end: check that end before believing it
+        if self.engaged == self.low and self.low not in self.probed:
+            return self.low
+        if self.clear == self.high and self.high not in self.probed:
+            return self.high
+        return None
+
+    def record(self, value, engaged):
+        """Record the outcome of a probe."""
+        self.probed[value] = engaged
+        if value == self.low and not engaged:
+            self.engaged = None  # Not even the hardest fault engages
+        elif value == self.high and engaged:
+            self.clear = None  # Even the mildest fault engages
+        elif engaged:
+            self.engaged = max(self.engaged, value)
+        else:
+            self.clear = min(self.clear, value)
+
+    def boundary(self):
+        """(estimate, half-width) of the boundary, or None if the range does not bracket it."""
+        if self.engaged is None or self.clear is None:
+            return None
+        return (self.engaged + self.clear) / 2, (self.clear - self.engaged) / 2
+
+    def describe(self, unit=""):
+        """One-line summary of the result."""
+        if self.engaged is None:
+            return f"not engaged anywhere in the range (even at {self.low:g}{unit})"
+        if self.clear is None:
+            return f"engaged over the whole range (even at {self.high:g}{unit})"
+        estimate, half_width = self.boundary()
+        return (f"boundary {estimate:.3g}{unit} +/- {half_width:.2g}{unit} "
+                f"(engaged at {self.engaged:g}{unit}, clear at {self.clear:g}{unit}, "
+                f"{len(self.probed)} runs)")
@@ -0,0 +1,49 @@
+"""
+Capture settings sized to each scenario.
+
+pre_cbk used to capture every scenario with decimation 150 and a buffer of
+5e6 samples, whatever its length or bandwidth. plan() derives both from
+the scenario instead:
+
+- decimation: the coarsest one whose sample rate still meets the rate the
+  scenario declares (Scenario.sample_rate, set per scenario family in its
+  builder). Scenarios without one keep DEFAULT_DECIMATION.
+- samples: the capture window (the scenario's timeline) plus a margin at
+  that rate. Windows that would need more than MAX_SAMPLES are captured at
+  a coarser decimation rather than cut short.
+
+Without the simulation step the sample rate is unknown, and the fixed
+settings are used.
+"""
+
+import collections
+import math
+
+
+DEFAULT_DECIMATION = 150
+MAX_SAMPLES = 5_000_000
+MARGIN = 0.1       # extra fraction of the capture window
+MIN_MARGIN = 2.0   # but at least this many seconds
+
+CapturePlan = collections.namedtuple("CapturePlan", ["decimation", "samples", "sample_rate"])
+
+
+def plan(duration, sim_step, sample_rate=None):
+    """Capture settings for a window of duration seconds.
+
+    sim_step is the model's simulation step in seconds, sample_rate the
+    minimum rate in Hz the scenario needs (None for the default decimation).
+    """
+    if not sim_step:
+        return CapturePlan(DEFAULT_DECIMATION, MAX_SAMPLES, None)
+
+    if sample_rate:
+        # Small tolerance so an exact ratio is not rounded down by float error
+        decimation = max(1, int(1.0 / (sim_step * sample_rate) + 1e-9))
+    else:
+        decimation = DEFAULT_DECIMATION
+
+    window = duration + max(MIN_MARGIN, duration * MARGIN)
+    decimation = max(decimation, math.ceil(window / (sim_step * MAX_SAMPLES)))
+    samples = math.ceil(window / (sim_step * decimation))
+    return CapturePlan(decimation, samples, 1.0 / (sim_step * decimation))
@@ -0,0 +1,158 @@
+"""
+Disk-backed sink for HIL captures.
+
+With a plain list as dataBuffer, hil.start_capture() keeps every sample of
+every channel as Python objects until the capture stops. CaptureSink
+passes a queue instead, so the capture runs in continuous mode and hands
+over data in chunks as it arrives; a drain thread copies each chunk into a
+preallocated float32 memory-mapped file, one column per channel, and lets
+it go. Peak memory is a few chunks regardless of the scenario length.
+
+close() stops the drain, exports the .mat (mat_export.py) and removes the
+memmap (<label>.mat.samples and <label>.mat.time); a crashed run leaves
+them behind, and remove_leftovers() clears them when the run is resumed:
+
+    sink = CaptureSink(output_file, channelSettings, max_samples, sample_time)
+    hil.start_capture(captureSettings, triggerSettings, channelSettings,
+                      dataBuffer=sink.queue)
+    ...
+    hil.stop_capture()
+    sink.close()
+"""
+
+import os
+import queue
+import threading
+from pathlib import Path
+
+import numpy as np
+
+import mat_export
+
+
+FLUSH_SAMPLES = 1 << 20  # flush the memmap to disk after this many samples
+DATA_SUFFIX = ".samples"  # memmap files, appended to the .mat path
+TIME_SUFFIX = ".time"
+
+_STOP = object()
+
+
+class CaptureSink:
+    """Stream capture chunks into a float32 memmap and export them as .mat."""
+
+    def __init__(self, mat_path, channels, max_samples, sample_time=None):
+        self.mat_path = mat_path
+        self.channels = list(channels)
+        self.max_samples = int(max_samples)
+        self.sample_time = sample_time  # seconds per sample, if chunks carry no time
+        self.samples = 0
+        self.dropped = 0
+        self.error = None
+        self.queue = queue.Queue()
+
+        self.data_path = mat_path + DATA_SUFFIX
+        self.time_path = mat_path + TIME_SUFFIX
+        shape = (self.max_samples, len(self.channels))
+        self.data = np.memmap(self.data_path, dtype=np.float32, mode="w+", shape=shape, order="F")
+        self.time = np.memmap(self.time_path, dtype=np.float64, mode="w+", shape=(self.max_samples,))
+
+        self.thread = threading.Thread(target=self._drain, daemon=True)
+        self.thread.start()
+
+    def _drain(self):
+        unflushed = 0
+        while True:
+            chunk = self.queue.get()
+            if chunk is _STOP:
+                break
+            if self.error is not None:
+                continue  # Keep emptying the queue, the capture is lost anyway
+            try:
+                unflushed += self.write(chunk)
+                if unflushed >= FLUSH_SAMPLES:
+                    self.data.flush()
+                    self.time.flush()
+                    unflushed = 0
+            except Exception as e:
+                self.error = e
+
+    def write(self, chunk):
+        """Append one chunk. Returns the number of samples stored.
+
+        A chunk is either a (channels x samples) array or a
+        (signal names, data, time) sequence as delivered by the capture.
+        """
+        times = None
+        if (isinstance(chunk, (tuple, list)) and len(chunk) == 3
+                and all(isinstance(name, str) for name in chunk[0])):
+            _, chunk, times = chunk
+        data = np.asarray(chunk, dtype=np.float32)
+        if data.ndim == 1:
+            data = data.reshape(len(self.channels), -1)
+        if data.shape[0] != len(self.channels):
+            data = data.T  # samples x channels
+
+        count = data.shape[1]
+        start = self.samples
+        stored = max(0, min(count, self.max_samples - start))
+        self.dropped += count - stored
+        if stored == 0:
+            return 0
+
+        self.data[start:start + stored, :] = data[:, :stored].T
+        if times is not None:
+            self.time[start:start + stored] = np.asarray(times, dtype=np.float64)[:stored]
+        elif self.sample_time is not None:
+            self.time[start:start + stored] = np.arange(start, start + stored) * self.sample_time
+        else:
+            self.time[start:start + stored] = np.arange(start, start + stored)
+        self.samples = start + stored
+        return stored
+
+    def stop(self):
+        """Wait until every queued chunk is stored."""
+        if self.thread.is_alive():
+            self.queue.put(_STOP)
+            self.thread.join()
+
+    def close(self, compress=False):
+        """Stop draining, export the .mat file and remove the memmap files."""
+        try:
+            self.stop()
+            if self.error is not None:
+                raise RuntimeError(f"Capture to {self.mat_path} failed: {self.error}")
+            if self.dropped:
+                print(f"\n  >> Capture buffer full: {self.dropped} samples dropped "
+                      f"from {os.path.basename(self.mat_path)}")
+            self.data.flush()
+            self.time.flush()
+            mat_export.write_capture(
+                self.mat_path, self.time,
+                {name: self.data[:, i] for i, name in enumerate(self.channels)},
+                self.samples, compress=compress)
+        finally:
+            self.discard()
+
+    def discard(self):
+        """Drop the capture without exporting it."""
+        self.stop()
+        # Release the mappings before removing the files (required on Windows)
+        self.data = self.time = None
+        for path in (self.data_path, self.time_path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def remove_leftovers(folder):
+    """Remove the memmap files of captures a crashed run never closed. Returns how many."""
+    removed = 0
+    for suffix in (DATA_SUFFIX, TIME_SUFFIX):
+        for path in Path(folder).glob(f"*.mat{suffix}"):
+            try:
+                path.unlink()
+                removed += 1
+            except OSError:
+                pass
+    return removed
@@ -0,0 +1,105 @@
+"""
+Background finalization of scenario captures.
+
+Exporting a capture to .mat (capture_sink.py) takes seconds for long
+scenarios. CaptureWriter does it on a thread, so post_cbk returns as soon
+as hil.stop_capture() has, and the next scenario's compile and load
+overlap with writing and compressing the previous file. The queue is
+bounded: when MAX_PENDING captures are waiting, post_cbk blocks until one
+is written, so memmap files cannot pile up on disk.
+
+An on_written(label, mat_path) callback runs on the writer thread after
+each successful write; the test module uses it to start analysing the
+file (scenario_metrics.py). Failed writes, and callbacks that raised,
+are kept until raise_failures() reports them; the test module calls it
+after every test, so a failure surfaces as an error of the test running
+when it was detected. conftest.py calls drain_all()
+before reporting the session as complete.
+"""
+
+import queue
+import threading
+import time
+
+
+MAX_PENDING = 2  # captures waiting to be written before post_cbk blocks
+
+_active = set()
+_active_lock = threading.Lock()
+
+
+class CaptureWriter:
+    """Export stopped captures to .mat on a background thread."""
+
+    def __init__(self, max_pending=MAX_PENDING, compress=True, on_written=None):
+        self.compress = compress
+        self.on_written = on_written
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.failures = []  # (label, exception) not reported yet
+        self.failures_lock = threading.Lock()
+        self.written = 0
+        self.busy_seconds = 0.0  # time spent writing, off the test thread
+
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        with _active_lock:
+            _active.add(self)
+
+    def submit(self, label, sink):
+        """Queue a stopped capture for export. Blocks while the queue is full."""
+        self.queue.put((label, sink))
+
+    def _run(self):
+        while True:
+            job = self.queue.get()
+            try:
+                if job is None:
+                    return
+                label, sink = job
+                start = time.perf_counter()
+                try:
+                    sink.close(compress=self.compress)
+                except Exception as e:
+                    with self.failures_lock:
+                        self.failures.append((label, e))
+                else:
+                    self.written += 1
+                    try:
+                        if self.on_written is not None:
+                            self.on_written(label, sink.mat_path)
+                    except Exception as e:  # Keep the thread alive, or submit() blocks forever
+                        with self.failures_lock:
+                            self.failures.append(
+                                (label, RuntimeError(f"written, but on_written failed: "
+                                                     f"{type(e).__name__}: {e}")))
+                self.busy_seconds += time.perf_counter() - start
+            finally:
+                self.queue.task_done()
+
+    def drain(self):
+        """Block until every queued capture is written."""
+        self.queue.join()
+
+    def raise_failures(self):
+        """Raise for captures that failed to write since the last call."""
+        with self.failures_lock:
+            failures, self.failures = self.failures, []
+        if failures:
+            raise RuntimeError("Capture finalization failed: " + "; ".join(
+                f"{label}: {e}" for label, e in failures))
+
+    def close(self):
+        """Write all pending captures, then stop the thread."""
+        with _active_lock:
+            _active.discard(self)
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+
+
+def drain_all():
+    """Wait for the pending writes of every active writer."""
+    with _active_lock:
+        writers = list(_active)
+    for writer in writers:
+        writer.drain()
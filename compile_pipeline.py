@@ -0,0 +1,128 @@
+"""
+Background compilation of upcoming model variants.
+
+While one scenario runs on the HIL device, CompilePipeline compiles the
+circuit configurations of the next scenarios in a process pool. Every
+variant is built in its own copy of the .tse, and the result goes into the
+compiled model cache (model_cache.py), so when the scenario comes up its
+compile_model() finds the build ready - or waits for the one in progress.
+
+conftest.py cancels all pipelines on Ctrl+C through cancel_all().
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import model_cache
+import schematic_batch
+
+
+_active = set()
+_active_lock = threading.Lock()
+
+
+def compile_variant(base_model, workdir, values, properties, key, cache_dir, max_bytes):
+    """Worker: compile one circuit configuration and store it in the cache."""
+    from typhoon.api.schematic_editor import SchematicAPI
+
+    variant_dir = os.path.join(workdir, key[:16])
+    os.makedirs(variant_dir, exist_ok=True)
+    variant_path = os.path.join(variant_dir, os.path.basename(base_model))
+    shutil.copyfile(base_model, variant_path)
+
+    try:
+        mdl = SchematicAPI()
+        mdl.load(variant_path)
+        with schematic_batch.PropertyBatch(mdl, mdl) as batch:
+            for name, value in values.items():
+                batch.set(name, properties[name], value)
+        if mdl.compile() is False:
+            raise RuntimeError(f"Background compile failed for {values}")
+        compiled = mdl.get_compiled_model_file(variant_path)
+        model_cache.ModelCache(cache_dir, max_bytes).store(key, compiled)
+    finally:
+        shutil.rmtree(variant_dir, ignore_errors=True)
+    return key
+
+
+class CompilePipeline:
+    """Compile the next few distinct circuit configurations ahead of time."""
+
+    def __init__(self, model_path, model_hash, cache, properties, workers=1, lookahead=2):
+        self.model_hash = model_hash
+        self.cache = cache
+        self.properties = properties
+        self.lookahead = lookahead
+        self.pending = {}  # cache key -> Future
+        self.ready = 0     # builds picked up from the pipeline
+        self.failed = 0
+
+        # Snapshot the baseline schematic: the original file keeps changing
+        # while scenarios run, but every variant must start from the same one.
+        self.workdir = tempfile.mkdtemp(prefix="smt_compile_")
+        self.base_model = os.path.join(self.workdir, os.path.basename(model_path))
+        shutil.copyfile(model_path, self.base_model)
+
+        self.executor = ProcessPoolExecutor(max_workers=workers)
+        with _active_lock:
+            _active.add(self)
+
+    def prefetch(self, circuits):
+        """Queue compiles for the first distinct, not yet built circuits."""
+        queued = sum(1 for f in self.pending.values() if not f.done())
+        for values in circuits:
+            if queued >= self.lookahead:
+                break
+            key = model_cache.cache_key(self.model_hash, values)
+            if key in self.pending or self.cache.contains(key):
+                continue
+            self.pending[key] = self.executor.submit(
+                compile_variant, self.base_model, self.workdir, dict(values),
+                self.properties, key, self.cache.cache_dir, self.cache.max_bytes)
+            queued += 1
+
+    def wait(self, key):
+        """Block until a queued compile of key finishes. Returns True if it succeeded."""
+        future = self.pending.pop(key, None)
+        if future is None:
+            return False
+        try:
+            future.result()
+        except Exception as e:
+            self.failed += 1
+            print(f"\n  >> Background compile failed, compiling inline: {e}")
+            return False
+        self.ready += 1
+        return True
+
+    def cancel(self):
+        """Drop queued compiles and stop the workers without waiting."""
+        for future in self.pending.values():
+            future.cancel()
+        self.pending.clear()
+        self.executor.shutdown(wait=False)
+
+    def close(self):
+        """Wait for running compiles, then remove the working copies."""
+        with _active_lock:
+            _active.discard(self)
+        for future in self.pending.values():
+            future.cancel()
+        self.pending.clear()
+        self.executor.shutdown(wait=True)
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+def cancel_all():
+    """Cancel every active pipeline (used by the Ctrl+C handler)."""
+    with _active_lock:
+        pipelines = list(_active)
+        _active.clear()
+    for pipeline in pipelines:
+        try:
+            pipeline.cancel()
+        except Exception:
+            pass
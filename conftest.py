@@ -3,98 +3,271 @@ pytest configuration plugin for SMT console output streaming.
 
 This plugin captures all pytest output (test results, errors, progress)
 and writes it to pytest_console.log in real-time so the browser console
-can display it via the scenario server.
+can display it via the scenario server. The log is split into compressed,
+size-capped segments (console_segments.py).
 """
 
 import os
+import queue
 import sys
 import signal
 import threading
 import time
+from datetime import datetime
+from pathlib import Path
+
 import pytest
 from _pytest.config import Config
 from _pytest.terminal import TerminalReporter
 
+import capture_sink
+import capture_writer
+import compile_pipeline
+import console_segments
+import run_manifest
+import scenario_history
+import scenario_scheduler
+import smt_client
+import scenario_timeline
+
+
+# Per-test phase timing (compile, load, waits, ...) of the run
+pytest_plugins = ["phase_timing"]
 
 CONSOLE_LOG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pytest_console.log")
 HEARTBEAT_INTERVAL = 2  # Send heartbeat every 2 seconds
+CONSOLE_FLUSH_INTERVAL = 0.2  # Console log written at most this long after the text
+CONSOLE_FLUSH_BYTES = 64 * 1024  # ... or as soon as this much text is waiting
 
 
-def send_test_stopped():
+def console_log_path(config):
+    """Console log of this run; shards of a sharded run each write their own."""
+    if config.getoption("shard_count") > 1:
+        return os.path.join(os.path.dirname(CONSOLE_LOG),
+                            f"pytest_console_{config.getoption('run_id')}.log")
+    return CONSOLE_LOG
+
+
+def send_test_stopped(run_id=None):
     """Send notification to SMT server that tests have stopped."""
-    import json
-    import urllib.request
-    try:
-        payload = json.dumps({"label": "Tests stopped", "running": False}).encode("utf-8")
-        req = urllib.request.Request(
-            "http://localhost:8780/scenario",
-            data=payload,
-            headers={"Content-Type": "application/json"},
-        )
-        urllib.request.urlopen(req, timeout=1)
-    except Exception:
-        pass  # Server not running - ignore
-
-
-def send_heartbeat():
-    """Send heartbeat to SMT server to indicate tests are still running."""
-    import json
-    import urllib.request
-    try:
-        req = urllib.request.Request(
-            "http://localhost:8780/heartbeat",
-            data=b'{}',
-            headers={"Content-Type": "application/json"},
-        )
-        urllib.request.urlopen(req, timeout=1)
-    except Exception:
-        pass  # Server not running - ignore
-
-
-def heartbeat_worker(stop_event):
-    """Background thread that sends periodic heartbeats while tests run."""
+    smt_client.post("/scenario", {"label": "Tests stopped", "running": False, "run_id": run_id})
+    smt_client.flush(timeout=1)  # The process is about to stop
+
+
+def send_heartbeat(run_id=None, progress=None):
+    """Send heartbeat to SMT server to indicate tests are still running.
+
+    progress: test counts and ETA (scenario_history.RunProgress.snapshot()).
+    """
+    smt_client.heartbeat({"run_id": run_id, **(progress or {})})
+
+
+def heartbeat_worker(stop_event, run_id=None, progress=None):
+    """Background thread that sends periodic heartbeats while tests run.
+
+    progress: callable returning the run's progress, or None before collection.
+    """
     while not stop_event.is_set():
-        send_heartbeat()
+        send_heartbeat(run_id, progress() if progress is not None else None)
         # Use wait() instead of sleep() so we can stop quickly
         stop_event.wait(HEARTBEAT_INTERVAL)
 
 
+class ConsoleLogWriter:
+    """Writes console text to the log file on a background thread.
+
+    Writing and flushing the log for every fragment of output cost a system
+    call each on the thread driving the HIL. Text is handed over through a
+    SimpleQueue instead and written in batches, at most
+    CONSOLE_FLUSH_INTERVAL after it arrived or once CONSOLE_FLUSH_BYTES are
+    waiting.
+    """
+
+    _STOP = object()
+
+    def __init__(self, log_file, interval=CONSOLE_FLUSH_INTERVAL, max_bytes=CONSOLE_FLUSH_BYTES):
+        self.log_file = log_file
+        self.interval = interval
+        self.max_bytes = max_bytes
+        self.queue = queue.SimpleQueue()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def write(self, text):
+        self.queue.put(text)
+
+    def _run(self):
+        pending = []
+        size = 0
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None  # Interval elapsed
+
+            if isinstance(item, str):
+                pending.append(item)
+                size += len(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.interval
+                if size < self.max_bytes:
+                    continue
+
+            try:
+                self.log_file.write("".join(pending))
+                self.log_file.flush()
+            except:
+                pass
+            pending = []
+            size = 0
+            deadline = None
+
+            if isinstance(item, threading.Event):
+                item.set()  # flush() request
+            elif item is self._STOP:
+                return
+
+    def flush(self, timeout=2):
+        """Block until everything written so far is in the file."""
+        if self.thread.is_alive():
+            done = threading.Event()
+            self.queue.put(done)
+            done.wait(timeout)
+
+    def close(self):
+        """Write everything, stop the thread and close the file."""
+        if self.thread.is_alive():
+            self.queue.put(self._STOP)
+            self.thread.join(timeout=5)
+        try:
+            self.log_file.close()
+        except:
+            pass
+
+
 class ConsoleLogger:
     """Captures stdout/stderr and writes to console log file."""
 
-    def __init__(self, original_stream, log_file):
+    def __init__(self, original_stream, log_writer):
         self.original_stream = original_stream
-        self.log_file = log_file
+        self.log_writer = log_writer
 
     def write(self, text):
         # Write to original stream (Typhoon IDE console)
         self.original_stream.write(text)
-        # Also write to log file for browser console
-        try:
-            self.log_file.write(text)
-            self.log_file.flush()
-        except:
-            pass
+        # Also queue it for the log file (browser console)
+        self.log_writer.write(text)
 
     def flush(self):
+        # The log file is flushed by its writer thread
         self.original_stream.flush()
-        try:
-            self.log_file.flush()
-        except:
-            pass
 
     def isatty(self):
         return self.original_stream.isatty()
 
 
+def pytest_addoption(parser):
+    parser.addoption(
+        "--keep-order", action="store_true", default=False,
+        help="Run scenarios in collected order instead of grouping them by circuit signature.",
+    )
+    parser.addoption(
+        "--compile-workers", type=int, default=1,
+        help="Processes compiling upcoming circuit configurations in the background (0 disables).",
+    )
+    parser.addoption(
+        "--compile-ahead", type=int, default=2,
+        help="Number of upcoming distinct circuit configurations to compile ahead of time.",
+    )
+    parser.addoption(
+        "--shard-count", type=int, default=1,
+        help="Split the scenarios across this many devices (see run_shards.py).",
+    )
+    parser.addoption(
+        "--shard-index", type=int, default=0,
+        help="Which shard to run, from 0 to --shard-count - 1.",
+    )
+    parser.addoption(
+        "--run-id", default=None,
+        help="Run id for results folder and server reports (default: start timestamp).",
+    )
+    parser.addoption(
+        "--resume", nargs="?", const="latest", default=None, metavar="RUN_ID",
+        help="Continue an interrupted run in its results folder, skipping completed "
+             "scenarios (default: the latest run).",
+    )
+    parser.addoption(
+        "--vhil", action="store_true", default=False,
+        help="Run on a virtual HIL device instead of detecting the connected hardware.",
+    )
+    parser.addoption(
+        "--in-memory-capture", action="store_true", default=False,
+        help="Capture into a Python list as before instead of streaming samples to disk.",
+    )
+    parser.addoption(
+        "--adaptive-sweep", action="store_true", default=False,
+        help="Bisect the current-limit fault resistance instead of running the fixed R grids.",
+    )
+    parser.addoption(
+        "--sweep-resolution", type=float, default=0.25,
+        help="Fault resistance resolution of --adaptive-sweep, in ohms.",
+    )
+    parser.addoption(
+        "--current-limit", type=float, default=None,
+        help="Ia3 RMS (A) at which current limiting counts as engaged; required by --adaptive-sweep.",
+    )
+    parser.addoption(
+        "--metrics-workers", type=int, default=1,
+        help="Processes computing scenario metrics while the run continues (0 disables).",
+    )
+    parser.addoption(
+        "--duration-history", type=Path, default=scenario_history.HISTORY_FILE,
+        help="Scenario duration history the ETA is estimated from and this run's durations "
+             "are saved to (default: Results/scenario_durations.json).",
+    )
+
+
 @pytest.hookimpl(tryfirst=True)
 def pytest_configure(config: Config):
     """Clear the console log file and set up output capture at test session start."""
+    config.addinivalue_line(
+        "markers",
+        "circuit(values_fn): schematic component values a test needs, as a function of its parameters",
+    )
+    config.addinivalue_line(
+        "markers",
+        "scenario(build_fn): declarative Scenario timeline of a test, as a function of its parameters",
+    )
+    config.addinivalue_line(
+        "markers",
+        "sweep(mode): 'grid' or 'adaptive' variant of a sweep; --adaptive-sweep picks which runs",
+    )
+
+    if config.getoption("adaptive_sweep") and config.getoption("current_limit") is None:
+        # The unit's fault code is not readable from the test process; Ia3 is all a probe has
+        raise pytest.UsageError("--adaptive-sweep needs --current-limit (Ia3 RMS in A at which "
+                                "current limiting counts as engaged)")
+
+    resume = config.getoption("resume")
+    if resume:
+        resume_id = run_manifest.latest_run_id() if resume == "latest" else resume
+        if resume_id is None:
+            raise pytest.UsageError("--resume: no earlier run with a manifest in Results/")
+        config.option.run_id = resume_id
+    if not config.getoption("run_id"):
+        config.option.run_id = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    run_id = config.getoption("run_id")
+
     # Set up signal handler for Ctrl+C
     original_sigint = signal.getsignal(signal.SIGINT)
 
     def sigint_handler(sig, frame):
-        send_test_stopped()
+        if hasattr(config, '_console_writer'):
+            config._console_writer.flush()
+        send_test_stopped(run_id)
+        compile_pipeline.cancel_all()
         # Call original handler
         if callable(original_sigint):
             original_sigint(sig, frame)
@@ -103,24 +276,27 @@ def pytest_configure(config: Config):
 
     signal.signal(signal.SIGINT, sigint_handler)
 
-    # Clear/create the log file
-    with open(CONSOLE_LOG, 'w', encoding='utf-8') as f:
-        f.write(f"=== SMT Test Console Output ===\n")
-        f.write(f"Started: {config.args}\n\n")
-
-    # Open log file for appending
-    log_file = open(CONSOLE_LOG, 'a', encoding='utf-8', buffering=1)  # Line buffered
+    # Start a new segmented log (console_segments.py); written in batches by a background thread
+    log_file = console_segments.SegmentedLog(console_log_path(config))
+    log_file.write(f"=== SMT Test Console Output ===\n")
+    log_file.write(f"Started: {config.args}\n\n")
+    log_file.flush()
+    log_writer = ConsoleLogWriter(log_file)
 
     # Wrap stdout and stderr
-    sys.stdout = ConsoleLogger(sys.__stdout__, log_file)
-    sys.stderr = ConsoleLogger(sys.__stderr__, log_file)
+    sys.stdout = ConsoleLogger(sys.__stdout__, log_writer)
+    sys.stderr = ConsoleLogger(sys.__stderr__, log_writer)
 
-    # Store log file handle for cleanup
-    config._console_log_file = log_file
+    # Store log writer for cleanup
+    config._console_writer = log_writer
 
     # Start heartbeat thread
     stop_event = threading.Event()
-    heartbeat_thread = threading.Thread(target=heartbeat_worker, args=(stop_event,), daemon=True)
+    def progress():
+        return config._progress.snapshot() if hasattr(config, '_progress') else None
+
+    heartbeat_thread = threading.Thread(target=heartbeat_worker, args=(stop_event, run_id, progress),
+                                        daemon=True)
     heartbeat_thread.start()
 
     # Store for cleanup
@@ -128,36 +304,165 @@ def pytest_configure(config: Config):
     config._heartbeat_thread = heartbeat_thread
 
 
+def pytest_collection_modifyitems(session, config, items):
+    """Group scenarios by circuit signature so each configuration is built once.
+
+    For a sharded run, keep only this shard's share of the scenarios.
+    """
+    # Fixed-grid sweeps or their adaptive replacements, never both
+    skipped_mode = "grid" if config.getoption("adaptive_sweep") else "adaptive"
+    other_mode = [item for item in items if sweep_mode(item) == skipped_mode]
+    if other_mode:
+        config.hook.pytest_deselected(items=other_mode)
+        items[:] = [item for item in items if item not in other_mode]
+
+    if not config.getoption("keep_order"):
+        items[:] = scenario_scheduler.group_by_signature(items)
+
+    count = config.getoption("shard_count")
+    if count > 1:
+        index = config.getoption("shard_index")
+        if not 0 <= index < count:
+            raise pytest.UsageError(f"--shard-index must be between 0 and {count - 1}")
+        shards, loads = scenario_scheduler.partition(items, count, scenario_seconds)
+        selected = set(shards[index])
+        config.hook.pytest_deselected(items=[item for item in items if item not in selected])
+        items[:] = shards[index]
+        config._shard_summary = (index, count, loads)
+
+    if config.getoption("resume"):
+        run_id = config.getoption("run_id")
+        folder = run_manifest.results_folder(run_id)
+        done = run_manifest.RunManifest(folder).completed()
+        completed = [item for item in items if item.nodeid in done]
+        if completed:
+            config.hook.pytest_deselected(items=completed)
+            items[:] = [item for item in items if item.nodeid not in done]
+        # Memmaps of the capture that was running when the run stopped
+        leftovers = capture_sink.remove_leftovers(folder)
+        config._resume_summary = (run_id, len(completed), leftovers)
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_collection_finish(session):
+    """Track progress and ETA for the heartbeats over the tests that will run,
+    and count the compiles they need for the collection report.
+
+    After every deselection (-k, -m), and before the collection report.
+    """
+    items = session.items
+    # Without grouping, every test with a circuit compiled and loaded its model
+    per_test = sum(scenario_scheduler.signature(scenario_scheduler.circuit_of(item)) is not None
+                   for item in items)
+    session.config._schedule_summary = (per_test, scenario_scheduler.count_switches(items))
+    session.config._scripted_seconds = sum(map(scenario_seconds, items))
+    # A resumed run counts on from the scenarios completed before it stopped
+    resumed = session.config._resume_summary[1] if hasattr(session.config, '_resume_summary') else 0
+    session.config._progress = scenario_history.RunProgress(
+        [item.nodeid for item in items], {item.nodeid: scenario_seconds(item) for item in items},
+        history=scenario_history.load(session.config.getoption("duration_history")), done=resumed)
+
+
+def sweep_mode(item):
+    """Mode of a test's sweep marker, or None."""
+    marker = item.get_closest_marker("sweep")
+    return marker.args[0] if marker is not None else None
+
+
+def scenario_seconds(item):
+    """Scripted hardware time of a test, 0 if it has no scenario marker."""
+    scenario = scenario_timeline.scenario_of(item)
+    return scenario_timeline.scenario_duration(scenario) if scenario is not None else 0.0
+
+
+def pytest_report_collectionfinish(config, items):
+    """Report how many compiles and model loads the scenario order saves."""
+    if not hasattr(config, '_schedule_summary'):
+        return None
+    per_test, after = config._schedule_summary
+    lines = [f"  >> Scenario order: {after} circuit configurations to build "
+             f"(one per test needs {per_test}); saves {per_test - after} compiles "
+             f"and {per_test - after} load_model calls",
+             f"  >> Scripted hardware time: at most {format_seconds(config._scripted_seconds)} "
+             f"(excluding compile and load)"]
+    progress = getattr(config, '_progress', None)
+    if progress is not None and progress.known:
+        lines.append(f"  >> Estimated run time: {format_seconds(progress.snapshot()['eta_s'])} "
+                     f"({progress.known} of {len(items)} tests timed in earlier runs)")
+    if hasattr(config, '_shard_summary'):
+        index, count, loads = config._shard_summary
+        lines.append(f"  >> Shard {index} of {count} ({config.getoption('run_id')}): "
+                     f"{len(items)} scenarios; estimated shard times "
+                     + ", ".join(format_seconds(load) for load in loads))
+    if hasattr(config, '_resume_summary'):
+        run_id, completed, leftovers = config._resume_summary
+        lines.append(f"  >> Resuming {run_id}: {completed} completed scenarios skipped, "
+                     f"{len(items)} to run"
+                     + (f"; {leftovers} unfinished capture files removed" if leftovers else ""))
+    return lines
+
+
+def format_seconds(seconds):
+    """Format a duration as 1h 02m 03s."""
+    hours, rest = divmod(int(seconds), 3600)
+    return f"{hours}h {rest // 60:02d}m {rest % 60:02d}s"
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_protocol(item, nextitem):
+    """Track the running test for the heartbeat's progress."""
+    progress = getattr(item.config, '_progress', None)
+    if progress is not None:
+        progress.begin(item.nodeid)
+    yield
+    if progress is not None:
+        # Skipped tests say nothing about the scenario's duration
+        report = getattr(item, "rep_call", None)
+        progress.end(item.nodeid, record=report is not None and not report.skipped)
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item, call):
+    """Keep each phase's report on the item (rep_setup, rep_call, rep_teardown)."""
+    outcome = yield
+    report = outcome.get_result()
+    setattr(item, f"rep_{report.when}", report)
+
+
 @pytest.hookimpl(trylast=True)
 def pytest_unconfigure(config: Config):
     """Restore original stdout/stderr and close log file."""
+    # Captures still being written belong to this session
+    capture_writer.drain_all()
+
     # Stop heartbeat thread
     if hasattr(config, '_heartbeat_stop_event'):
         config._heartbeat_stop_event.set()
         if hasattr(config, '_heartbeat_thread'):
             config._heartbeat_thread.join(timeout=1)
 
+    # Durations of this run's tests, for the next run's ETA
+    if hasattr(config, '_progress'):
+        try:
+            scenario_history.update(config._progress.durations, config.getoption("duration_history"))
+        except TimeoutError as e:
+            print(f"\n  >> Scenario durations not saved: {e}")
+
+    reports = smt_client.stats()
+    print(f"\n  >> Server reports: {reports['sent']} sent, {reports['failed']} failed, "
+          f"{reports['dropped']} dropped, {reports['coalesced']} heartbeats coalesced; "
+          f"{reports['send_mean_ms']:.1f} ms per request "
+          f"(max delay {reports['delay_max_ms']:.0f} ms)")
+
     # Restore original streams
     sys.stdout = sys.__stdout__
     sys.stderr = sys.__stderr__
 
-    # Close log file
-    if hasattr(config, '_console_log_file'):
-        try:
-            config._console_log_file.close()
-        except:
-            pass
+    # Write the rest of the console log and close it
+    if hasattr(config, '_console_writer'):
+        config._console_writer.close()
 
-    # Notify SMT server that all tests are complete
-    import json
-    import urllib.request
-    payload = json.dumps({"label": "All tests complete", "running": False}).encode("utf-8")
-    req = urllib.request.Request(
-        "http://localhost:8780/scenario",
-        data=payload,
-        headers={"Content-Type": "application/json"},
-    )
-    try:
-        urllib.request.urlopen(req, timeout=2)
-    except Exception:
-        pass  # Server not running - tests still work standalone
+    # Notify SMT server that all tests are complete, after everything queued before
+    smt_client.post("/scenario", {"label": "All tests complete", "running": False,
+                                  "run_id": config.getoption("run_id")})
+    smt_client.close(timeout=2)
@@ -0,0 +1,286 @@
+"""
+Size-capped console log, split into segments with an index.
+
+pytest_console.log used to grow for the whole run, and SMT_Server.py
+re-read all of it for every browser that connected to /console, so a
+reconnect late in a long run cost more and more. conftest.py now writes
+the log through SegmentedLog:
+
+    pytest_console.log              active segment, appended to (tailed by the server)
+    pytest_console.00001.log.gz     closed segments, gzip-compressed, oldest first
+    pytest_console.index.json       session id, closed segments and the active one
+
+The active segment is closed once it holds SEGMENT_BYTES, at a line
+boundary. Every line has a number that stays the same across rotations
+(first_line of its segment + its position in it), so a reader can resume
+from any line: lines_from() reads only the segments from that line on,
+recent_lines() only the newest ones. LogFollower tails the log across
+rotations for the server's live stream, keeping it open while it changes.
+
+A log without an index (e.g. written by an older conftest.py) is read as
+a single active segment.
+"""
+
+import glob
+import gzip
+import json
+import os
+import shutil
+import time
+
+
+SEGMENT_BYTES = 1024 * 1024  # Active segment closed once it holds this much text
+INITIAL_LINES = 2000  # Lines sent to a browser that connects without a position
+
+
+def index_path(log_path):
+    return os.path.splitext(log_path)[0] + ".index.json"
+
+
+def segment_path(log_path, number):
+    return f"{os.path.splitext(log_path)[0]}.{number:05d}.log.gz"
+
+
+def split_lines(data):
+    """Complete lines of UTF-8 bytes, split on b"\\n" only.
+
+    That is exactly what SegmentedLog counts; str.splitlines() would also
+    split on \\r, \\x0c, \\u2028, ... and shift every line number after them.
+    """
+    end = data.rfind(b"\n") + 1
+    return data[:end].decode("utf-8", errors="replace").split("\n")[:-1]
+
+
+def replace(tmp, path, attempts=5):
+    """os.replace, retried while a reader has the target open (Windows)."""
+    for attempt in range(attempts):
+        try:
+            os.replace(tmp, path)
+            return
+        except PermissionError:
+            if attempt == attempts - 1:
+                raise
+            time.sleep(0.01)
+
+
+class SegmentedLog:
+    """File-like writer of a segmented console log (write / flush / close).
+
+    Creating it starts a new log: the active segment is truncated and the
+    segments and index of the previous run are removed.
+    """
+
+    def __init__(self, path, segment_bytes=SEGMENT_BYTES):
+        self.path = path
+        self.segment_bytes = segment_bytes
+        self.session = f"{os.getpid()}-{time.time_ns()}"
+        self.segments = []  # closed segments: {"name", "first_line", "lines"}
+        self.first_line = 0  # number of the active segment's first line
+        self.lines = 0  # complete lines in the active segment
+        self.size = 0  # characters in the active segment
+        self.partial = False  # active segment ends inside a line
+
+        for old in glob.glob(f"{glob.escape(os.path.splitext(path)[0])}.*.log.gz"):
+            os.remove(old)
+        self.file = open(path, "w", encoding="utf-8", newline="")  # "\n" stays b"\n" on disk
+        self.write_index()
+
+    def write(self, text):
+        self.file.write(text)
+        self.lines += text.count("\n")
+        self.size += len(text)
+        if text:
+            self.partial = not text.endswith("\n")
+
+    def flush(self):
+        self.file.flush()
+        if self.size >= self.segment_bytes and not self.partial:
+            self.rotate()
+
+    def rotate(self):
+        """Compress the active segment into the next closed one and start a new one.
+
+        The index is marked "rotating" before the active segment is
+        truncated and updated after; readers do not trust what they read
+        while it changes (see LogFollower.poll).
+        """
+        self.file.close()
+        target = segment_path(self.path, len(self.segments) + 1)
+        with open(self.path, "rb") as src, gzip.open(f"{target}.tmp", "wb", compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst)
+        replace(f"{target}.tmp", target)
+        self.write_index(rotating=True)
+        self.file = open(self.path, "w", encoding="utf-8", newline="")
+
+        self.segments.append({"name": os.path.basename(target),
+                              "first_line": self.first_line, "lines": self.lines})
+        self.first_line += self.lines
+        self.lines = 0
+        self.size = 0
+        self.write_index()
+
+    def write_index(self, rotating=False):
+        path = index_path(self.path)
+        index = {"session": self.session, "segments": self.segments,
+                 "active": {"name": os.path.basename(self.path), "first_line": self.first_line}}
+        if rotating:
+            index["rotating"] = True
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(index, f, indent=1)
+        replace(f"{path}.tmp", path)
+
+    def close(self):
+        self.file.close()
+
+
+def read_index(log_path):
+    """Index of a console log; a log without one is a single active segment."""
+    try:
+        with open(index_path(log_path), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"session": None, "segments": [], "active": {"first_line": 0}}
+
+
+def segment_lines(log_path, segment):
+    """Lines of a closed segment."""
+    path = os.path.join(os.path.dirname(log_path), segment["name"])
+    with gzip.open(path, "rb") as f:
+        return split_lines(f.read())
+
+
+def active_lines(log_path):
+    """Complete lines of the active segment."""
+    with open(log_path, "rb") as f:
+        data = f.read()
+    return split_lines(data)
+
+
+def lines_from(log_path, start, index=None):
+    """(number, line) of every line from number start on, oldest first."""
+    index = index or read_index(log_path)
+    result = []
+    for segment in index["segments"]:
+        if segment["first_line"] + segment["lines"] > start:
+            first = segment["first_line"]
+            lines = segment_lines(log_path, segment)
+            result += [(first + i, line) for i, line in enumerate(lines) if first + i >= start]
+    first = index["active"]["first_line"]
+    if os.path.exists(log_path):
+        lines = active_lines(log_path)
+        result += [(first + i, line) for i, line in enumerate(lines) if first + i >= start]
+    return result
+
+
+def recent_lines(log_path, count=INITIAL_LINES):
+    """(number, line) of the last count lines, reading only the newest segments."""
+    index = read_index(log_path)
+    active = active_lines(log_path) if os.path.exists(log_path) else []
+    end = index["active"]["first_line"] + len(active)
+    start = max(0, end - count)
+    segments = [segment for segment in index["segments"]
+                if segment["first_line"] + segment["lines"] > start]
+    return lines_from(log_path, start, dict(index, segments=segments))
+
+
+class LogFollower:
+    """Returns the lines added to a segmented log since the previous poll.
+
+    The first poll starts at the active segment, so a server started
+    late in a run skips the closed ones; a new run's log (new session) is
+    then followed from its first line.
+
+    The active segment stays open between polls and the index is only
+    re-read when it changed, so a poll without new output costs two
+    stat calls. The file is closed once it has been idle for
+    IDLE_CLOSE seconds, so it can be deleted on Windows (run_shards.py
+    removes old shard logs).
+    """
+
+    IDLE_CLOSE = 5.0
+
+    def __init__(self, path):
+        self.path = path
+        self.started = False
+        self.session = None
+        self.first_line = 0  # first line of the active segment being tailed
+        self.pos = 0  # bytes of it already read
+        self.next_line = 0  # number of the next line to return
+        self.restarted = False  # the last poll found a new run's log
+        self.file = None  # the active segment, open while it changes
+        self.file_id = None  # (device, inode) of the open file
+        self.last_change = 0.0  # when new output was last read
+        self.index = None  # cached index and the stat it was read with
+        self.index_stat = None
+
+    def read_index(self):
+        """The log's index, re-read only when the index file changed."""
+        try:
+            st = os.stat(index_path(self.path))
+            stat = (st.st_ino, st.st_mtime_ns, st.st_size)
+        except OSError:
+            stat = None
+        if self.index is None or stat != self.index_stat:
+            self.index = read_index(self.path)
+            self.index_stat = stat
+        return self.index
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def poll(self):
+        """(number, line) of the new complete lines; [] if the log does not exist."""
+        self.restarted = False
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            self.close()
+            return []
+        replaced = self.file_id is not None and self.file_id != (st.st_dev, st.st_ino)
+        if self.file is None or replaced:
+            self.close()
+            self.file = open(self.path, "rb")
+            self.file_id = (st.st_dev, st.st_ino)
+
+        index = self.read_index()
+        if index.get("rotating"):
+            return []
+        active_first = index["active"]["first_line"]
+        size = os.fstat(self.file.fileno()).st_size
+        if (not self.started or index["session"] != self.session
+                or (index["session"] is None and (size < self.pos or replaced))):
+            # New run (a log without an index is recreated by truncating or replacing it)
+            self.session = index["session"]
+            self.first_line = self.pos = self.next_line = 0
+            self.restarted = self.started
+            if not self.started:
+                self.started = True
+                self.first_line = self.next_line = active_first
+
+        result = []
+        if active_first != self.first_line:
+            # Rotated: the rest of the segment(s) tailed so far are now closed
+            result += [(number, line) for number, line in lines_from(self.path, self.next_line, index)
+                       if number < active_first]
+            self.first_line = self.next_line = active_first
+            self.pos = 0
+            size = os.fstat(self.file.fileno()).st_size
+        if size < self.pos:
+            return result  # Being rotated; the index is not updated yet
+
+        self.file.seek(self.pos)
+        data = self.file.read()
+        if self.read_index() is not index:
+            return result  # Rotated (or a new run started) while reading; read again next poll
+        data = data[:data.rfind(b"\n") + 1]
+        if data:
+            self.last_change = time.monotonic()
+        elif time.monotonic() - self.last_change > self.IDLE_CLOSE:
+            self.close()  # Reopened on the next poll
+        self.pos += len(data)
+        for line in split_lines(data):
+            result.append((self.next_line, line))
+            self.next_line += 1
+        return result
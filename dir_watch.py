@@ -0,0 +1,86 @@
+"""
+Change notifications for the files of a directory.
+
+SMT_Server.py used to check the console logs every 0.5 s whether or not
+anything had been written. On Linux, DirectoryWatch opens an inotify
+watch (through ctypes, so only the standard library is needed) and the
+server's event loop wakes up as soon as a console log changes:
+
+    watch = DirectoryWatch(SCRIPT_DIR)
+    if watch.fd is not None:
+        loop.add_reader(watch.fd, on_change)   # on_change calls watch.changed(...)
+
+Elsewhere (Windows, or when inotify is unavailable) watch.fd is None and
+the caller keeps polling.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import struct
+import sys
+
+
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len (name follows)
+
+
+def load_libc():
+    """libc with inotify, or None."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+class DirectoryWatch:
+    """inotify watch of a directory; fd is None where it is not available."""
+
+    def __init__(self, directory):
+        self.fd = None
+        libc = load_libc()
+        if libc is None:
+            return
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            return
+        if libc.inotify_add_watch(fd, os.fsencode(directory), WATCH_MASK) < 0:
+            os.close(fd)
+            return
+        self.fd = fd
+
+    def changed(self, prefix=""):
+        """Read the pending notifications. True if a file starting with prefix changed."""
+        found = False
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except (BlockingIOError, OSError):
+                return found
+            if not data:
+                return found
+            offset = 0
+            while offset + EVENT_HEADER.size <= len(data):
+                _wd, _mask, _cookie, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b"\0").decode("utf-8", errors="replace")
+                offset += length
+                found = found or name.startswith(prefix)
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
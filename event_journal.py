@@ -0,0 +1,116 @@
+"""
+Timestamped journal of HIL events, saved next to each capture.
+
+Lining the .mat data up with the dashboard's Modbus CSV used to rely on
+scenario labels and 1-second wall-clock rows. The test module wraps the
+hil module in JournaledHil, which records every hil.set_* and
+hil.prepare_* call in an EventJournal, and pre_cbk / post_cbk mark the
+start and end of the capture. Each event carries:
+
+- wall: time.time() when the call returned (matches the CSV's clock)
+- monotonic: the journal clock at the same moment
+- sample: index of the capture sample at that moment, or empty outside
+  the capture or when the sample time is unknown
+
+post_cbk writes the scenario's events to <label>_events.csv in the results
+folder and posts them to SMT_Server.py, which serves them at /journal.
+Post-processing can then index straight into each event's sample range.
+"""
+
+import csv
+import os
+import threading
+import time
+
+
+JOURNAL_SUFFIX = "_events.csv"
+COLUMNS = ["event", "name", "value", "wall", "monotonic", "sample"]
+JOURNALED_PREFIXES = ("set_", "prepare_")
+
+
+def format_value(args, kwargs):
+    """Compact text of a call's arguments after the signal name."""
+    parts = [str(arg) for arg in args]
+    for key, value in kwargs.items():
+        if key == "harmonics_pu":
+            value = f"{len(value)} orders"
+        parts.append(f"{key}={value}")
+    return ";".join(parts)
+
+
+class EventJournal:
+    """Events of the running scenario, with their capture sample index."""
+
+    def __init__(self, clock=time.monotonic, wall=time.time):
+        self.clock = clock
+        self.wall = wall
+        self.lock = threading.Lock()
+        self.events = []
+        self.capture_start = None  # journal clock when the capture started
+        self.sample_time = None
+
+    def begin(self, label, sample_time=None, start=None):
+        """Mark the capture start (pre_cbk).
+
+        start is the journal clock just before hil.start_capture() was
+        called; sample 0 is taken then, not when the call returns.
+        Events since the previous capture ended (model reset, prepare steps)
+        stay in the scenario's journal, without a sample index.
+        """
+        with self.lock:
+            self.capture_start = self.clock() if start is None else start
+            self.sample_time = sample_time
+        self.record("pre_cbk", label)
+
+    def record(self, event, name="", value=""):
+        """Record an event now."""
+        now = self.clock()
+        wall = self.wall()
+        with self.lock:
+            sample = ""
+            if self.capture_start is not None and self.sample_time:
+                sample = max(0, int((now - self.capture_start) / self.sample_time))
+            self.events.append({"event": event, "name": name, "value": value,
+                                "wall": round(wall, 6), "monotonic": round(now, 6),
+                                "sample": sample})
+
+    def end(self, label):
+        """Mark the capture stop (post_cbk). Returns the scenario's events."""
+        self.record("post_cbk", label)
+        with self.lock:
+            events, self.events = self.events, []
+            self.capture_start = None
+        return events
+
+
+def write_journal(mat_path, events):
+    """Write events to the sidecar of a .mat file. Returns its path."""
+    path = os.path.splitext(mat_path)[0] + JOURNAL_SUFFIX
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        writer.writeheader()
+        writer.writerows(events)
+    os.replace(tmp, path)
+    return path
+
+
+class JournaledHil:
+    """Forward to the hil module, recording set_*/prepare_* calls in a journal."""
+
+    def __init__(self, hil, journal):
+        self._hil = hil
+        self._journal = journal
+
+    def __getattr__(self, name):
+        attr = getattr(self._hil, name)
+        if not name.startswith(JOURNALED_PREFIXES) or not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            signal = args[0] if args else kwargs.get("name", "")
+            self._journal.record(name, signal, format_value(args[1:], {
+                key: value for key, value in kwargs.items() if key != "name"}))
+            return result
+        return call
@@ -0,0 +1,122 @@
+"""
+Limit rules checked while a scenario captures, to abort failed runs early.
+
+A scenario whose unit has clearly failed (fault code set, DC link
+collapsed) used to run its whole scripted timeline. A scenario declares
+limit rules (Scenario.limits); pre_cbk arms a LimitMonitor with them and
+post_cbk disarms it. In between, the timeline waits through
+LimitMonitor.wait(), which sleeps in POLL_INTERVAL slices and reads the
+limited signals in between - on the test thread, so the HIL API is never
+used concurrently. A rule that stays violated for its hold time raises
+LimitViolation, which run_scenario turns into a failed test after
+stopping the capture.
+
+Only HIL signals can be watched: the Modbus registers (STATE, FCODE, ...)
+are decoded in the browser, not in the test process. verify() reads every
+rule's signal once before the capture starts and raises for any that
+cannot be read, so a rule never silently watches nothing. A signal that
+stops being readable later disables its rule for the rest of the scenario.
+"""
+
+import collections
+import time
+
+
+# signal: analog signal read with hil.read_analog_signal()
+# low, high: allowed range (None for no bound); with relative=True, fractions of the
+#   signal's value when the rule is armed
+# arm: seconds after the capture starts before the rule is checked
+# hold: seconds the signal must stay out of range before the scenario is aborted
+# reason: what a violation means, for the failure message
+Rule = collections.namedtuple(
+    "Rule", ["signal", "low", "high", "relative", "arm", "hold", "reason"],
+    defaults=(None, None, False, 0.0, 0.0, "limit exceeded"))
+
+POLL_INTERVAL = 0.2  # seconds between checks
+
+
+class LimitViolation(Exception):
+    """A limit rule was violated; the scenario has failed."""
+
+    def __init__(self, rule, value, elapsed):
+        super().__init__(f"{rule.reason} ({rule.signal} = {value:g} at {elapsed:.1f} s)")
+        self.rule = rule
+        self.value = value
+        self.elapsed = elapsed
+
+
+class LimitMonitor:
+    """Check limit rules between slices of the timeline's waits."""
+
+    def __init__(self, hil, poll=POLL_INTERVAL, clock=time.monotonic):
+        self.hil = hil
+        self.poll = poll
+        self.clock = clock
+        self.rules = []
+        self.disarm()
+
+    def verify(self, rules):
+        """Raise RuntimeError if a rule's signal cannot be read (simulation running)."""
+        unreadable = []
+        for signal in dict.fromkeys(rule.signal for rule in rules):
+            try:
+                float(self.hil.read_analog_signal(name=signal))
+            except Exception as e:
+                unreadable.append(f"{signal} ({e})")
+        if unreadable:
+            raise RuntimeError(f"Limit rules watch signals that cannot be read: {', '.join(unreadable)}")
+
+    def arm(self, rules):
+        """Start checking rules, timed from now."""
+        self.rules = list(rules)
+        self.start = self.clock()
+        self.reference = {}  # signal -> value when its relative rule was armed
+        self.violated_since = {}  # rule -> time it went out of range
+        self.unreadable = set()
+
+    def disarm(self):
+        self.rules = []
+        self.start = None
+
+    def elapsed(self):
+        return self.clock() - self.start if self.start is not None else 0.0
+
+    def wait(self, seconds):
+        """hil.wait_sec(seconds), checking the rules every poll interval."""
+        if not self.rules:
+            self.hil.wait_sec(seconds)
+            return
+        end = self.clock() + seconds
+        while True:
+            self.check()
+            remaining = end - self.clock()
+            if remaining <= 0:
+                return
+            self.hil.wait_sec(min(self.poll, remaining))
+
+    def check(self):
+        """Read the armed rules' signals. Raises LimitViolation."""
+        now = self.clock()
+        elapsed = now - self.start
+        for rule in self.rules:
+            if rule.signal in self.unreadable or elapsed < rule.arm:
+                continue
+            try:
+                value = float(self.hil.read_analog_signal(name=rule.signal))
+            except Exception:
+                self.unreadable.add(rule.signal)
+                print(f"\n  >> Limit monitor: cannot read {rule.signal}, rule disabled")
+                continue
+
+            low, high = rule.low, rule.high
+            if rule.relative:
+                reference = self.reference.setdefault(rule.signal, value)
+                low = low * reference if low is not None else None
+                high = high * reference if high is not None else None
+
+            if (low is not None and value < low) or (high is not None and value > high):
+                since = self.violated_since.setdefault(rule, now)
+                if now - since >= rule.hold:
+                    raise LimitViolation(rule, value, elapsed)
+            else:
+                self.violated_since.pop(rule, None)
@@ -0,0 +1,135 @@
+"""
+Streaming writer for MATLAB v5 .mat capture files.
+
+Produces the layout the analysis scripts read from Typhoon capture files:
+
+    time_line       n x 1 double
+    channels_data   1 x 1 struct, one n x 1 double field per channel
+
+Every element size in a v5 file is known up front from n, so the data is
+written slice by slice straight from the source arrays (typically numpy
+memmaps); at most one slice of CHUNK_SAMPLES samples is in memory. With
+compress=True each variable is zlib-compressed on the fly (miCOMPRESSED,
+as MATLAB's own -v7 files) and its size is patched in afterwards.
+"""
+
+import os
+import struct
+import zlib
+
+import numpy as np
+
+
+CHUNK_SAMPLES = 1 << 18  # samples converted and written per slice
+COMPRESSION_LEVEL = 1    # zlib level: most of the size reduction at a fraction of the time
+
+# MAT v5 data types and array classes
+MI_INT8 = 1
+MI_INT32 = 5
+MI_UINT32 = 6
+MI_DOUBLE = 9
+MI_MATRIX = 14
+MI_COMPRESSED = 15
+MX_STRUCT_CLASS = 2
+MX_DOUBLE_CLASS = 6
+
+FIELD_NAME_LENGTH = 32  # MATLAB's default; field names are at most 31 characters
+
+
+def _padded(nbytes):
+    return (nbytes + 7) // 8 * 8
+
+
+def _tag(data_type, nbytes):
+    return struct.pack("<II", data_type, nbytes)
+
+
+def _name_element(name):
+    raw = name.encode("ascii")
+    return _tag(MI_INT8, len(raw)) + raw + b"\0" * (_padded(len(raw)) - len(raw))
+
+
+def _matrix_header(name, class_id, rows, cols, body_bytes):
+    """miMATRIX tag plus array flags, dimensions and name sub-elements."""
+    sub = (_tag(MI_UINT32, 8) + struct.pack("<II", class_id, 0)
+           + _tag(MI_INT32, 8) + struct.pack("<ii", rows, cols)
+           + _name_element(name))
+    return _tag(MI_MATRIX, len(sub) + body_bytes) + sub
+
+
+def _column_bytes(name, n):
+    """Size of a named n x 1 double column vector element, tag included."""
+    return len(_matrix_header(name, MX_DOUBLE_CLASS, n, 1, 0)) + 8 + 8 * n
+
+
+def _column_element(name, column, n):
+    """Bytes of column[:n] as an n x 1 double array element, slice by slice."""
+    yield _matrix_header(name, MX_DOUBLE_CLASS, n, 1, 8 + 8 * n) + _tag(MI_DOUBLE, 8 * n)
+    for start in range(0, n, CHUNK_SAMPLES):
+        yield np.asarray(column[start:min(n, start + CHUNK_SAMPLES)], dtype="<f8").tobytes()
+
+
+def _struct_element(name, names, channels, n):
+    """Bytes of a 1 x 1 struct element with one n x 1 double field per channel."""
+    field_names = b"".join(field.encode("ascii").ljust(FIELD_NAME_LENGTH, b"\0") for field in names)
+    body = (8  # field name length, as a small data element
+            + 8 + _padded(len(field_names))
+            + sum(_column_bytes("", n) for _ in names))
+    yield (_matrix_header(name, MX_STRUCT_CLASS, 1, 1, body)
+           + struct.pack("<HHi", MI_INT32, 4, FIELD_NAME_LENGTH)
+           + _tag(MI_INT8, len(field_names)) + field_names
+           + b"\0" * (_padded(len(field_names)) - len(field_names)))
+    for field in names:
+        yield from _column_element("", channels[field], n)
+
+
+def _write_element(f, chunks, compress):
+    """Write one top-level variable, optionally as a miCOMPRESSED element."""
+    if not compress:
+        for chunk in chunks:
+            f.write(chunk)
+        return
+
+    tag_pos = f.tell()
+    f.write(_tag(MI_COMPRESSED, 0))  # Size patched in once known
+    compressor = zlib.compressobj(COMPRESSION_LEVEL)
+    size = 0
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        f.write(out)
+        size += len(out)
+    out = compressor.flush()
+    f.write(out)
+    size += len(out)
+    end = f.tell()
+    f.seek(tag_pos)
+    f.write(_tag(MI_COMPRESSED, size))
+    f.seek(end)
+
+
+def write_capture(path, time_line, channels, n, compress=False):
+    """Write a capture .mat from the first n samples of time_line and channels.
+
+    channels maps channel name to a 1-D array-like (e.g. a memmap column).
+    """
+    names = list(channels)
+    for name in names:
+        if len(name) >= FIELD_NAME_LENGTH:
+            raise ValueError(f"Channel name too long for a .mat field: {name}")
+
+    # Written under a temporary name, so an existing .mat is always complete
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            header = b"MATLAB 5.0 MAT-file, Platform: SMT, Created by: mat_export.py"
+            f.write(header.ljust(116, b" ") + b"\0" * 8 + struct.pack("<H", 0x0100) + b"IM")
+
+            _write_element(f, _column_element("time_line", time_line, n), compress)
+            _write_element(f, _struct_element("channels_data", names, channels, n), compress)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1 @@
+"""Mock Typhoon HIL package (see mock_typhoon/typhoon_mock.py)."""
@@ -0,0 +1,16 @@
+"""Mock typhoon.api.hil: module functions of typhoon_mock.hil."""
+
+from typhoon_mock import hil as _hil
+
+wait_sec = _hil.wait_sec
+load_model = _hil.load_model
+get_sim_step = _hil.get_sim_step
+start_simulation = _hil.start_simulation
+stop_simulation = _hil.stop_simulation
+start_capture = _hil.start_capture
+stop_capture = _hil.stop_capture
+read_analog_signal = _hil.read_analog_signal
+set_scada_input_value = _hil.set_scada_input_value
+set_source_constant_value = _hil.set_source_constant_value
+set_source_sine_waveform = _hil.set_source_sine_waveform
+prepare_source_sine_waveform = _hil.prepare_source_sine_waveform
@@ -0,0 +1,5 @@
+"""Mock typhoon.api.schematic_editor."""
+
+from typhoon_mock import MockSchematicAPI as SchematicAPI
+
+model = SchematicAPI()
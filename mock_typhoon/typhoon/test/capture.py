@@ -0,0 +1,44 @@
+"""Mock typhoon.test.capture: high-level captures on top of the mock hil capture."""
+
+import numpy as np
+
+from typhoon_mock import SIM_STEP, clock
+from typhoon_mock import hil as _hil
+
+_capture = None  # (signals, duration, start time, chunk list) of the running capture
+
+
+def start_capture(duration, rate=None, signals=(), fileName=None, **kwargs):
+    """Capture signals for duration seconds at (at least) rate Hz."""
+    global _capture
+    decimation = max(1, int(1.0 / (rate * SIM_STEP) + 1e-9)) if rate else 1
+    samples = int(round(duration / (decimation * SIM_STEP)))
+    chunks = []
+    _hil.start_capture([decimation, len(signals), samples], ["Forced"], list(signals),
+                       dataBuffer=chunks, fileName=fileName)
+    _capture = (list(signals), duration, clock.now(), chunks)
+
+
+def get_capture_results(wait_capture=False, timeout=None):
+    """Stop the capture and return its data as a DataFrame indexed by time.
+
+    wait_capture=True first lets the capture run for its whole duration.
+    """
+    global _capture
+    import pandas as pd
+
+    if _capture is None:
+        raise RuntimeError("No capture started")
+    signals, duration, start, chunks = _capture
+    _capture = None
+    if wait_capture:
+        clock.advance(start + duration - clock.now())
+    _hil.stop_capture()
+
+    if chunks:
+        data = np.concatenate([chunk[1] for chunk in chunks], axis=1)
+        time_line = np.concatenate([chunk[2] for chunk in chunks])
+    else:
+        data, time_line = np.zeros((len(signals), 0)), np.zeros(0)
+    return pd.DataFrame({name: data[i] for i, name in enumerate(signals)},
+                        index=pd.Index(time_line, name="time"))
@@ -0,0 +1,7 @@
+"""Mock typhoon.test.ranges."""
+
+
+def around(value, tol=None, tol_p=None):
+    """(low, high) range around value, by absolute or relative tolerance."""
+    margin = tol if tol is not None else abs(value) * (tol_p or 0.0)
+    return value - margin, value + margin
@@ -0,0 +1,5 @@
+"""Mock typhoon.test.reporting.messages."""
+
+
+def report_message(message, *args, **kwargs):
+    print(f"  >> {message}")
@@ -0,0 +1 @@
+"""Mock typhoon.test.signals (imported by the suite, not used)."""
@@ -0,0 +1,271 @@
+"""
+Stand-in for the Typhoon HIL toolchain, for running the suite without it.
+
+Putting mock_typhoon/ first on PYTHONPATH makes the `typhoon` package
+resolve to the modules next to this file, which implement the hil.* and
+SchematicAPI calls SystemLevel_Scenarios.py and its helpers use:
+
+    PYTHONPATH=mock_typhoon python -m pytest SystemLevel_Scenarios.py
+
+Every call is counted and costs a simulated latency (LATENCIES, overridden
+by SMT_MOCK_LATENCY="compile=5,load_model=1"). Latencies and wait_sec()
+advance a virtual clock instead of sleeping, so a full run takes seconds;
+clock.now() is real time plus everything fast-forwarded. With
+SMT_MOCK_SLEEP=1 the latencies are slept for real (wait_sec() is still
+fast-forwarded), which is what background work overlapping them needs.
+
+The mock never writes the .tse: property changes live in memory and
+compile() writes a small artifact describing them to a temporary folder.
+Captures deliver sine waves once stopped, sized by the capture settings
+and the virtual time the capture ran. Signals read back SIGNALS values.
+"""
+
+import collections
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+
+# Simulated duration of each API call in seconds; other calls take DEFAULT_LATENCY
+LATENCIES = {
+    "compile": 20.0,
+    "load": 1.0,              # SchematicAPI.load
+    "save": 0.3,
+    "load_model": 4.0,        # hil.load_model
+    "start_simulation": 0.5,
+    "stop_simulation": 0.2,
+    "start_capture": 0.05,
+    "stop_capture": 0.1,
+    "detect_hw_settings": 0.5,
+}
+DEFAULT_LATENCY = 0.002
+SIM_STEP = 1e-6  # seconds, returned by hil.get_sim_step()
+CHUNK_SAMPLES = 1 << 16  # samples per capture chunk handed to the data buffer
+
+# Values returned by hil.read_analog_signal(); a callable is called with the clock time
+SIGNALS = collections.defaultdict(float)
+
+ARTIFACT_DIR = os.path.join(tempfile.gettempdir(), "smt_mock_typhoon")
+SLEEP = os.environ.get("SMT_MOCK_SLEEP") == "1"
+
+
+def _parse_latencies(spec):
+    """{call: seconds} from "compile=5,load_model=1"."""
+    latencies = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, seconds = entry.partition("=")
+        latencies[name.strip()] = float(seconds)
+    return latencies
+
+
+LATENCIES.update(_parse_latencies(os.environ.get("SMT_MOCK_LATENCY", "")))
+
+
+class VirtualClock:
+    """Real monotonic time plus the time fast-forwarded by the mock."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.offset = 0.0
+
+    def now(self):
+        return time.monotonic() + self.offset
+
+    def advance(self, seconds):
+        with self.lock:
+            self.offset += max(0.0, seconds)
+
+
+clock = VirtualClock()
+
+# API call -> number of calls / simulated seconds, for this process
+calls = collections.Counter()
+simulated = collections.Counter()
+_stats_lock = threading.Lock()
+
+
+def simulate(name):
+    """Count a call and spend its latency."""
+    latency = LATENCIES.get(name, DEFAULT_LATENCY)
+    with _stats_lock:
+        calls[name] += 1
+        simulated[name] += latency
+    if SLEEP:
+        time.sleep(latency)
+    else:
+        clock.advance(latency)
+
+
+def snapshot():
+    """Copy of the call counts and simulated seconds so far."""
+    with _stats_lock:
+        return dict(calls), dict(simulated)
+
+
+def artifact_path(model_path):
+    """Where compile() puts the compiled artifact of a model file."""
+    stem = os.path.splitext(os.path.basename(model_path))[0]
+    digest = hashlib.sha1(os.path.abspath(model_path).encode("utf-8")).hexdigest()[:12]
+    folder = os.path.join(ARTIFACT_DIR, digest)
+    return os.path.join(folder, f"{stem}.cpd")
+
+
+class Capture:
+    """A running mock capture."""
+
+    def __init__(self, settings, channels, buffer, file_name):
+        self.decimation, _, samples = settings[:3]
+        self.max_samples = int(samples)
+        self.channels = list(channels)
+        self.buffer = buffer
+        self.file_name = file_name
+        self.start = clock.now()
+
+    def deliver(self):
+        """Hand the captured samples to the data buffer in chunks."""
+        sample_time = self.decimation * SIM_STEP
+        total = min(self.max_samples, int((clock.now() - self.start) / sample_time))
+        amplitudes = np.arange(1, len(self.channels) + 1, dtype=np.float64)[:, None]
+        put = self.buffer.put if hasattr(self.buffer, "put") else self.buffer.append
+        chunks = []
+        for start in range(0, total, CHUNK_SAMPLES):
+            t = np.arange(start, min(total, start + CHUNK_SAMPLES)) * sample_time
+            data = amplitudes * np.sin(2 * np.pi * 60.0 * t)
+            put((self.channels, data, t))
+            chunks.append((data, t))
+        if self.file_name:
+            self.export(chunks, total)
+
+    def export(self, chunks, total):
+        """Write the .mat the in-memory capture mode expects from stop_capture()."""
+        import mat_export
+
+        if chunks:
+            data = np.concatenate([c[0] for c in chunks], axis=1)
+            time_line = np.concatenate([c[1] for c in chunks])
+        else:
+            data, time_line = np.zeros((len(self.channels), 0)), np.zeros(0)
+        mat_export.write_capture(self.file_name, time_line,
+                                 {name: data[i] for i, name in enumerate(self.channels)}, total)
+
+
+class MockHil:
+    """hil.* calls used by the suite."""
+
+    def __init__(self):
+        self.capture = None
+        self.running = False
+        self.loaded = None
+
+    def wait_sec(self, seconds):
+        simulate("wait_sec")
+        clock.advance(seconds)
+
+    def load_model(self, file, vhil_device=False, **kwargs):
+        simulate("load_model")
+        if not os.path.exists(file):
+            raise RuntimeError(f"Compiled model not found: {file}")
+        self.loaded = file
+        return True
+
+    def get_sim_step(self):
+        return SIM_STEP
+
+    def start_simulation(self):
+        simulate("start_simulation")
+        self.running = True
+
+    def stop_simulation(self):
+        simulate("stop_simulation")
+        self.running = False
+
+    def start_capture(self, captureSettings, triggerSettings, channelSettings,
+                      dataBuffer=None, fileName=None, **kwargs):
+        simulate("start_capture")
+        self.capture = Capture(captureSettings, channelSettings, dataBuffer, fileName)
+        return True
+
+    def stop_capture(self):
+        simulate("stop_capture")
+        capture, self.capture = self.capture, None
+        if capture is not None:
+            capture.deliver()
+
+    def read_analog_signal(self, name=None, **kwargs):
+        simulate("read_analog_signal")
+        value = SIGNALS[name]
+        return value(clock.now()) if callable(value) else value
+
+    def _setter(name):
+        def call(self, *args, **kwargs):
+            simulate(name)
+        call.__name__ = name
+        return call
+
+    set_scada_input_value = _setter("set_scada_input_value")
+    set_source_constant_value = _setter("set_source_constant_value")
+    set_source_sine_waveform = _setter("set_source_sine_waveform")
+    prepare_source_sine_waveform = _setter("prepare_source_sine_waveform")
+    del _setter
+
+
+class MockSchematicAPI:
+    """SchematicAPI calls used by the suite; property values stay in memory.
+
+    Like the real API, every instance in a process edits the same open model.
+    """
+
+    path = None  # model file loaded in this process
+    values = {}  # (component, property) -> value
+
+    def load(self, filename, **kwargs):
+        simulate("load")
+        if not os.path.exists(filename):
+            raise RuntimeError(f"Model file not found: {filename}")
+        MockSchematicAPI.path = filename
+        MockSchematicAPI.values = {}
+        return True
+
+    def save(self):
+        simulate("save")
+        return True
+
+    def get_item(self, name, parent=None, item_type=None):
+        simulate("get_item")
+        return name
+
+    def prop(self, item, prop_name):
+        return (item, prop_name)
+
+    def set_property_value(self, prop, value):
+        simulate("set_property_value")
+        MockSchematicAPI.values[prop] = value
+
+    def get_model_property_value(self, prop_name):
+        return {"hil_device": "HIL604", "hil_configuration_id": 1}.get(prop_name)
+
+    def detect_hw_settings(self):
+        simulate("detect_hw_settings")
+        raise RuntimeError("No HIL device (mock backend)")
+
+    def get_compiled_model_file(self, sch_path):
+        return artifact_path(sch_path)
+
+    def compile(self, **kwargs):
+        """Write an artifact identifying the model and its property values."""
+        simulate("compile")
+        path = artifact_path(self.path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        values = sorted((f"{item}.{prop}", value) for (item, prop), value in self.values.items())
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"model": os.path.basename(self.path), "values": values}, f)
+        return True
+
+
+# Behind the module functions of typhoon.api.hil
+hil = MockHil()
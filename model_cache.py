@@ -0,0 +1,100 @@
+"""
+Persistent cache of compiled HIL models for SystemLevel_Scenarios.py.
+
+Compiling the schematic takes tens of seconds to minutes, but the scenario
+suite only ever varies a handful of component values (R5, R6, R9, R34,
+Lgrid). Each compiled model is stored under a key derived from the .tse
+hash and the full set of component values, so a configuration that was
+already built - in this session or an earlier one - is copied back into
+place instead of being recompiled.
+
+The cache lives in .model_cache/ next to this file and is bounded in size;
+least recently used entries are evicted first.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".model_cache")
+CACHE_MAX_BYTES = 2 * 1024 ** 3  # Evict least recently used builds above 2 GB
+CACHE_SUFFIX = ".cpd"
+
+
+def file_hash(path):
+    """Return the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(model_hash, values):
+    """Build the cache key for a model hash and its component values."""
+    normalized = {name: float(value) for name, value in values.items()}
+    payload = json.dumps({"model": model_hash, "values": normalized}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ModelCache:
+    """Content-addressed, size-bounded store of compiled model files."""
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, key + CACHE_SUFFIX)
+
+    def contains(self, key):
+        return os.path.exists(self.path(key))
+
+    def fetch(self, key, dest):
+        """Copy the cached build for key to dest. Returns False on a miss."""
+        src = self.path(key)
+        try:
+            shutil.copyfile(src, dest)
+        except FileNotFoundError:
+            self.misses += 1
+            return False
+        # Touch the entry so eviction sees it as recently used
+        os.utime(src, None)
+        self.hits += 1
+        return True
+
+    def store(self, key, src):
+        """Add the compiled model at src to the cache under key."""
+        dest = self.path(key)
+        tmp = f"{dest}.{os.getpid()}.tmp"
+        shutil.copyfile(src, tmp)
+        os.replace(tmp, dest)  # Atomic, so readers never see a partial file
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits max_bytes."""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(CACHE_SUFFIX):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
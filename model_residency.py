@@ -0,0 +1,52 @@
+"""
+Tracks which compiled model is loaded on the HIL device.
+
+hil.load_model() is slow, and consecutive scenarios on the same circuit
+configuration load a byte-identical compiled model. ModelResidency records
+the hash of the artifact currently on the device; when asked to load the
+same artifact again it runs a fast state reset instead (restoring sources
+and SCADA inputs to their defaults) and keeps track of the load time saved.
+"""
+
+import time
+
+import model_cache
+
+
+class ModelResidency:
+    """Skip hil.load_model() when the compiled model is already on the device."""
+
+    def __init__(self, hil, reset):
+        self.hil = hil
+        self.reset = reset      # callable restoring the model's default state
+        self.resident = None    # hash of the compiled model on the device
+        self.loads = 0
+        self.skipped = 0
+        self.load_seconds = 0.0
+
+    def load(self, path, vhil_device=False):
+        """Load path onto the device. Returns False if it was already resident."""
+        digest = model_cache.file_hash(path)
+        if digest == self.resident:
+            self.reset()
+            self.skipped += 1
+            return False
+
+        self.resident = None  # Unknown until the load succeeds
+        start = time.perf_counter()
+        self.hil.load_model(path, vhil_device=vhil_device)
+        self.load_seconds += time.perf_counter() - start
+        self.loads += 1
+        self.resident = digest
+        return True
+
+    def invalidate(self):
+        """Forget the resident model, forcing the next load."""
+        self.resident = None
+
+    @property
+    def saved_seconds(self):
+        """Estimated load time saved, from the average measured load time."""
+        if self.loads == 0:
+            return 0.0
+        return self.skipped * self.load_seconds / self.loads
@@ -0,0 +1,229 @@
+"""
+pytest plugin attributing each test's wall time to phases.
+
+A full run is slow, but the console does not show where the time goes.
+This plugin (loaded by conftest.py) wraps the Typhoon entry points the
+scenarios use, wherever they are called from (the test module, the model
+residency, the limit monitor, the schematic batch):
+
+    model.compile / save / load, schematic edits    -> compile, save, schematic_load, schematic_edit
+    hil.load_model, start/stop_simulation           -> load_model, start_simulation, stop_simulation
+    hil.start_capture / stop_capture                -> start_capture, capture_finalize
+    hil.wait_sec, read_analog_signal, set_*/prepare_* -> scripted_wait, signal_read, signal_write
+    CompilePipeline.wait (background compile)       -> compile
+    CaptureWriter.submit / drain (background write) -> capture_finalize
+
+Only calls on the thread running the tests count; background compiles and
+capture writes overlap them. What is left of a test's wall time (fixtures,
+cache lookups, Python) is "other".
+
+Each test's breakdown is posted to SMT_Server.py (/timing) as soon as it
+finishes, for the dashboard. At the end of the session the per-test table
+is written to phase_timing.csv / phase_timing.json in the results folder
+and the slowest phases are printed.
+"""
+
+import csv
+import functools
+import json
+import sys
+import threading
+import time
+
+import pytest
+
+import capture_writer
+import compile_pipeline
+import run_manifest
+import smt_client
+
+
+TIMING_NAME = "phase_timing"  # .csv and .json in the results folder
+OTHER = "other"
+SLOWEST_PHASES = 10  # rows of the end-of-session table
+
+# hil function -> phase
+HIL_PHASES = {
+    "load_model": "load_model",
+    "start_simulation": "start_simulation",
+    "stop_simulation": "stop_simulation",
+    "start_capture": "start_capture",
+    "stop_capture": "capture_finalize",
+    "wait_sec": "scripted_wait",
+    "read_analog_signal": "signal_read",
+}
+HIL_PREFIX_PHASE = (("set_", "prepare_"), "signal_write")
+
+# SchematicAPI method -> phase
+MODEL_PHASES = {
+    "compile": "compile",
+    "save": "save",
+    "load": "schematic_load",
+    "get_item": "schematic_edit",
+    "set_property_value": "schematic_edit",
+}
+# Module attributes holding SchematicAPI instances in the test modules
+MODEL_ATTRIBUTES = ("model", "mdl")
+
+# Methods waiting on the suite's own background work -> phase
+BACKGROUND_PHASES = [
+    (compile_pipeline.CompilePipeline, "wait", "compile"),
+    (capture_writer.CaptureWriter, "submit", "capture_finalize"),  # blocks while the queue is full
+    (capture_writer.CaptureWriter, "drain", "capture_finalize"),
+]
+
+
+class PhaseTimer:
+    """Wall time per phase of the running test."""
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.thread = None  # ident of the thread running the tests
+        self.test = None  # nodeid of the running test
+        self.phases = {}  # phase -> [seconds, calls] of the running test
+        self.start = None
+        self.rows = []  # finished tests, in order
+        self.patched = []  # (owner, name, original or None if it was not an own attribute)
+
+    def wrap(self, function, phase):
+        """Return function, timed as phase while a test runs on the test thread."""
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            if self.test is None or threading.get_ident() != self.thread:
+                return function(*args, **kwargs)
+            start = self.clock()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                entry = self.phases.setdefault(phase, [0.0, 0])
+                entry[0] += self.clock() - start
+                entry[1] += 1
+        return timed
+
+    def patch(self, owner, name, phase):
+        """Replace owner.name with its timed version (undone by restore())."""
+        function = getattr(owner, name, None)
+        if not callable(function):
+            return
+        own = vars(owner).get(name) if hasattr(owner, "__dict__") else None
+        self.patched.append((owner, name, own))
+        setattr(owner, name, self.wrap(function, phase))
+
+    def instrument(self, hil, models):
+        """Time the functions of the hil module, the methods of SchematicAPI instances
+        and the waits on background compiles and capture writes."""
+        for name in dir(hil):
+            if name in HIL_PHASES:
+                self.patch(hil, name, HIL_PHASES[name])
+            elif name.startswith(HIL_PREFIX_PHASE[0]):
+                self.patch(hil, name, HIL_PREFIX_PHASE[1])
+        for instance in models:
+            for name, phase in MODEL_PHASES.items():
+                self.patch(instance, name, phase)
+        for owner, name, phase in BACKGROUND_PHASES:
+            self.patch(owner, name, phase)
+
+    def restore(self):
+        for owner, name, own in reversed(self.patched):
+            if own is None:
+                delattr(owner, name)
+            else:
+                setattr(owner, name, own)
+        self.patched = []
+
+    def begin(self, test):
+        self.thread = threading.get_ident()
+        self.phases = {}
+        self.test = test
+        self.start = self.clock()
+
+    def end(self):
+        """Finish the running test. Returns its row."""
+        wall = self.clock() - self.start
+        phases = {phase: {"seconds": seconds, "calls": calls}
+                  for phase, (seconds, calls) in sorted(self.phases.items())}
+        row = {"test": self.test, "wall_s": wall, "phases": phases,
+               "other_s": max(0.0, wall - sum(seconds for seconds, _ in self.phases.values()))}
+        self.test = None
+        self.rows.append(row)
+        return row
+
+    def totals(self):
+        """phase -> seconds, calls, slowest test and its seconds, over the finished tests."""
+        totals = {}
+        for row in self.rows:
+            phases = dict(row["phases"], **{OTHER: {"seconds": row["other_s"], "calls": 0}})
+            for phase, entry in phases.items():
+                total = totals.setdefault(phase, {"seconds": 0.0, "calls": 0,
+                                                  "max_s": 0.0, "max_test": None})
+                total["seconds"] += entry["seconds"]
+                total["calls"] += entry["calls"]
+                if entry["seconds"] > total["max_s"]:
+                    total["max_s"] = entry["seconds"]
+                    total["max_test"] = row["test"]
+        return totals
+
+    def write(self, folder, run_id):
+        """Write the per-test table as CSV and JSON. Returns the CSV path."""
+        totals = self.totals()
+        phases = sorted(phase for phase in totals if phase != OTHER)
+        path = folder / f"{TIMING_NAME}.csv"
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["test", "wall_s", *phases, OTHER])
+            for row in self.rows:
+                writer.writerow([row["test"], f"{row['wall_s']:.3f}",
+                                 *(f"{row['phases'].get(phase, {}).get('seconds', 0.0):.3f}"
+                                   for phase in phases),
+                                 f"{row['other_s']:.3f}"])
+        with open(folder / f"{TIMING_NAME}.json", "w", encoding="utf-8") as f:
+            json.dump({"run_id": run_id, "tests": self.rows, "totals": totals}, f, indent=1)
+        return path
+
+
+timer = PhaseTimer()
+
+
+def pytest_collection_finish(session):
+    hil = sys.modules.get("typhoon.api.hil")
+    if hil is None:
+        return  # No Typhoon tests collected
+    models = []
+    for module in {item.module for item in session.items if getattr(item, "module", None)}:
+        for attribute in MODEL_ATTRIBUTES:
+            instance = getattr(module, attribute, None)
+            if instance is not None and all(instance is not other for other in models):
+                models.append(instance)
+    timer.instrument(hil, models)
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_protocol(item, nextitem):
+    timer.begin(item.nodeid)
+    yield
+    row = timer.end()
+    smt_client.post("/timing", {"run_id": item.config.getoption("run_id"), **row})
+
+
+def pytest_sessionfinish(session):
+    if not timer.rows:
+        return
+    run_id = session.config.getoption("run_id")
+    folder = run_manifest.results_folder(run_id)
+    if folder.is_dir():
+        print(f"\n  >> Phase timing: {timer.write(folder, run_id)}")
+
+    totals = timer.totals()
+    wall = sum(row["wall_s"] for row in timer.rows)
+    print(f"\n  >> Slowest phases over {len(timer.rows)} tests ({wall:.1f} s):")
+    print(f"     {'phase':<18} {'total':>9} {'share':>6} {'calls':>6} {'per call':>9}  slowest test")
+    slowest = sorted(totals.items(), key=lambda entry: entry[1]["seconds"], reverse=True)
+    for phase, total in slowest[:SLOWEST_PHASES]:
+        per_call = f"{total['seconds'] / total['calls']:.3f}s" if total["calls"] else ""
+        print(f"     {phase:<18} {total['seconds']:>8.1f}s {100 * total['seconds'] / max(wall, 1e-9):>5.1f}% "
+              f"{total['calls']:>6} {per_call:>9}  "
+              f"{(total['max_test'] or '').split('::')[-1]} ({total['max_s']:.1f}s)")
+
+
+def pytest_unconfigure(config):
+    timer.restore()
@@ -0,0 +1,96 @@
+"""
+Settle detection for the waits between and inside scenarios.
+
+The scenario scripts use fixed hil.wait_sec() calls, sized for the worst
+case, to let the DC link ramp up. wait_until_settled()
+polls selected measurements through the HIL API instead and returns as soon
+as all of them have stayed inside tolerance for a hold time. The fixed wait
+remains the upper bound, so a signal that never settles costs exactly what
+the fixed wait did. A signal that cannot be read is left out of the wait;
+when none is left, the wait falls back to its fixed time. Both are
+reported once per signal, so a lost saving shows in the console.
+
+Signals only move while the simulation runs: a settle step after
+hil.stop_simulation() would read frozen values, so the cool-downs there
+remain fixed waits.
+"""
+
+import collections
+import time
+
+
+# signal: analog signal name read with hil.read_analog_signal()
+# target: value the signal must be near, or None to only require it to be steady
+# tolerance: allowed deviation from target, or from the first value of the hold window
+Limit = collections.namedtuple("Limit", ["signal", "target", "tolerance"])
+
+POLL_INTERVAL = 0.2  # seconds between reads
+HOLD_TIME = 1.0      # seconds all limits must hold before moving on
+
+warned = set()  # warnings already printed
+
+
+def warn_once(message):
+    if message not in warned:
+        warned.add(message)
+        print(f"\n  >> Settle detection: {message}")
+
+
+def read_signals(hil, limits):
+    """Read every limited signal. Returns the values and the limits that cannot be read."""
+    values = {}
+    unreadable = []
+    for limit in limits:
+        try:
+            values[limit.signal] = float(hil.read_analog_signal(name=limit.signal))
+        except Exception:
+            unreadable.append(limit)
+    return values, unreadable
+
+
+def within(limits, values, reference):
+    """True if every value is inside its tolerance."""
+    for limit in limits:
+        center = limit.target if limit.target is not None else reference[limit.signal]
+        if abs(values[limit.signal] - center) > limit.tolerance:
+            return False
+    return True
+
+
+def wait_until_settled(hil, limits, max_wait, hold=HOLD_TIME, poll=POLL_INTERVAL,
+                       clock=time.monotonic):
+    """Wait until limits hold for `hold` seconds, but never longer than max_wait.
+
+    Returns the number of seconds saved compared to waiting max_wait.
+    """
+    start = clock()
+    hold_start = None
+    reference = None
+
+    while True:
+        elapsed = clock() - start
+        if elapsed >= max_wait:
+            return 0.0
+
+        values, unreadable = read_signals(hil, limits)
+        for limit in unreadable:
+            warn_once(f"cannot read {limit.signal}, left out of the waits")
+        limits = [limit for limit in limits if limit not in unreadable]
+        if not limits:
+            warn_once(f"no readable signal among {', '.join(limit.signal for limit in unreadable)}, "
+                      f"waiting the full fixed time")
+            hil.wait_sec(max_wait - elapsed)
+            return 0.0
+
+        now = clock()
+        if hold_start is not None and within(limits, values, reference):
+            if now - hold_start >= hold:
+                return max(0.0, max_wait - (now - start))
+        elif within(limits, values, values):
+            # Start a new hold window from the current readings
+            hold_start = now
+            reference = values
+        else:
+            hold_start = None
+
+        hil.wait_sec(min(poll, max(0.0, max_wait - (now - start))))
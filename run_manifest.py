@@ -0,0 +1,78 @@
+"""
+Checkpoint manifest of a scenario run, for resuming interrupted runs.
+
+Every run saves its captures to Results/Test_Results_<run id>. Next to
+them run_manifest.json records each scenario that passed: its test node
+id, label, .mat file and parameters. The manifest is rewritten atomically
+after every scenario, so a crash or Ctrl+C leaves it consistent.
+
+pytest --resume [RUN_ID] reuses that run id - and so its results folder -
+and conftest.py deselects the scenarios the manifest lists as completed.
+A scenario only counts as completed once its .mat file exists; captures
+still being written when the run stopped are run again.
+"""
+
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+
+RESULTS_DIR = Path(__file__).parent / "Results"
+MANIFEST_NAME = "run_manifest.json"
+
+
+def results_folder(run_id):
+    """Results folder of a run."""
+    return RESULTS_DIR / f"Test_Results_{run_id}"
+
+
+def latest_run_id():
+    """Run id of the most recently updated run with a manifest, or None."""
+    manifests = sorted(RESULTS_DIR.glob(f"Test_Results_*/{MANIFEST_NAME}"),
+                       key=lambda path: path.stat().st_mtime)
+    if not manifests:
+        return None
+    return manifests[-1].parent.name[len("Test_Results_"):]
+
+
+class RunManifest:
+    """Completed scenarios of one run, persisted in its results folder."""
+
+    def __init__(self, folder):
+        self.folder = Path(folder)
+        self.path = self.folder / MANIFEST_NAME
+        self.data = self._load() or {"run_id": self.folder.name[len("Test_Results_"):],
+                                     "created": datetime.now().isoformat(timespec="seconds"),
+                                     "scenarios": {}}
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def record(self, nodeid, label, mat_file, params):
+        """Mark a scenario as completed and save the manifest."""
+        self.data["scenarios"][nodeid] = {
+            "label": label,
+            "mat": mat_file,
+            "params": params,
+            "finished": datetime.now().isoformat(timespec="seconds"),
+        }
+        self.save()
+
+    def save(self):
+        """Write the manifest atomically."""
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self.data["updated"] = datetime.now().isoformat(timespec="seconds")
+        tmp = self.path.with_name(f"{MANIFEST_NAME}.{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, indent=2, default=repr)
+        os.replace(tmp, self.path)
+
+    def completed(self):
+        """Node ids of completed scenarios whose .mat file is on disk."""
+        return {nodeid for nodeid, entry in self.data["scenarios"].items()
+                if (self.folder / entry["mat"]).exists()}
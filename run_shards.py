@@ -0,0 +1,94 @@
+"""
+Run the scenario suite split across several HIL devices at once.
+
+Usage:
+    python run_shards.py -n 3 [--vhil] [--resume TIMESTAMP] [-- <extra pytest arguments>]
+
+Starts one pytest process per shard. Each shard runs its share of
+SystemLevel_Scenarios.py (balanced by scenario_scheduler.partition() on
+estimated scenario time and circuit signature) on its own working copy of
+the model, saves its .mat files to Results/Test_Results_<run id> and
+reports to SMT_Server.py under its run id. Shard console output goes to
+pytest_console_<run id>.log, which the server streams with a run id prefix.
+
+The Typhoon HIL API has no per-call device selection: every process on
+this computer loads its models onto the same connected device. More than
+one shard is therefore only started with --vhil, which runs every shard on
+its own virtual HIL device. To shard across hardware, run one shard per
+computer with pytest's --shard-count / --shard-index options. --resume
+continues an interrupted sharded run: every shard resumes its own run id.
+"""
+
+import argparse
+import glob
+import os
+import subprocess
+import sys
+from datetime import datetime
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+TEST_FILE = os.path.join(SCRIPT_DIR, "SystemLevel_Scenarios.py")
+
+
+def shard_command(count, index, run_id, pytest_args):
+    """pytest command line running one shard."""
+    return [sys.executable, "-m", "pytest", TEST_FILE,
+            f"--shard-count={count}", f"--shard-index={index}", f"--run-id={run_id}",
+            *pytest_args]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run SystemLevel_Scenarios.py in parallel shards.")
+    parser.add_argument("-n", "--shards", type=int, default=2, help="number of shards (devices)")
+    parser.add_argument("--vhil", action="store_true", help="run every shard on a virtual HIL device")
+    parser.add_argument("--resume", metavar="TIMESTAMP",
+                        help="resume the sharded run started at TIMESTAMP (same shard count)")
+    parser.add_argument("pytest_args", nargs=argparse.REMAINDER,
+                        help="extra pytest arguments, after --")
+    args = parser.parse_args(argv)
+
+    pytest_args = args.pytest_args[1:] if args.pytest_args[:1] == ["--"] else args.pytest_args
+    if "--vhil" in pytest_args:
+        args.vhil = True
+    if args.shards > 1 and not args.vhil:
+        parser.error("more than one shard would load models onto the same HIL device at once; "
+                     "use --vhil, or run one shard per computer with --shard-count/--shard-index")
+    if args.vhil and "--vhil" not in pytest_args:
+        pytest_args = [*pytest_args, "--vhil"]
+
+    # Shard logs (and their segments) of an earlier run would be streamed again by the server
+    for old_log in (glob.glob(os.path.join(SCRIPT_DIR, "pytest_console_*.log"))
+                    + glob.glob(os.path.join(SCRIPT_DIR, "pytest_console_*.log.gz"))
+                    + glob.glob(os.path.join(SCRIPT_DIR, "pytest_console_*.index.json"))):
+        try:
+            os.remove(old_log)
+        except OSError:
+            pass
+
+    timestamp = args.resume or datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    shards = []
+    for index in range(args.shards):
+        run_id = f"{timestamp}_shard{index}"
+        command = shard_command(args.shards, index, run_id, pytest_args)
+        if args.resume:
+            command.append(f"--resume={run_id}")
+        # Output is in the shard's console log; keep the terminal readable
+        proc = subprocess.Popen(command, cwd=SCRIPT_DIR, stdout=subprocess.DEVNULL)
+        shards.append((run_id, proc))
+        print(f"  >> Started {run_id} (pid {proc.pid})")
+
+    try:
+        codes = [proc.wait() for _, proc in shards]
+    except KeyboardInterrupt:
+        # Ctrl+C reaches the shards too; let them stop their captures and report
+        print("\n  >> Stopping shards...")
+        codes = [proc.wait() for _, proc in shards]
+
+    for (run_id, _), code in zip(shards, codes):
+        print(f"  >> {run_id}: exit code {code}, results in "
+              f"{os.path.join('Results', f'Test_Results_{run_id}')}")
+    return max(codes, default=0)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""
+Scenario duration history, for the progress and ETA of a run.
+
+The heartbeat used to tell the server only that the run was alive, so
+nobody could see how far a multi-hour run had got or when it would end.
+Results/scenario_durations.json keeps an exponential moving average of
+each test's wall time (setup, call and teardown) over earlier runs,
+updated at the end of every run:
+
+    {"SystemLevel_Scenarios.py::test_SA_CurrentLimit_Line[1-10]": 84.2, ...}
+
+RunProgress follows the running session and estimates the time left from
+that history. A test without history is estimated from its scripted
+scenario time, scaled by how much longer than scripted the tests with
+history took.
+"""
+
+import contextlib
+import json
+import os
+import time
+
+import run_manifest
+
+
+HISTORY_FILE = run_manifest.RESULTS_DIR / "scenario_durations.json"
+SMOOTHING = 0.3  # weight of the latest run in the moving average
+LOCK_TIMEOUT = 10.0  # seconds update() waits for another process's update
+LOCK_STALE = 30.0  # a lock file this old was left by a crashed process
+
+
+def load(path=HISTORY_FILE):
+    """Test node id -> average duration in seconds ({} without history)."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+@contextlib.contextmanager
+def locked(path):
+    """Hold <path>.lock, so shards finishing together update the file one at a time."""
+    lock = path.with_name(f"{path.name}.lock")
+    deadline = time.monotonic() + LOCK_TIMEOUT
+    while True:
+        try:
+            os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            break
+        except FileExistsError:
+            try:
+                if time.time() - lock.stat().st_mtime > LOCK_STALE:
+                    lock.unlink()
+                    continue
+            except OSError:
+                continue  # Released meanwhile
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"{lock} is held by another process")
+            time.sleep(0.05)
+    try:
+        yield
+    finally:
+        try:
+            lock.unlink()
+        except OSError:
+            pass
+
+
+def update(durations, path=HISTORY_FILE):
+    """Fold a run's test durations (node id -> seconds) into the history."""
+    if not durations:
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with locked(path):
+        history = load(path)  # Re-read under the lock: shards of the same run update it too
+        for test, seconds in durations.items():
+            previous = history.get(test)
+            history[test] = seconds if previous is None else previous + SMOOTHING * (seconds - previous)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(history, f, indent=1, sort_keys=True)
+        os.replace(tmp, path)
+
+
+class RunProgress:
+    """Position of the running test and the estimated time left."""
+
+    def __init__(self, tests, scripted, history=None, clock=time.monotonic, wall=time.time, done=0):
+        """tests: node ids in run order; scripted: node id -> scripted seconds.
+
+        done: tests of a resumed run that were completed before it stopped;
+        they count as finished, so the progress continues where it was.
+        """
+        history = load() if history is None else history
+        known = [test for test in tests if test in history and scripted.get(test)]
+        scale = 1.0
+        if known:
+            scale = sum(history[test] for test in known) / sum(scripted[test] for test in known)
+        self.estimates = {test: history.get(test, scale * scripted.get(test, 0.0)) for test in tests}
+        self.known = sum(test in history for test in tests)  # tests estimated from history
+
+        self.tests = list(tests)
+        self.done = done
+        self.clock = clock
+        self.wall = wall
+        self.start = clock()
+        self.finished = 0
+        self.current = None  # node id of the running test
+        self.current_start = None
+        self.durations = {}  # node id -> seconds, of this run's finished tests
+
+    def begin(self, test):
+        self.current = test
+        self.current_start = self.clock()
+
+    def end(self, test, record=True):
+        """Finish the running test; record=False keeps its duration out of the history."""
+        if record:
+            self.durations[test] = self.clock() - self.current_start
+        self.finished += 1
+        self.current = None
+
+    def snapshot(self):
+        """Progress for the heartbeat: counts, elapsed time and ETA."""
+        now = self.clock()
+        remaining = sum(self.estimates[test] for test in self.tests[self.finished:])
+        if self.current is not None:
+            # Time already spent in the running test is no longer ahead
+            remaining -= min(now - self.current_start, self.estimates.get(self.current, 0.0))
+        return {
+            "total": self.done + len(self.tests),
+            "index": self.done + self.finished + (self.current is not None),  # 1-based, of the running test
+            "finished": self.done + self.finished,
+            "current": self.current,
+            "elapsed_s": round(now - self.start, 1),
+            "eta_s": round(remaining, 1),
+            "finish_at": round(self.wall() + remaining, 1),
+        }
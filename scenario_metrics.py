@@ -0,0 +1,212 @@
+"""
+Per-scenario waveform metrics, computed while the suite keeps running.
+
+As soon as a scenario's .mat file is on disk, MetricsPipeline analyses it
+in a process pool, overlapping with the next scenarios on the hardware.
+For every captured channel analyze() computes, with vectorized NumPy:
+
+- windowed RMS over one fundamental cycle (mean and maximum)
+- harmonic content: THD and orders 2..11 per unit of the fundamental,
+  taken from the steadiest stretch of the capture, and the largest
+  deviation from the harmonics configured on the grid source
+- overshoot and settling time after each Grid_avai / Load_Dist transition
+  of the timeline (the worst over all transitions is reported)
+
+Results go to metrics_summary.csv in the run's results folder, one row
+per scenario and channel, rewritten after every scenario.
+"""
+
+import csv
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+
+SUMMARY_NAME = "metrics_summary.csv"
+FUNDAMENTAL = 60.0          # Hz
+HARMONIC_ORDERS = range(2, 12)
+THD_MAX_ORDER = 40
+STEADY_CYCLES = 10          # cycles analysed for harmonic content
+SETTLING_BAND = 0.02        # settled within 2 % of the final value
+FINAL_CYCLES = 5            # cycles averaged for a segment's final value
+EVENT_SIGNALS = ("Grid_avai", "Load_Dist")
+
+COLUMNS = (["scenario", "channel", "rms_mean", "rms_max", "thd_pct", "harmonic_error_pu",
+            "overshoot_pct", "settling_s", "transitions"]
+           + [f"h{order}_pu" for order in HARMONIC_ORDERS] + ["error"])
+
+
+def transitions(records):
+    """Times (s from capture start) of Grid_avai and Load_Dist changes in timeline records."""
+    return [r["actual"] for r in records
+            if r["action"] == "scada" and r["args"][0] in EVENT_SIGNALS]
+
+
+def configured_harmonics(steps):
+    """{order: rms pu} last set on the grid source Vg_src by a list of steps, or None."""
+    harmonics = None
+    for _, action, args in steps:
+        if action in ("sine", "prepare_sine") and args[0] == "Vg_src" and "harmonics_pu" in args[1]:
+            harmonics = {int(order): float(rms) for order, rms, _ in args[1]["harmonics_pu"]}
+    return harmonics
+
+
+def load_capture(mat_path):
+    """Return (time_line, {channel: samples}) from a capture .mat."""
+    from scipy.io import loadmat
+
+    mat = loadmat(mat_path)
+    time_line = np.asarray(mat["time_line"], dtype=float).ravel()
+    data = mat["channels_data"][0, 0]
+    return time_line, {name: np.asarray(data[name], dtype=float).ravel()
+                       for name in data.dtype.names}
+
+
+def windowed_rms(x, window):
+    """RMS of consecutive windows of `window` samples."""
+    count = len(x) // window
+    if count == 0:
+        return np.sqrt(np.mean(x ** 2, keepdims=True)) if len(x) else np.zeros(0)
+    frames = x[:count * window].reshape(count, window)
+    return np.sqrt(np.mean(frames ** 2, axis=1))
+
+
+def harmonic_content(x, fs):
+    """(THD %, {order: pu of fundamental}) over the last STEADY_CYCLES cycles of x."""
+    cycles = min(STEADY_CYCLES, int(len(x) * FUNDAMENTAL / fs))
+    n = int(round(cycles * fs / FUNDAMENTAL))
+    if cycles == 0 or n < 4:
+        return float("nan"), {}
+    spectrum = np.abs(np.fft.rfft(x[-n:] - np.mean(x[-n:])))
+    fundamental = spectrum[cycles]
+    if fundamental == 0:
+        return float("nan"), {}
+    max_order = min(THD_MAX_ORDER, (len(spectrum) - 1) // cycles)
+    orders = np.arange(2, max_order + 1)
+    ratios = spectrum[orders * cycles] / fundamental
+    thd = 100.0 * np.sqrt(np.sum(ratios ** 2))
+    return thd, {int(order): float(ratio) for order, ratio in zip(orders, ratios)}
+
+
+def step_response(envelope, window_s):
+    """(overshoot %, settling time s) of an envelope segment starting at a transition."""
+    if len(envelope) <= FINAL_CYCLES:
+        return float("nan"), float("nan")
+    final = np.mean(envelope[-FINAL_CYCLES:])
+    scale = max(abs(final), 1e-9)
+    overshoot = 100.0 * max(0.0, np.max(envelope) - final) / scale
+    band = max(SETTLING_BAND * abs(final), 0.01 * np.max(np.abs(envelope)))
+    outside = np.nonzero(np.abs(envelope - final) > band)[0]
+    settling = (outside[-1] + 1) * window_s if len(outside) else 0.0
+    return overshoot, settling
+
+
+def analyze(label, mat_path, events, harmonics):
+    """Compute the metrics rows of one scenario's capture."""
+    time_line, channels = load_capture(mat_path)
+    if len(time_line) < 2:
+        return [{"scenario": label, "channel": name, "error": "empty capture"} for name in channels]
+
+    fs = 1.0 / np.median(np.diff(time_line))
+    window = max(1, int(round(fs / FUNDAMENTAL)))
+    window_s = window / fs
+    # Transitions as envelope window indices (event times count from the capture start)
+    windows = len(time_line) // window
+    bounds = [b for b in (int(t / window_s) for t in sorted(events)) if b < windows]
+
+    rows = []
+    for name, x in channels.items():
+        envelope = windowed_rms(x, window)
+        row = {"scenario": label, "channel": name,
+               "rms_mean": float(np.mean(envelope)), "rms_max": float(np.max(envelope)),
+               "transitions": len(bounds)}
+
+        # Harmonic content over the end of the longest stretch without transitions
+        edges = [0, *[b * window for b in bounds], len(x)]
+        quiet = max(zip(edges, edges[1:]), key=lambda e: e[1] - e[0])
+        thd, ratios = harmonic_content(x[quiet[0]:quiet[1]], fs)
+        row["thd_pct"] = float(thd)
+        for order in HARMONIC_ORDERS:
+            row[f"h{order}_pu"] = ratios.get(order, float("nan"))
+        if harmonics and ratios:
+            row["harmonic_error_pu"] = max(abs(ratios.get(order, 0.0) - rms)
+                                           for order, rms in harmonics.items())
+
+        responses = [step_response(envelope[b:e], window_s)
+                     for b, e in zip(bounds, [*bounds[1:], len(envelope)]) if e > b]
+        if responses:
+            row["overshoot_pct"] = float(np.nanmax([r[0] for r in responses]))
+            row["settling_s"] = float(np.nanmax([r[1] for r in responses]))
+        rows.append(row)
+    return rows
+
+
+class MetricsPipeline:
+    """Analyse scenario captures in a process pool and keep a summary table."""
+
+    def __init__(self, results_folder, workers=1):
+        self.summary_path = os.path.join(results_folder, SUMMARY_NAME)
+        self.executor = ProcessPoolExecutor(max_workers=workers)
+        self.lock = threading.Lock()
+        self.expected = {}  # label -> (events, harmonics) until its .mat is written
+        self.futures = []
+        self.rows = {}  # label -> metric rows
+
+    def expect(self, label, events, harmonics):
+        """Register a scenario whose capture is being written."""
+        with self.lock:
+            self.expected[label] = (events, harmonics)
+
+    def ready(self, label, mat_path):
+        """Start analysing a scenario once its .mat is on disk (any thread)."""
+        with self.lock:
+            spec = self.expected.pop(label, None)
+        if spec is None:
+            return
+        try:
+            future = self.executor.submit(analyze, label, mat_path, *spec)
+        except Exception as e:  # Pool broken or shut down; keep the writer thread alive
+            with self.lock:
+                self.rows[label] = [{"scenario": label, "error": f"{type(e).__name__}: {e}"}]
+                self.write_summary()
+            return
+        future.add_done_callback(lambda f: self._store(label, f))
+        with self.lock:
+            self.futures.append(future)
+
+    def _store(self, label, future):
+        try:
+            rows = future.result()
+        except Exception as e:
+            rows = [{"scenario": label, "error": f"{type(e).__name__}: {e}"}]
+        with self.lock:
+            self.rows[label] = rows
+            self.write_summary()
+
+    @property
+    def failed(self):
+        """Number of scenarios whose capture could not be analysed."""
+        return sum(any(row.get("error") for row in rows) for rows in self.rows.values())
+
+    def write_summary(self):
+        """Rewrite the summary table atomically (call with the lock held)."""
+        tmp = f"{self.summary_path}.tmp"
+        with open(tmp, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=COLUMNS, restval="")
+            writer.writeheader()
+            for rows in self.rows.values():
+                writer.writerows(rows)
+        os.replace(tmp, self.summary_path)
+
+    def close(self):
+        """Wait for every analysis and shut the pool down."""
+        with self.lock:
+            futures = list(self.futures)
+        for future in futures:
+            try:
+                future.result()
+            except Exception:
+                pass  # Recorded as an error row by _store
+        self.executor.shutdown(wait=True)
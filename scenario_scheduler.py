@@ -0,0 +1,94 @@
+"""
+Compile-signature aware ordering of the scenario suite.
+
+Each test in SystemLevel_Scenarios.py declares the schematic configuration
+it needs with a ``circuit`` marker: a function of the test's parameters
+that returns the full set of component values (R5, R6, R9, R34, Lgrid).
+Tests with identical values share a circuit signature and can run on the
+same compiled model.
+
+conftest.py uses group_by_signature() to reorder the collected tests so
+that every distinct configuration forms one contiguous block, and is
+therefore compiled and loaded only once per run. For sharded runs
+(run_shards.py) partition() splits the suite across devices.
+"""
+
+
+SWITCH_SECONDS = 60.0  # rough cost of one compile plus load_model, for balancing shards
+
+
+def circuit_of(item):
+    """Return the component values declared by an item's circuit marker, or None."""
+    marker = item.get_closest_marker("circuit")
+    if marker is None:
+        return None
+    callspec = getattr(item, "callspec", None)
+    params = callspec.params if callspec is not None else {}
+    return marker.args[0](params)
+
+
+def signature(values):
+    """Hashable form of a set of component values."""
+    if values is None:
+        return None
+    return tuple(sorted((name, float(value)) for name, value in values.items()))
+
+
+def group_by_signature(items):
+    """Return items reordered so that equal circuit signatures are adjacent.
+
+    Groups keep the position of their first member and members keep their
+    collected order, so the run stays as close to the original as possible.
+    Items without a circuit marker stay on their own.
+    """
+    return [items[index] for group in _groups(items) for index in group]
+
+
+def _groups(items):
+    """Indices of items per circuit signature, in order of first appearance."""
+    groups = {}
+    for index, item in enumerate(items):
+        sig = signature(circuit_of(item))
+        key = sig if sig is not None else ("unmarked", index)
+        groups.setdefault(key, []).append(index)
+    return list(groups.values())
+
+
+def partition(items, count, weight):
+    """Split items into count shards of similar estimated run time.
+
+    Items sharing a circuit signature stay on one shard, so each
+    configuration is compiled and loaded on one device only. A group costs
+    SWITCH_SECONDS plus weight(item) for each of its items; groups are dealt
+    largest first to the least loaded shard. The split is deterministic, so
+    every shard process computes the same one. Within a shard items keep
+    their order.
+
+    Returns (shards, loads): the items and estimated seconds of each shard.
+    """
+    costs = [(SWITCH_SECONDS + sum(weight(items[index]) for index in group), group)
+             for group in _groups(items)]
+    loads = [0.0] * count
+    members = [[] for _ in range(count)]
+    for cost, group in sorted(costs, key=lambda c: (-c[0], c[1][0])):
+        shard = min(range(count), key=lambda s: (loads[s], s))
+        loads[shard] += cost
+        members[shard].extend(group)
+    return [[items[index] for index in sorted(group)] for group in members], loads
+
+
+def count_switches(items):
+    """Number of times the circuit configuration changes over a run order.
+
+    Every change costs one model.compile() and one hil.load_model().
+    """
+    switches = 0
+    previous = None
+    for item in items:
+        sig = signature(circuit_of(item))
+        if sig is None:
+            continue
+        if sig != previous:
+            switches += 1
+            previous = sig
+    return switches
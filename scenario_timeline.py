@@ -0,0 +1,114 @@
+"""
+Declarative scenario timelines and a drift-compensated executor.
+
+A scenario is described as data instead of a chain of hil.set_* calls and
+hil.wait_sec() pauses:
+
+    Scenario(prepare=[...], timeline=[...], stop_delay=1, cleanup=[...])
+
+Each list holds (t, action, args) steps; t is seconds from the start of
+that list, action names an entry of the action table passed to
+TimelineRunner and args are its positional arguments. ``prepare`` runs
+before hil.start_simulation(), ``timeline`` between pre_cbk and post_cbk,
+and ``cleanup`` after hil.stop_simulation(). The optional ``sample_rate``
+is the capture rate in Hz the scenario's analysis needs (capture_plan.py),
+and ``limits`` the rules that abort it early once it has failed
+(limit_monitor.py).
+
+TimelineRunner schedules every step against an absolute start time, so API
+call latency does not accumulate the way it does with back-to-back
+wait_sec() calls, and fires each action early by its measured latency. It
+records the declared, intended and actual time of every step.
+
+Settle steps ("settle", (limits, max_wait)) wait at most max_wait seconds;
+when they finish early the rest of the timeline is pulled in by the time
+saved. Durations computed before a run use max_wait, so they are an upper
+bound.
+"""
+
+import collections
+import time
+
+
+Step = collections.namedtuple("Step", ["t", "action", "args"])
+Scenario = collections.namedtuple("Scenario", ["prepare", "timeline", "stop_delay", "cleanup",
+                                               "sample_rate", "limits"], defaults=(None, ()))
+
+# Actions whose last argument is an upper bound on how long they take and
+# whose return value is the number of seconds they finished early
+SHIFTING_ACTIONS = {"settle"}
+
+LATENCY_SMOOTHING = 0.2  # weight of the newest sample in the latency average
+
+
+def scenario_of(item):
+    """Return the Scenario declared by an item's scenario marker, or None."""
+    marker = item.get_closest_marker("scenario")
+    if marker is None:
+        return None
+    callspec = getattr(item, "callspec", None)
+    params = callspec.params if callspec is not None else {}
+    return marker.args[0](params)
+
+
+def timeline_duration(steps):
+    """Scripted length of a list of steps (settle steps count at their upper bound)."""
+    end = 0.0
+    for step in map(Step._make, steps):
+        span = step.args[-1] if step.action in SHIFTING_ACTIONS else 0.0
+        end = max(end, step.t + span)
+    return end
+
+
+def scenario_duration(scenario):
+    """Upper bound of a scenario's hardware time, excluding compile and load."""
+    return (timeline_duration(scenario.prepare)
+            + timeline_duration(scenario.timeline)
+            + scenario.stop_delay
+            + timeline_duration(scenario.cleanup))
+
+
+class TimelineRunner:
+    """Run (t, action, args) steps against an absolute start time."""
+
+    def __init__(self, actions, wait, clock=time.monotonic):
+        self.actions = actions
+        self.wait = wait
+        self.clock = clock
+        self.latency = {}  # action -> smoothed call latency in seconds
+
+    def run(self, steps):
+        """Execute steps in order. Returns one record per step."""
+        records = []
+        start = self.clock()
+        shift = 0.0  # time saved by settle steps so far
+
+        for step in map(Step._make, steps):
+            intended = step.t - shift
+            shifting = step.action in SHIFTING_ACTIONS
+            lead = 0.0 if shifting else self.latency.get(step.action, 0.0)
+            delay = start + intended - lead - self.clock()
+            if delay > 0:
+                self.wait(delay)
+
+            before = self.clock()
+            result = self.actions[step.action](*step.args)
+            after = self.clock()
+
+            if shifting:
+                shift += result or 0.0
+            else:
+                elapsed = after - before
+                previous = self.latency.get(step.action, elapsed)
+                self.latency[step.action] = (
+                    previous + LATENCY_SMOOTHING * (elapsed - previous))
+
+            records.append({
+                "t": step.t,
+                "action": step.action,
+                "args": step.args,
+                "intended": intended,
+                "actual": after - start,
+                "saved": result if shifting else 0.0,
+            })
+        return records
@@ -0,0 +1,83 @@
+"""
+Batched, dirty-tracked updates of schematic component properties.
+
+Setting a component value through the SchematicAPI and saving the model
+after every call rewrites the .tse to disk five or six times per scenario,
+even when nothing changed since the previous one. PropertyBatch keeps the
+value last written for every component, skips writes that would not change
+anything, resolves component handles once and saves the model at most once
+per batch:
+
+    with schematic:
+        schematic.set("R9", "resistance", 20)
+        schematic.set("Lgrid", "inductance", 1e-3)
+
+Outside a with-block every set() is its own batch. apply() saves pending
+changes explicitly.
+"""
+
+
+class PropertyBatch:
+    """Stage component property writes and save the model once per batch."""
+
+    def __init__(self, mdl, model):
+        self.mdl = mdl
+        self.model = model
+        self.values = {}    # component name -> value last written
+        self.handles = {}   # component name -> SchematicAPI item handle
+        self.dirty = False
+        self.depth = 0
+        self.writes = 0
+        self.skipped = 0
+        self.saves = 0
+
+    def clear(self):
+        """Forget cached handles and values, e.g. after the model is reloaded."""
+        self.values.clear()
+        self.handles.clear()
+        self.dirty = False
+
+    def component(self, name):
+        """Return the cached handle of a component, looking it up once."""
+        comp = self.handles.get(name)
+        if comp is None:
+            # Model MUST already be loaded
+            comp = self.mdl.get_item(name, item_type="component")
+            if comp is None:
+                raise RuntimeError(f"Component '{name}' not found in schematic")
+            self.handles[name] = comp
+        return comp
+
+    def set(self, name, prop, value):
+        """Set a component property unless it already holds value."""
+        value = float(value)
+        if self.values.get(name) == value:
+            self.skipped += 1
+            return
+
+        self.mdl.set_property_value(self.model.prop(self.component(name), prop), value)
+        self.values[name] = value
+        self.dirty = True
+        self.writes += 1
+
+        if self.depth == 0:
+            self.apply()
+
+    def apply(self):
+        """Save the model if any property changed since the last save."""
+        if not self.dirty:
+            return
+        self.model.save()
+        self.dirty = False
+        self.saves += 1
+
+    def __enter__(self):
+        self.depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.depth -= 1
+        # On error the staged values stay dirty and go out with the next save
+        if self.depth == 0 and exc_type is None:
+            self.apply()
+        return False
@@ -0,0 +1,202 @@
+"""
+Non-blocking reporting to SMT_Server.py over one keep-alive connection.
+
+report_scenario() and the heartbeat used to open a new connection through
+urllib.request.urlopen() on the calling thread, with 1-2 s timeouts, so a
+slow or hung server stalled the scenario timeline. Every report now goes
+through a background worker instead:
+
+    smt_client.post("/scenario", {"label": ..., "running": True})
+    smt_client.heartbeat({"run_id": ...})
+
+post() queues an event and returns immediately; events are sent strictly
+in order. heartbeat() only keeps the newest heartbeat, sent when no event
+is waiting, so heartbeats never pile up behind a slow server. The worker
+reuses one HTTP/1.1 connection and reconnects when it breaks. An event
+that cannot be sent is dropped, as before; when MAX_PENDING events are
+waiting, new ones are dropped instead of blocking the caller.
+
+stats() returns the sent / failed / dropped / coalesced counters and
+latencies. flush() waits (bounded) for the queue to empty, e.g. before
+the process exits.
+"""
+
+import collections
+import http.client
+import json
+import threading
+import time
+
+
+SERVER_HOST = "localhost"
+SERVER_PORT = 8780
+TIMEOUT = 2          # seconds per request
+MAX_PENDING = 1000   # queued events before new ones are dropped
+
+
+class ReportClient:
+    """Send JSON reports to the SMT server from a background thread."""
+
+    def __init__(self, host=SERVER_HOST, port=SERVER_PORT, timeout=TIMEOUT,
+                 max_pending=MAX_PENDING):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.max_pending = max_pending
+        self.condition = threading.Condition()
+        self.events = collections.deque()  # (path, body, queued at), in order
+        self.pending_heartbeat = None  # (path, body, queued at) of the newest heartbeat
+        self.busy = False
+        self.closed = False
+        self.connection = None
+        self.thread = None
+
+        self.sent = 0
+        self.failed = 0      # send errors (server down or too slow)
+        self.dropped = 0     # not queued: too many events waiting
+        self.coalesced = 0   # heartbeats replaced by a newer one before being sent
+        self.send_seconds = 0.0   # total and worst duration of successful requests
+        self.send_max = 0.0
+        self.delay_seconds = 0.0  # total and worst time from queueing to sent
+        self.delay_max = 0.0
+
+    def _start(self):
+        """Start the worker on first use (call with the condition held)."""
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+
+    def post(self, path, payload):
+        """Queue an event. Never blocks."""
+        body = json.dumps(payload).encode("utf-8")
+        with self.condition:
+            if self.closed or len(self.events) >= self.max_pending:
+                self.dropped += 1
+                return
+            self.events.append((path, body, time.perf_counter()))
+            self._start()
+            self.condition.notify()
+
+    def heartbeat(self, payload, path="/heartbeat"):
+        """Queue a heartbeat, replacing one that has not been sent yet."""
+        body = json.dumps(payload).encode("utf-8")
+        with self.condition:
+            if self.closed:
+                return
+            if self.pending_heartbeat is not None:
+                self.coalesced += 1
+            self.pending_heartbeat = (path, body, time.perf_counter())
+            self._start()
+            self.condition.notify()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.events and self.pending_heartbeat is None and not self.closed:
+                    self.busy = False
+                    self.condition.notify_all()
+                    self.condition.wait()
+                if self.events:
+                    job = self.events.popleft()
+                elif self.pending_heartbeat is not None:
+                    job, self.pending_heartbeat = self.pending_heartbeat, None
+                else:
+                    self.busy = False
+                    self.condition.notify_all()
+                    return  # Closed and nothing left to send
+                self.busy = True
+
+            path, body, queued = job
+            start = time.perf_counter()
+            try:
+                self._send(path, body)
+            except Exception:
+                self.failed += 1
+                continue
+            done = time.perf_counter()
+            self.sent += 1
+            self.send_seconds += done - start
+            self.send_max = max(self.send_max, done - start)
+            self.delay_seconds += done - queued
+            self.delay_max = max(self.delay_max, done - queued)
+
+    def _send(self, path, body):
+        """POST body over the kept-alive connection, reconnecting once if it went stale."""
+        for attempt in range(2):
+            reused = self.connection is not None
+            if not reused:
+                self.connection = http.client.HTTPConnection(self.host, self.port,
+                                                             timeout=self.timeout)
+            try:
+                self.connection.request("POST", path, body, {"Content-Type": "application/json"})
+                response = self.connection.getresponse()
+                response.read()
+                if response.will_close:
+                    self.connection.close()
+                    self.connection = None
+                return
+            except Exception:
+                self.connection.close()
+                self.connection = None
+                if not reused or attempt:
+                    raise
+
+    def flush(self, timeout=TIMEOUT):
+        """Wait until every queued report is sent, at most timeout seconds."""
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            while self.events or self.pending_heartbeat is not None or self.busy:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self.thread is None:
+                    return False
+                self.condition.wait(remaining)
+        return True
+
+    def close(self, timeout=TIMEOUT):
+        """Send what is queued (bounded by timeout) and stop the worker."""
+        self.flush(timeout)
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def stats(self):
+        """Counters, and latencies of sent reports in milliseconds.
+
+        send: duration of the request; delay: from queueing to sent.
+        """
+        sent = max(1, self.sent)
+        return {
+            "sent": self.sent,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "pending": len(self.events),
+            "send_mean_ms": 1000 * self.send_seconds / sent,
+            "send_max_ms": 1000 * self.send_max,
+            "delay_mean_ms": 1000 * self.delay_seconds / sent,
+            "delay_max_ms": 1000 * self.delay_max,
+        }
+
+
+# Shared by the test module and conftest.py
+client = ReportClient()
+
+
+def post(path, payload):
+    client.post(path, payload)
+
+
+def heartbeat(payload):
+    client.heartbeat(payload)
+
+
+def flush(timeout=TIMEOUT):
+    return client.flush(timeout)
+
+
+def close(timeout=TIMEOUT):
+    client.close(timeout)
+
+
+def stats():
+    return client.stats()
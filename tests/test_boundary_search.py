@@ -0,0 +1,51 @@
+"""Tests of boundary_search.py."""
+
+import pytest
+
+from boundary_search import BoundarySearch
+
+
+def run(search, boundary):
+    """Probe until finished; limiting engages below boundary."""
+    while True:
+        value = search.next_value()
+        if value is None:
+            return
+        search.record(value, value < boundary)
+
+
+def test_bisection_brackets_the_boundary():
+    search = BoundarySearch(0.2, 10, 0.25)
+    run(search, 3.3)
+    estimate, half_width = search.boundary()
+    assert search.engaged < 3.3 < search.clear
+    assert search.clear - search.engaged <= 0.25
+    assert abs(estimate - 3.3) <= half_width
+    # Bisection plus checks of both range ends
+    assert len(search.probed) <= 8
+
+
+def test_checks_the_assumed_range_ends():
+    search = BoundarySearch(0.2, 10, 0.25)
+    run(search, 0.3)
+    assert 0.2 in search.probed
+    assert search.boundary()[0] == pytest.approx(0.3, abs=0.25)
+
+
+def test_not_engaged_anywhere():
+    search = BoundarySearch(0.2, 10, 0.25)
+    run(search, 0.1)
+    assert search.boundary() is None
+    assert search.describe(" ohm").startswith("not engaged anywhere")
+
+
+def test_engaged_everywhere():
+    search = BoundarySearch(0.2, 10, 0.25)
+    run(search, 20)
+    assert search.boundary() is None
+    assert search.describe(" ohm").startswith("engaged over the whole range")
+
+
+def test_rejects_a_resolution_wider_than_the_range():
+    with pytest.raises(ValueError):
+        BoundarySearch(0, 1, 2)
@@ -0,0 +1,29 @@
+"""Tests of capture_plan.py."""
+
+import capture_plan
+
+SIM_STEP = 1e-6
+
+
+def test_coarsest_decimation_meeting_the_rate():
+    plan = capture_plan.plan(10, SIM_STEP, 20e3)
+    assert plan.decimation == 50
+    assert plan.sample_rate == 20e3
+    # Window plus the minimum margin of 2 s (rounded up)
+    assert 12 * 20_000 <= plan.samples <= 12 * 20_000 + 1
+
+
+def test_long_windows_are_captured_coarser_not_shorter():
+    plan = capture_plan.plan(1000, SIM_STEP, 20e3)
+    assert plan.samples <= capture_plan.MAX_SAMPLES
+    assert plan.samples * plan.decimation * SIM_STEP >= 1100  # 10 % margin
+    assert plan.sample_rate < 20e3
+
+
+def test_default_decimation_without_a_rate():
+    assert capture_plan.plan(10, SIM_STEP).decimation == capture_plan.DEFAULT_DECIMATION
+
+
+def test_fixed_settings_without_the_sim_step():
+    assert capture_plan.plan(10, None, 20e3) == capture_plan.CapturePlan(
+        capture_plan.DEFAULT_DECIMATION, capture_plan.MAX_SAMPLES, None)
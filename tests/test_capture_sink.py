@@ -0,0 +1,66 @@
+"""Tests of capture_sink.py."""
+
+import os
+
+import numpy as np
+import pytest
+
+import capture_sink
+
+CHANNELS = ["Ia3", "Cdc"]
+
+
+def chunk(start, count, sample_time=1e-4):
+    t = np.arange(start, start + count) * sample_time
+    return CHANNELS, np.vstack([t, -t]), t
+
+
+def test_chunks_are_stored_in_order(tmp_path):
+    sink = capture_sink.CaptureSink(str(tmp_path / "a.mat"), CHANNELS, 100)
+    sink.queue.put(chunk(0, 30))
+    sink.queue.put(chunk(30, 30))
+    sink.stop()
+    assert sink.samples == 60
+    assert np.allclose(sink.time[:60], np.arange(60) * 1e-4)
+    assert np.allclose(sink.data[:60, 1], -sink.time[:60])
+    sink.discard()
+
+
+def test_samples_beyond_the_buffer_are_dropped(tmp_path):
+    sink = capture_sink.CaptureSink(str(tmp_path / "a.mat"), CHANNELS, 50)
+    sink.queue.put(chunk(0, 40))
+    sink.queue.put(chunk(40, 40))
+    sink.stop()
+    assert (sink.samples, sink.dropped) == (50, 30)
+    sink.discard()
+
+
+def test_bare_arrays_use_the_sample_time(tmp_path):
+    sink = capture_sink.CaptureSink(str(tmp_path / "a.mat"), CHANNELS, 10, sample_time=0.5)
+    sink.queue.put(np.ones((2, 4)))
+    sink.stop()
+    assert list(sink.time[:4]) == [0.0, 0.5, 1.0, 1.5]
+    sink.discard()
+
+
+def test_close_exports_and_removes_the_memmaps(tmp_path):
+    path = str(tmp_path / "a.mat")
+    sink = capture_sink.CaptureSink(path, CHANNELS, 100)
+    sink.queue.put(chunk(0, 10))
+    sink.close()
+    assert os.listdir(tmp_path) == ["a.mat"]
+
+
+def test_close_raises_after_a_failed_chunk(tmp_path):
+    sink = capture_sink.CaptureSink(str(tmp_path / "a.mat"), CHANNELS, 100)
+    sink.queue.put(np.ones((3, 5)))  # Not two channels
+    with pytest.raises(RuntimeError):
+        sink.close()
+    assert os.listdir(tmp_path) == []
+
+
+def test_remove_leftovers(tmp_path):
+    for name in ("a.mat", "b.mat.samples", "b.mat.time", "notes.time"):
+        (tmp_path / name).write_bytes(b"")
+    assert capture_sink.remove_leftovers(tmp_path) == 2
+    assert sorted(os.listdir(tmp_path)) == ["a.mat", "notes.time"]
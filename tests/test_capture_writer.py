@@ -0,0 +1,50 @@
+"""Tests of capture_writer.py."""
+
+import pytest
+
+import capture_writer
+
+
+class Sink:
+    def __init__(self, name, fail=False):
+        self.mat_path = f"{name}.mat"
+        self.fail = fail
+
+    def close(self, compress=False):
+        if self.fail:
+            raise OSError("disk full")
+
+
+def test_written_captures_are_passed_to_on_written():
+    written = []
+    writer = capture_writer.CaptureWriter(on_written=lambda label, path: written.append(label))
+    for label in "abc":
+        writer.submit(label, Sink(label))
+    writer.drain()
+    writer.close()
+    assert written == ["a", "b", "c"]
+    assert writer.written == 3
+
+
+def test_failed_writes_are_raised_once():
+    writer = capture_writer.CaptureWriter()
+    writer.submit("a", Sink("a", fail=True))
+    writer.drain()
+    with pytest.raises(RuntimeError, match="a: disk full"):
+        writer.raise_failures()
+    writer.raise_failures()
+    writer.close()
+
+
+def test_a_failing_callback_does_not_stop_the_writer():
+    def on_written(label, path):
+        raise ValueError("summary not writable")
+
+    writer = capture_writer.CaptureWriter(max_pending=1, on_written=on_written)
+    for label in "abcd":  # More than the queue holds: blocks forever if the thread died
+        writer.submit(label, Sink(label))
+    writer.drain()
+    with pytest.raises(RuntimeError, match="summary not writable"):
+        writer.raise_failures()
+    assert writer.written == 4
+    writer.close()
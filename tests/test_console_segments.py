@@ -0,0 +1,97 @@
+"""Tests of console_segments.py."""
+
+import os
+
+import console_segments
+
+
+def write_lines(log, lines):
+    for line in lines:
+        log.write(line + "\n")
+        log.flush()
+
+
+def test_rotation_keeps_line_numbers(tmp_path):
+    path = str(tmp_path / "pytest_console.log")
+    log = console_segments.SegmentedLog(path, segment_bytes=100)
+    lines = [f"line {i}" for i in range(100)]
+    write_lines(log, lines)
+
+    index = console_segments.read_index(path)
+    assert len(index["segments"]) > 3
+    assert console_segments.lines_from(path, 0) == list(enumerate(lines))
+    assert console_segments.lines_from(path, 57) == list(enumerate(lines))[57:]
+    assert console_segments.recent_lines(path, 5) == list(enumerate(lines))[95:]
+    log.close()
+
+
+def test_a_new_log_removes_the_old_segments(tmp_path):
+    path = str(tmp_path / "pytest_console.log")
+    write_lines(console_segments.SegmentedLog(path, segment_bytes=50), ["x" * 30] * 10)
+    console_segments.SegmentedLog(path).close()
+    assert sorted(os.listdir(tmp_path)) == ["pytest_console.index.json", "pytest_console.log"]
+
+
+def test_other_line_breaks_stay_inside_their_line(tmp_path):
+    path = str(tmp_path / "pytest_console.log")
+    log = console_segments.SegmentedLog(path, segment_bytes=200)
+    follower = console_segments.LogFollower(path)
+    lines = [f"line {i}" + ("\rprogress" if i % 10 == 3 else "") + (" " if i % 7 == 0 else "")
+             for i in range(60)]
+    followed = []
+    for line in lines:
+        write_lines(log, [line])
+        followed += follower.poll()
+
+    assert followed == list(enumerate(lines))
+    assert console_segments.lines_from(path, 40) == list(enumerate(lines))[40:]
+    assert console_segments.recent_lines(path, 3) == list(enumerate(lines))[57:]
+    log.close()
+
+
+def test_follower_starts_at_the_active_segment(tmp_path):
+    path = str(tmp_path / "pytest_console.log")
+    log = console_segments.SegmentedLog(path, segment_bytes=100)
+    write_lines(log, [f"line {i}" for i in range(50)])
+    first = console_segments.read_index(path)["active"]["first_line"]
+
+    follower = console_segments.LogFollower(path)
+    assert [number for number, _ in follower.poll()] == list(range(first, 50))
+    write_lines(log, ["more"])
+    assert follower.poll() == [(50, "more")]
+    log.close()
+
+
+def test_follower_only_returns_complete_lines(tmp_path):
+    path = str(tmp_path / "pytest_console.log")
+    log = console_segments.SegmentedLog(path)
+    follower = console_segments.LogFollower(path)
+    log.write("partial")
+    log.flush()
+    assert follower.poll() == []
+    log.write(" line\n")
+    log.flush()
+    assert follower.poll() == [(0, "partial line")]
+    log.close()
+
+
+def test_follower_notices_a_new_run(tmp_path):
+    path = str(tmp_path / "pytest_console.log")
+    log = console_segments.SegmentedLog(path)
+    follower = console_segments.LogFollower(path)
+    write_lines(log, ["old 0", "old 1"])
+    assert len(follower.poll()) == 2
+    log.close()
+
+    log = console_segments.SegmentedLog(path)
+    write_lines(log, ["new 0"])
+    assert follower.poll() == [(0, "new 0")]
+    assert follower.restarted
+    follower.close()
+    log.close()
+
+
+def test_a_log_without_an_index_is_one_segment(tmp_path):
+    path = tmp_path / "pytest_console.log"
+    path.write_bytes(b"a\nb\nc")
+    assert console_segments.lines_from(str(path), 1) == [(1, "b")]
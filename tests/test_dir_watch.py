@@ -0,0 +1,29 @@
+"""Tests of dir_watch.py."""
+
+import sys
+
+import pytest
+
+import dir_watch
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is Linux only")
+def test_changes_are_reported_by_prefix(tmp_path):
+    watch = dir_watch.DirectoryWatch(str(tmp_path))
+    if watch.fd is None:
+        pytest.skip("inotify not available")
+    try:
+        assert not watch.changed("pytest_console")
+        (tmp_path / "other.txt").write_text("x")
+        assert not watch.changed("pytest_console")
+        (tmp_path / "pytest_console.log").write_text("line\n")
+        assert watch.changed("pytest_console")
+        assert not watch.changed("pytest_console")  # Notifications were read
+    finally:
+        watch.close()
+    assert watch.fd is None
+
+
+def test_unavailable_watch_has_no_fd(tmp_path, monkeypatch):
+    monkeypatch.setattr(dir_watch, "load_libc", lambda: None)
+    assert dir_watch.DirectoryWatch(str(tmp_path)).fd is None
@@ -0,0 +1,49 @@
+"""Tests of event_journal.py."""
+
+import csv
+
+import event_journal
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class Hil:
+    def set_scada_input_value(self, name, value):
+        return "ok"
+
+    def read_analog_signal(self, name):
+        return 1.0
+
+
+def test_sample_index_counts_from_before_start_capture(tmp_path):
+    clock = Clock()
+    journal = event_journal.EventJournal(clock=clock, wall=lambda: 0.0)
+    hil = event_journal.JournaledHil(Hil(), journal)
+
+    hil.set_scada_input_value("Grid_avai", 0)  # Before the capture: no sample
+    start = clock()
+    clock.now += 0.5  # start_capture latency
+    journal.begin("scenario", sample_time=1e-3, start=start)
+    clock.now += 2.0
+    assert hil.set_scada_input_value("Grid_avai", 1) == "ok"
+    hil.read_analog_signal("Cdc")  # Not journaled
+    events = journal.end("scenario")
+
+    assert [(e["event"], e["name"], e["sample"]) for e in events] == [
+        ("set_scada_input_value", "Grid_avai", ""),
+        ("pre_cbk", "scenario", 500),
+        ("set_scada_input_value", "Grid_avai", 2500),
+        ("post_cbk", "scenario", 2500),
+    ]
+    assert journal.end("next") == [{"event": "post_cbk", "name": "next", "value": "",
+                                    "wall": 0.0, "monotonic": 102.5, "sample": ""}]
+
+    path = event_journal.write_journal(str(tmp_path / "scenario.mat"), events)
+    with open(path, newline="") as f:
+        assert [row["sample"] for row in csv.DictReader(f)] == ["", "500", "2500", "2500"]
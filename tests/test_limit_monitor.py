@@ -0,0 +1,47 @@
+"""Tests of limit_monitor.py."""
+
+import pytest
+
+import limit_monitor
+from test_readiness import Hil
+
+
+def test_violation_after_the_hold_time():
+    hil = Hil({"Cdc": lambda t: 400.0 if t < 12 else 100.0})
+    monitor = limit_monitor.LimitMonitor(hil, clock=hil.clock)
+    monitor.arm([limit_monitor.Rule("Cdc", low=0.5, relative=True, arm=10, hold=0.5,
+                                    reason="DC link collapsed")])
+    with pytest.raises(limit_monitor.LimitViolation, match="DC link collapsed") as error:
+        monitor.wait(30)
+    assert 12.5 <= error.value.elapsed < 12.5 + 2 * limit_monitor.POLL_INTERVAL
+
+
+def test_short_excursions_are_tolerated():
+    hil = Hil({"Ia3": lambda t: 50.0 if 5 < t < 5.3 else 1.0})
+    monitor = limit_monitor.LimitMonitor(hil, clock=hil.clock)
+    monitor.arm([limit_monitor.Rule("Ia3", high=10, hold=0.5)])
+    monitor.wait(10)
+    assert hil.now == pytest.approx(10)
+
+
+def test_rules_are_checked_only_once_armed():
+    hil = Hil({"Ia3": 50.0})
+    monitor = limit_monitor.LimitMonitor(hil, clock=hil.clock)
+    monitor.arm([limit_monitor.Rule("Ia3", high=10, arm=5)])
+    monitor.wait(4.5)
+    with pytest.raises(limit_monitor.LimitViolation):
+        monitor.wait(1)
+
+
+def test_disarmed_monitor_only_waits():
+    hil = Hil({})
+    monitor = limit_monitor.LimitMonitor(hil, clock=hil.clock)
+    monitor.wait(3)
+    assert hil.now == 3
+
+
+def test_verify_rejects_unreadable_signals():
+    monitor = limit_monitor.LimitMonitor(Hil({"Cdc": 1.0}))
+    monitor.verify([limit_monitor.Rule("Cdc", low=0)])
+    with pytest.raises(RuntimeError, match="FCODE"):
+        monitor.verify([limit_monitor.Rule("Cdc", low=0), limit_monitor.Rule("FCODE", high=0.5)])
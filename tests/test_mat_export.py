@@ -0,0 +1,72 @@
+"""Tests of mat_export.py."""
+
+import struct
+import zlib
+
+import numpy as np
+import pytest
+
+import mat_export
+
+
+def elements(path):
+    """(data type, payload) of the top-level elements of a .mat file."""
+    with open(path, "rb") as f:
+        data = f.read()
+    assert data[124:128] == struct.pack("<H", 0x0100) + b"IM"
+    offset = 128
+    result = []
+    while offset < len(data):
+        data_type, size = struct.unpack_from("<II", data, offset)
+        result.append((data_type, data[offset + 8:offset + 8 + size]))
+        offset += 8 + size
+        if data_type != mat_export.MI_COMPRESSED:
+            offset = (offset + 7) // 8 * 8
+    return result
+
+
+def capture(n=1000):
+    time_line = np.arange(n) * 1e-4
+    return time_line, {"Ia3": np.sin(time_line), "Cdc": np.full(n, 400.0)}
+
+
+def test_compressed_elements_hold_the_uncompressed_ones(tmp_path):
+    time_line, channels = capture()
+    mat_export.write_capture(tmp_path / "plain.mat", time_line, channels, 1000)
+    mat_export.write_capture(tmp_path / "packed.mat", time_line, channels, 1000, compress=True)
+
+    plain = elements(tmp_path / "plain.mat")
+    packed = elements(tmp_path / "packed.mat")
+    assert [t for t, _ in plain] == [mat_export.MI_MATRIX] * 2
+    assert [t for t, _ in packed] == [mat_export.MI_COMPRESSED] * 2
+    for (_, payload), (_, compressed) in zip(plain, packed):
+        inner = zlib.decompress(compressed)
+        assert inner[8:] == payload
+
+
+def test_only_the_first_n_samples_are_written(tmp_path, monkeypatch):
+    monkeypatch.setattr(mat_export, "CHUNK_SAMPLES", 64)  # Several slices
+    time_line, channels = capture()
+    mat_export.write_capture(tmp_path / "a.mat", time_line, channels, 300)
+    _, payload = elements(tmp_path / "a.mat")[0]
+    samples = np.frombuffer(payload[-8 * 300:], dtype="<f8")
+    assert np.array_equal(samples, time_line[:300])
+
+
+def test_rejects_long_channel_names(tmp_path):
+    with pytest.raises(ValueError):
+        mat_export.write_capture(tmp_path / "a.mat", np.zeros(1), {"x" * 40: np.zeros(1)}, 1)
+    assert list(tmp_path.iterdir()) == []  # No temporary file left
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_scipy_reads_the_file(tmp_path, compress):
+    loadmat = pytest.importorskip("scipy.io").loadmat
+    time_line, channels = capture()
+    mat_export.write_capture(tmp_path / "a.mat", time_line, channels, 1000, compress=compress)
+    mat = loadmat(tmp_path / "a.mat")
+    assert mat["time_line"].shape == (1000, 1)
+    assert np.allclose(mat["time_line"].ravel(), time_line)
+    data = mat["channels_data"][0, 0]
+    assert data.dtype.names == ("Ia3", "Cdc")
+    assert np.allclose(data["Ia3"].ravel(), channels["Ia3"])
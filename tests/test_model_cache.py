@@ -0,0 +1,36 @@
+"""Tests of model_cache.py."""
+
+import os
+
+import model_cache
+
+
+def test_key_depends_on_values_not_their_type_or_order():
+    key = model_cache.cache_key("hash", {"R9": 1, "Lgrid": 0.001})
+    assert key == model_cache.cache_key("hash", {"Lgrid": 1e-3, "R9": 1.0})
+    assert key != model_cache.cache_key("hash", {"R9": 2, "Lgrid": 0.001})
+    assert key != model_cache.cache_key("other", {"R9": 1, "Lgrid": 0.001})
+
+
+def test_store_and_fetch(tmp_path):
+    cache = model_cache.ModelCache(str(tmp_path / "cache"))
+    build = tmp_path / "model.cpd"
+    build.write_bytes(b"compiled")
+    cache.store("k", str(build))
+
+    assert cache.fetch("k", str(tmp_path / "copy.cpd"))
+    assert (tmp_path / "copy.cpd").read_bytes() == b"compiled"
+    assert not cache.fetch("missing", str(tmp_path / "other.cpd"))
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_least_recently_used_builds_are_evicted(tmp_path):
+    cache = model_cache.ModelCache(str(tmp_path / "cache"), max_bytes=25)
+    build = tmp_path / "model.cpd"
+    build.write_bytes(b"x" * 10)
+    for age, key in enumerate(["a", "b"]):
+        cache.store(key, str(build))
+        os.utime(cache.path(key), (age, age))
+    cache.fetch("a", str(tmp_path / "copy.cpd"))  # a is now the most recently used
+    cache.store("c", str(build))
+    assert [cache.contains(key) for key in "abc"] == [True, False, True]
@@ -0,0 +1,29 @@
+"""Tests of model_residency.py."""
+
+import model_residency
+
+
+class Hil:
+    def __init__(self):
+        self.loaded = []
+
+    def load_model(self, path, vhil_device=False):
+        self.loaded.append(path)
+
+
+def test_an_identical_model_is_reset_instead_of_loaded(tmp_path):
+    first, same, other = tmp_path / "a.cpd", tmp_path / "b.cpd", tmp_path / "c.cpd"
+    first.write_bytes(b"model 1")
+    same.write_bytes(b"model 1")
+    other.write_bytes(b"model 2")
+    hil = Hil()
+    resets = []
+    residency = model_residency.ModelResidency(hil, lambda: resets.append(True))
+
+    assert residency.load(str(first))
+    assert not residency.load(str(same))
+    assert residency.load(str(other))
+    residency.invalidate()
+    assert residency.load(str(other))
+    assert hil.loaded == [str(first), str(other), str(other)]
+    assert (len(resets), residency.skipped, residency.loads) == (1, 1, 3)
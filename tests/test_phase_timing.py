@@ -0,0 +1,76 @@
+"""Tests of phase_timing.py."""
+
+import threading
+import types
+
+import capture_writer
+import phase_timing
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_calls_are_timed_per_phase_on_the_test_thread():
+    clock = Clock()
+    timer = phase_timing.PhaseTimer(clock=clock)
+
+    def wait_sec(seconds):
+        clock.now += seconds
+
+    hil = types.SimpleNamespace(wait_sec=wait_sec, set_scada_input_value=lambda *args: None)
+    timer.instrument(hil, [])
+    try:
+        timer.begin("test_a")
+        hil.wait_sec(2)
+        hil.set_scada_input_value("Grid_avai", 1)
+        thread = threading.Thread(target=hil.wait_sec, args=(5,))  # Background: not counted
+        thread.start()
+        thread.join()
+        clock.now += 1
+        row = timer.end()
+    finally:
+        timer.restore()
+
+    assert row["wall_s"] == 8
+    assert row["phases"]["scripted_wait"] == {"seconds": 2, "calls": 1}
+    assert row["phases"]["signal_write"]["calls"] == 1
+    assert row["other_s"] == 6
+
+
+def test_background_waits_are_attributed_and_restored():
+    timer = phase_timing.PhaseTimer()
+    original = capture_writer.CaptureWriter.drain
+    timer.instrument(types.SimpleNamespace(), [])
+    assert capture_writer.CaptureWriter.drain is not original
+    writer = capture_writer.CaptureWriter()
+    timer.begin("test_b")
+    writer.drain()
+    row = timer.end()
+    writer.close()
+    timer.restore()
+
+    assert row["phases"]["capture_finalize"]["calls"] == 1
+    assert capture_writer.CaptureWriter.drain is original
+
+
+def test_write_csv_and_totals(tmp_path):
+    clock = Clock()
+    timer = phase_timing.PhaseTimer(clock=clock)
+    for test, seconds in (("a", 1.0), ("b", 3.0)):
+        timer.begin(test)
+        timer.phases["compile"] = [seconds, 1]
+        clock.now += seconds + 0.5
+        timer.end()
+
+    totals = timer.totals()
+    assert totals["compile"]["seconds"] == 4.0
+    assert totals["compile"]["max_test"] == "b"
+    assert totals[phase_timing.OTHER]["seconds"] == 1.0
+    path = timer.write(tmp_path, "run")
+    assert path.read_text().splitlines()[0] == "test,wall_s,compile,other"
+    assert (tmp_path / "phase_timing.json").exists()
@@ -0,0 +1,60 @@
+"""Tests of readiness.py."""
+
+import pytest
+
+import readiness
+
+
+class Hil:
+    """hil with a virtual clock; signals: name -> value or function of the time."""
+
+    def __init__(self, signals):
+        self.now = 0.0
+        self.signals = signals
+
+    def clock(self):
+        return self.now
+
+    def wait_sec(self, seconds):
+        self.now += seconds
+
+    def read_analog_signal(self, name):
+        value = self.signals[name]  # KeyError: not readable
+        return value(self.now) if callable(value) else value
+
+
+@pytest.fixture(autouse=True)
+def fresh_warnings(monkeypatch):
+    monkeypatch.setattr(readiness, "warned", set())
+
+
+def test_returns_once_the_limits_hold():
+    hil = Hil({"Cdc": lambda t: min(t, 3.0) * 100, "Ia3": 0.0})
+    limits = [readiness.Limit("Cdc", None, 2.0), readiness.Limit("Ia3", 0, 0.5)]
+    saved = readiness.wait_until_settled(hil, limits, 10, clock=hil.clock)
+    assert 3.0 + readiness.HOLD_TIME <= hil.now < 3.0 + readiness.HOLD_TIME + 2 * readiness.POLL_INTERVAL
+    assert saved == pytest.approx(10 - hil.now)
+
+
+def test_never_waits_longer_than_max_wait():
+    hil = Hil({"Cdc": lambda t: t * 100})
+    saved = readiness.wait_until_settled(hil, [readiness.Limit("Cdc", None, 2.0)], 5, clock=hil.clock)
+    assert saved == 0.0
+    assert hil.now == pytest.approx(5, abs=readiness.POLL_INTERVAL)
+
+
+def test_unreadable_signals_are_left_out(capsys):
+    hil = Hil({"Cdc": 400.0})
+    limits = [readiness.Limit("Cdc", None, 2.0), readiness.Limit("STATE", None, 0.5)]
+    assert readiness.wait_until_settled(hil, limits, 10, clock=hil.clock) > 8
+    readiness.wait_until_settled(hil, limits, 10, clock=hil.clock)
+    assert capsys.readouterr().out.count("cannot read STATE") == 1
+
+
+def test_falls_back_to_the_fixed_wait_without_readable_signals(capsys):
+    hil = Hil({})
+    saved = readiness.wait_until_settled(hil, [readiness.Limit("STATE", None, 0.5)], 10,
+                                         clock=hil.clock)
+    assert saved == 0.0
+    assert hil.now == 10
+    assert "waiting the full fixed time" in capsys.readouterr().out
@@ -0,0 +1,28 @@
+"""Tests of run_manifest.py."""
+
+import os
+
+import run_manifest
+
+
+def test_completed_needs_the_mat_file(tmp_path):
+    folder = tmp_path / "Test_Results_run1"
+    manifest = run_manifest.RunManifest(folder)
+    manifest.record("test_a", "A", "A.mat", {"R9": 1})
+    manifest.record("test_b", "B", "B.mat", {"R9": 2})
+    (folder / "A.mat").write_bytes(b"")
+
+    reloaded = run_manifest.RunManifest(folder)
+    assert reloaded.data["run_id"] == "run1"
+    assert reloaded.completed() == {"test_a"}
+    assert sorted(p.name for p in folder.iterdir()) == ["A.mat", run_manifest.MANIFEST_NAME]
+
+
+def test_latest_run_id(tmp_path, monkeypatch):
+    monkeypatch.setattr(run_manifest, "RESULTS_DIR", tmp_path)
+    assert run_manifest.latest_run_id() is None
+    run_manifest.RunManifest(tmp_path / "Test_Results_old").save()
+    run_manifest.RunManifest(tmp_path / "Test_Results_new").save()
+    old = tmp_path / "Test_Results_old" / run_manifest.MANIFEST_NAME
+    os.utime(old, (0, 0))
+    assert run_manifest.latest_run_id() == "new"
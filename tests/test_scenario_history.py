@@ -0,0 +1,65 @@
+"""Tests of scenario_history.py."""
+
+import json
+import multiprocessing
+
+import pytest
+
+import scenario_history
+
+
+def test_update_keeps_a_moving_average(tmp_path):
+    path = tmp_path / "durations.json"
+    scenario_history.update({"a": 10.0}, path)
+    scenario_history.update({"a": 20.0, "b": 5.0}, path)
+    history = scenario_history.load(path)
+    assert history["a"] == pytest.approx(10 + scenario_history.SMOOTHING * 10)
+    assert history["b"] == 5.0
+    assert [p.name for p in tmp_path.iterdir()] == ["durations.json"]
+
+
+def update_many(path, worker):
+    for test in range(20):
+        scenario_history.update({f"{worker}-{test}": 1.0}, path)
+
+
+def test_concurrent_updates_are_not_lost(tmp_path):
+    path = tmp_path / "durations.json"
+    workers = [multiprocessing.Process(target=update_many, args=(path, worker)) for worker in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert len(json.loads(path.read_text())) == 80
+
+
+def test_a_stale_lock_is_broken(tmp_path, monkeypatch):
+    path = tmp_path / "durations.json"
+    (tmp_path / "durations.json.lock").write_text("")
+    monkeypatch.setattr(scenario_history, "LOCK_STALE", -1)
+    scenario_history.update({"a": 1.0}, path)
+    assert scenario_history.load(path) == {"a": 1.0}
+
+
+def test_eta_scales_unknown_tests_by_the_known_ones():
+    now = [0.0]
+    progress = scenario_history.RunProgress(
+        ["a", "b", "c"], {"a": 10, "b": 10, "c": 20}, history={"a": 15, "b": 15},
+        clock=lambda: now[0], wall=lambda: 1000.0)
+    assert progress.known == 2
+    assert progress.snapshot()["eta_s"] == 15 + 15 + 30
+
+    progress.begin("a")
+    now[0] = 5.0
+    snapshot = progress.snapshot()
+    assert (snapshot["index"], snapshot["finished"], snapshot["eta_s"]) == (1, 0, 55)
+    progress.end("a")
+    assert progress.durations == {"a": 5.0}
+    assert progress.snapshot()["finished"] == 1
+
+
+def test_a_resumed_run_counts_on():
+    progress = scenario_history.RunProgress(["c"], {"c": 1}, history={}, done=2)
+    progress.begin("c")
+    snapshot = progress.snapshot()
+    assert (snapshot["total"], snapshot["index"], snapshot["finished"]) == (3, 3, 2)
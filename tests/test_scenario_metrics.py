@@ -0,0 +1,57 @@
+"""Tests of scenario_metrics.py."""
+
+import numpy as np
+import pytest
+
+import mat_export
+import scenario_metrics
+
+pytest.importorskip("scipy.io")  # load_capture() reads the .mat with scipy
+
+FS = 10e3
+
+
+def write(tmp_path, channels, seconds=1.0):
+    t = np.arange(int(seconds * FS)) / FS
+    path = str(tmp_path / "scenario.mat")
+    mat_export.write_capture(path, t, {name: f(t) for name, f in channels.items()}, len(t))
+    return path
+
+
+def test_rms_and_harmonics(tmp_path):
+    path = write(tmp_path, {
+        "Ia3": lambda t: 10 * np.sqrt(2) * np.sin(2 * np.pi * 60 * t),
+        "Vg": lambda t: np.sin(2 * np.pi * 60 * t) + 0.05 * np.sin(2 * np.pi * 180 * t),
+    })
+    rows = {row["channel"]: row for row in scenario_metrics.analyze("s", path, [], {3: 0.04})}
+    assert rows["Ia3"]["rms_mean"] == pytest.approx(10, rel=1e-2)
+    assert rows["Ia3"]["thd_pct"] < 1
+    assert rows["Vg"]["h3_pu"] == pytest.approx(0.05, abs=1e-3)
+    assert rows["Vg"]["harmonic_error_pu"] == pytest.approx(0.01, abs=1e-3)
+
+
+def test_step_response_after_a_transition(tmp_path):
+    def envelope(t):
+        level = np.where(t < 0.5, 1.0, 2.0 + np.exp(-(t - 0.5) / 0.02))
+        return level * np.sqrt(2) * np.sin(2 * np.pi * 60 * t)
+
+    path = write(tmp_path, {"Ia3": envelope})
+    row = scenario_metrics.analyze("s", path, [0.5], None)[0]
+    assert row["transitions"] == 1
+    assert row["overshoot_pct"] > 10
+    assert 0 < row["settling_s"] < 0.2
+
+
+def test_empty_capture(tmp_path):
+    path = str(tmp_path / "scenario.mat")
+    mat_export.write_capture(path, np.zeros(0), {"Ia3": np.zeros(0)}, 0)
+    assert scenario_metrics.analyze("s", path, [], None)[0]["error"] == "empty capture"
+
+
+def test_transitions_and_configured_harmonics():
+    records = [{"action": "scada", "args": ("Load_Dist", 1), "actual": 1.5},
+               {"action": "scada", "args": ("ChrgMos", 0), "actual": 2.0},
+               {"action": "constant", "args": ("V_bat", 50), "actual": 2.5}]
+    assert scenario_metrics.transitions(records) == [1.5]
+    steps = [(0, "sine", ("Vg_src", {"rms": 230, "harmonics_pu": [(3, 0.2, 126), (5, 0.01, 0)]}))]
+    assert scenario_metrics.configured_harmonics(steps) == {3: 0.2, 5: 0.01}
@@ -0,0 +1,68 @@
+"""Tests of scenario_scheduler.py."""
+
+import collections
+
+import scenario_scheduler
+
+Marker = collections.namedtuple("Marker", "args")
+
+
+class Item:
+    """Collected test with a circuit marker of fixed values (None: unmarked)."""
+
+    def __init__(self, name, values):
+        self.name = name
+        self.values = values
+
+    def get_closest_marker(self, name):
+        if name != "circuit" or self.values is None:
+            return None
+        return Marker((lambda params: self.values,))
+
+    def __repr__(self):
+        return self.name
+
+
+def items(*circuits):
+    return [Item(f"t{i}", None if r is None else {"R9": r}) for i, r in enumerate(circuits)]
+
+
+def names(order):
+    return [item.name for item in order]
+
+
+def test_groups_keep_first_position_and_collected_order():
+    order = scenario_scheduler.group_by_signature(items(1, 2, 1, None, 2, 3))
+    assert names(order) == ["t0", "t2", "t1", "t4", "t3", "t5"]
+
+
+def test_count_switches_ignores_unmarked_tests():
+    tests = items(1, 2, 1, None, 2, 3)
+    assert scenario_scheduler.count_switches(tests) == 5
+    assert scenario_scheduler.count_switches(scenario_scheduler.group_by_signature(tests)) == 3
+
+
+def test_signature_does_not_depend_on_number_type():
+    assert scenario_scheduler.signature({"R9": 1}) == scenario_scheduler.signature({"R9": 1.0})
+
+
+def test_partition_keeps_groups_together_and_balances_load():
+    tests = items(1, 1, 1, 2, 3, 4, 4)
+    weights = {"t0": 100, "t1": 100, "t2": 100, "t3": 50, "t4": 50, "t5": 80, "t6": 80}
+    shards, loads = scenario_scheduler.partition(tests, 2, lambda item: weights[item.name])
+
+    assert sorted(names(shards[0] + shards[1])) == names(tests)
+    for shard in shards:
+        for other in shards:
+            if shard is not other:
+                assert not {item.values["R9"] for item in shard} & {item.values["R9"] for item in other}
+    # Largest group first (R1), then each group to the least loaded shard (R4, R2, R3)
+    switch = scenario_scheduler.SWITCH_SECONDS
+    assert loads == [300 + switch, 160 + switch + 50 + switch + 50 + switch]
+    assert names(shards[1]) == ["t3", "t4", "t5", "t6"]  # collected order within a shard
+
+
+def test_partition_is_deterministic():
+    tests = items(*range(10))
+    first = scenario_scheduler.partition(tests, 3, lambda item: 1.0)
+    assert first == scenario_scheduler.partition(tests, 3, lambda item: 1.0)
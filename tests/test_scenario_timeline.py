@@ -0,0 +1,57 @@
+"""Tests of scenario_timeline.py."""
+
+import pytest
+
+import scenario_timeline
+from scenario_timeline import Scenario
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def wait(self, seconds):
+        self.now += seconds
+
+
+def runner(clock, latency=0.0, settle_saves=0.0):
+    def call(*args):
+        clock.now += latency
+
+    def settle(limits, max_wait):
+        clock.now += max_wait - settle_saves
+        return settle_saves
+
+    return scenario_timeline.TimelineRunner({"scada": call, "settle": settle}, clock.wait, clock)
+
+
+def test_latency_does_not_accumulate():
+    clock = Clock()
+    run = runner(clock, latency=0.05)
+    steps = [(t, "scada", ("Load_Dist", t % 2)) for t in range(10)]
+    records = run.run(steps)
+    # Fired early by the measured latency: every step ends on time after the first
+    assert all(abs(r["actual"] - r["t"]) < 1e-9 for r in records[2:])
+    assert clock.now == pytest.approx(9)
+
+
+def test_settle_pulls_the_rest_of_the_timeline_in():
+    clock = Clock()
+    run = runner(clock, settle_saves=6.0)
+    records = run.run([(0, "settle", ([], 10)), (10, "scada", ("Load_Dist", 1)),
+                       (12, "scada", ("Load_Dist", 0))])
+    assert [r["intended"] for r in records] == [0, 4, 6]
+    assert records[0]["saved"] == 6.0
+    assert clock.now == pytest.approx(6)
+
+
+def test_durations_use_the_settle_upper_bound():
+    scenario = Scenario(prepare=[(0, "scada", ("A", 1))],
+                        timeline=[(0, "settle", ([], 10)), (5, "scada", ("B", 1))],
+                        stop_delay=1,
+                        cleanup=[(0, "settle", ([], 3))])
+    assert scenario_timeline.timeline_duration(scenario.timeline) == 10
+    assert scenario_timeline.scenario_duration(scenario) == 14
@@ -0,0 +1,61 @@
+"""Tests of schematic_batch.py."""
+
+import pytest
+
+import schematic_batch
+
+
+class Schematic:
+    """SchematicAPI stand-in counting calls."""
+
+    def __init__(self):
+        self.values = {}
+        self.lookups = 0
+        self.saves = 0
+
+    def get_item(self, name, item_type=None):
+        self.lookups += 1
+        return None if name == "missing" else name
+
+    def prop(self, item, name):
+        return (item, name)
+
+    def set_property_value(self, prop, value):
+        self.values[prop] = value
+
+    def save(self):
+        self.saves += 1
+
+
+@pytest.fixture
+def schematic():
+    return Schematic()
+
+
+def test_a_batch_saves_once(schematic):
+    batch = schematic_batch.PropertyBatch(schematic, schematic)
+    with batch:
+        batch.set("R9", "resistance", 20)
+        batch.set("Lgrid", "inductance", 1e-3)
+    assert schematic.saves == 1
+    assert schematic.values == {("R9", "resistance"): 20.0, ("Lgrid", "inductance"): 1e-3}
+
+
+def test_unchanged_values_are_not_written(schematic):
+    batch = schematic_batch.PropertyBatch(schematic, schematic)
+    batch.set("R9", "resistance", 20)
+    batch.set("R9", "resistance", 20.0)
+    with batch:
+        batch.set("R9", "resistance", 20)
+    assert (batch.writes, batch.skipped, schematic.saves, schematic.lookups) == (1, 2, 1, 1)
+
+
+def test_a_failed_batch_is_saved_with_the_next_one(schematic):
+    batch = schematic_batch.PropertyBatch(schematic, schematic)
+    with pytest.raises(RuntimeError):
+        with batch:
+            batch.set("R9", "resistance", 20)
+            batch.set("missing", "resistance", 1)
+    assert schematic.saves == 0
+    batch.apply()
+    assert schematic.saves == 1
@@ -0,0 +1,82 @@
+"""Tests of smt_client.py."""
+
+import http.server
+import json
+import socket
+import threading
+
+import pytest
+
+import smt_client
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.gate.wait()
+        self.server.received.append((self.path, json.loads(body)))
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = http.server.ThreadingHTTPServer(("localhost", 0), Handler)
+    server.received = []
+    server.gate = threading.Event()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.gate.set()
+    server.shutdown()
+    server.server_close()
+
+
+def test_events_in_order_and_heartbeats_coalesced(server):
+    client = smt_client.ReportClient(port=server.server_address[1])
+    client.post("/scenario", {"n": 0})  # Held by the server until the gate opens
+    for n in range(1, 4):
+        client.post("/scenario", {"n": n})
+    for n in range(5):
+        client.heartbeat({"beat": n})
+    server.gate.set()
+    assert client.flush(5)
+    client.close()
+
+    assert server.received == [("/scenario", {"n": n}) for n in range(4)] + [("/heartbeat", {"beat": 4})]
+    stats = client.stats()
+    assert (stats["sent"], stats["coalesced"], stats["failed"]) == (5, 4, 0)
+
+
+def test_events_beyond_max_pending_are_dropped(server):
+    client = smt_client.ReportClient(port=server.server_address[1], max_pending=2)
+    for n in range(6):
+        client.post("/scenario", {"n": n})
+    server.gate.set()
+    assert client.flush(5)
+    client.close()
+    # One event may already be with the worker when the rest are queued
+    assert client.stats()["dropped"] in (3, 4)
+    assert [body["n"] for _, body in server.received][:2] == [0, 1]
+
+
+@pytest.fixture
+def closed_port():
+    """A local port with nothing listening on it."""
+    with socket.socket() as sock:
+        sock.bind(("localhost", 0))
+        yield sock.getsockname()[1]
+
+
+def test_an_unreachable_server_never_blocks_the_caller(closed_port):
+    client = smt_client.ReportClient(port=closed_port, timeout=0.5)
+    client.post("/scenario", {"n": 0})
+    assert client.flush(5)
+    client.close()
+    assert client.stats()["failed"] == 1
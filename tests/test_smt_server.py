@@ -0,0 +1,105 @@
+"""Tests of SMT_Server.py: SSE queues and console batches."""
+
+import asyncio
+import json
+
+import SMT_Server
+
+
+class Writer:
+    """StreamWriter stand-in collecting what is written."""
+
+    def __init__(self):
+        self.written = []
+
+    def get_extra_info(self, name):
+        return ("127.0.0.1", 50000)
+
+    def write(self, data):
+        self.written.append(data)
+
+    async def drain(self):
+        pass
+
+
+def queued(client):
+    return [msg for _, msg, _ in client.queue]
+
+
+def test_a_full_queue_drops_the_oldest_message():
+    client = SMT_Server.SseClient(Writer(), "events", max_queued=3)
+    for n in range(5):
+        client.send(f"{n}".encode())
+    assert queued(client) == [b"2", b"3", b"4"]
+    assert client.dropped == 2
+
+
+def test_the_newest_state_is_never_dropped():
+    client = SMT_Server.SseClient(Writer(), "events", max_queued=3)
+    client.send(b"old state", state=True)
+    client.send(b"state", state=True)
+    for n in range(3):
+        client.send(f"{n}".encode())
+    assert queued(client) == [b"state", b"1", b"2"]
+
+    client.send(b"newer state", state=True)  # The state at the front may go now
+    assert queued(client) == [b"1", b"2", b"newer state"]
+
+
+def test_the_writer_reports_what_was_dropped():
+    writer = Writer()
+    client = SMT_Server.SseClient(writer, "console", max_queued=2, notice=SMT_Server.console_notice)
+    for n in range(4):
+        client.send(f"{n}\n".encode())
+
+    async def write_once():
+        task = asyncio.ensure_future(client.run())
+        await asyncio.sleep(0)
+        task.cancel()
+
+    asyncio.run(write_once())
+    assert writer.written == [SMT_Server.console_notice(2) + b"2\n3\n"]
+    assert client.unreported == 0 and not client.queue
+
+
+def lines_of(messages):
+    ids, lines = [], []
+    for msg in messages:
+        head, _, data = msg.decode().rstrip("\n").rpartition("data: ")
+        ids.append(head)
+        lines.append(json.loads(data)["lines"])
+    return ids, lines
+
+
+def test_console_lines_are_batched(monkeypatch):
+    monkeypatch.setattr(SMT_Server, "CONSOLE_BATCH_LINES", 4)
+    ids, lines = lines_of(SMT_Server.console_messages(
+        SMT_Server.CONSOLE_LOG, [(n, f"line {n}") for n in range(10)]))
+    assert [len(batch) for batch in lines] == [4, 4, 2]
+    assert ids == ["id: 3\n", "id: 7\n", "id: 9\n"]
+
+
+def test_large_lines_end_a_batch_early(monkeypatch):
+    monkeypatch.setattr(SMT_Server, "CONSOLE_BATCH_BYTES", 100)
+    _, lines = lines_of(SMT_Server.console_messages(
+        SMT_Server.CONSOLE_LOG, [(n, "x" * 60) for n in range(5)]))
+    assert [len(batch) for batch in lines] == [2, 2, 1]
+
+
+def test_shard_lines_are_prefixed_without_ids():
+    path = SMT_Server.SHARD_CONSOLE_LOGS.replace("*", "run_shard1")
+    ids, lines = lines_of(SMT_Server.console_messages(path, [(0, "hello")]))
+    assert ids == [""]
+    assert lines == [["[run_shard1] hello"]]
+
+
+def test_lines_a_client_has_are_not_sent_again():
+    client = SMT_Server.SseClient(Writer(), "console", max_queued=10)
+    log = SMT_Server.CONSOLE_LOG
+    SMT_Server.send_console(client, log, [(0, "a"), (1, "b")])
+    shared = SMT_Server.console_messages(log, [(1, "b"), (2, "c")])
+    SMT_Server.send_console(client, log, [(1, "b"), (2, "c")], messages=shared)
+    assert lines_of(queued(client))[1] == [["a", "b"], ["c"]]
+
+    SMT_Server.send_console(client, log, [(0, "new run")], restarted=True)
+    assert lines_of(queued(client))[1][-1] == ["new run"]
@@ -0,0 +1,46 @@
+"""Tests of the mock Typhoon backend (mock_typhoon/)."""
+
+import numpy as np
+import pytest
+
+import typhoon.api.hil as hil
+import typhoon_mock
+from typhoon.test import capture
+
+
+def test_wait_sec_fast_forwards_the_clock():
+    start = typhoon_mock.clock.now()
+    hil.wait_sec(3600)
+    assert typhoon_mock.clock.now() - start >= 3600
+
+
+def test_hil_capture_delivers_the_captured_window():
+    buffer = []
+    hil.start_capture([100, 2, 10_000], ["Forced"], ["Ia3", "Cdc"], dataBuffer=buffer)
+    hil.wait_sec(0.5)
+    hil.stop_capture()
+    names, data, t = buffer[0]
+    samples = sum(chunk[1].shape[1] for chunk in buffer)
+    assert names == ["Ia3", "Cdc"]
+    # The window plus the latency of the calls ending it
+    assert 5000 <= samples < 6500
+    assert np.allclose(data[1], 2 * data[0])  # Channel amplitudes 1, 2, ...
+
+
+def test_hil_capture_stops_at_the_buffer_size():
+    buffer = []
+    hil.start_capture([100, 1, 1000], ["Ia3"], ["Ia3"], dataBuffer=buffer)
+    hil.wait_sec(5)
+    hil.stop_capture()
+    assert sum(chunk[1].shape[1] for chunk in buffer) == 1000
+
+
+def test_high_level_capture_returns_a_data_frame():
+    pytest.importorskip("pandas")
+    capture.start_capture(duration=0.2, rate=10e3, signals=["Ia3", "Vg"])
+    frame = capture.get_capture_results(wait_capture=True)
+    assert list(frame.columns) == ["Ia3", "Vg"]
+    assert len(frame) == 2000
+    assert frame.index[1] - frame.index[0] == pytest.approx(1e-4)
+    with pytest.raises(RuntimeError):
+        capture.get_capture_results()